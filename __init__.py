@@ -1,10 +1,40 @@
-
-import logging
-from typing import Dict, Type
-
-from asyncraft.proto import Protocol
-from asyncraft.proto.packets import *
-from asyncraft.proto.packet import Packet
-from asyncraft.utils import Version
-
-logging.basicConfig(level = logging.DEBUG)
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+	from asyncraft.proto import Protocol
+	from asyncraft.proto.packets import *
+	from asyncraft.proto.packet import Packet
+	from asyncraft.utils import Version
+
+# Submodules are imported on first attribute access to keep startup cheap
+_LAZY_ATTRIBUTES = {
+	"Protocol": "asyncraft.proto.protocol",
+	"Packet": "asyncraft.proto.packet",
+	"Version": "asyncraft.utils"
+}
+
+def __getattr__(name: str) -> Any:
+	module_name = _LAZY_ATTRIBUTES.get(name)
+	if module_name is None:
+		if name.startswith("_"):
+			raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+		# `from asyncraft.proto import fields` looks submodules up here before importing them
+		try:
+			return importlib.import_module(f"{__name__}.{name}")
+		except ModuleNotFoundError as ex:
+			if ex.name != f"{__name__}.{name}":
+				raise
+
+		# Anything else is a packet
+		module_name = "asyncraft.proto.packets"
+
+	try:
+		value = getattr(importlib.import_module(module_name), name)
+	except AttributeError:
+		raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
+	globals()[name] = value
+	return value
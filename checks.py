@@ -0,0 +1,577 @@
+
+import argparse
+import asyncio
+import dataclasses
+import logging
+import os
+import struct
+import subprocess
+import sys
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+from asyncraft.streams import BufferReader
+from asyncraft.varint import VarInt
+
+__all__ = (
+	"CheckFailure", "CHECKS", "run_checks", "main"
+)
+
+# Seconds `import asyncraft.proto` may take in a fresh interpreter, short-lived workers pay it on every start
+IMPORT_TIME_BUDGET = 0.05
+
+# Loaded on first use only
+_LAZY_MODULES = ("cryptography", "numpy", "asyncraft.proto.packets", "asyncraft.proto.protocol")
+
+@dataclass
+class CheckFailure:
+	check: str
+	error: BaseException
+
+	def __str__(self) -> str:
+		return f"{self.check}: {self.error!r}"
+
+def _chunk_data(state: int, section_count: int) -> bytes:
+	# Single-valued block and biome containers with empty data arrays
+	section = struct.pack("!h", 4096) + \
+				b"\x00" + VarInt.encode(state) + VarInt.encode(0) + \
+				b"\x00" + VarInt.encode(0) + VarInt.encode(0)
+
+	return section * section_count
+
+def check_chunk_store_readd() -> None:
+	""" Columns evicted without spilling are decoded again when added or read again
+	"""
+
+	# Lazy import, numpy is only needed by world checks
+	from asyncraft.world.chunks import ChunkStore # pylint: disable=import-outside-toplevel
+
+	store = ChunkStore(max_chunks = 1, section_count = 1)
+	data_a = _chunk_data(1, 1)
+	data_b = _chunk_data(2, 1)
+
+	key_a = store.add(data_a)
+	store.add(data_b)
+	assert store.resident_count == 1, "Column was not evicted"
+
+	assert store.add(data_a) == key_a
+	blocks = store.get(key_a)
+	assert blocks is not None, "Evicted column was not decoded again"
+	assert int(blocks[0, 0]) == 1
+
+	# Both references are held, one release keeps the column
+	store.release(key_a)
+	assert store.get(key_a) is not None
+
+	store.release(key_a)
+	assert store.get(key_a) is None, "Released column was kept"
+
+def check_chunk_store_eviction() -> None:
+	""" Loaded chunks stay readable past max_chunks and modified blocks are never lost
+	"""
+
+	from asyncraft.world.chunks import ChunkStore, World # pylint: disable=import-outside-toplevel
+
+	store = ChunkStore(max_chunks = 2, section_count = 1)
+	world = World(store, min_y = 0)
+
+	for chunk_x in range(4):
+		world.load_chunk(chunk_x, 0, _chunk_data(chunk_x + 1, 1))
+
+	world.set_block(0, 0, 0, 100)
+	world.set_block(16, 0, 0, 200)
+	world.set_block(32, 0, 0, 300)
+	assert store.resident_count == 3, "Modified columns were dropped"
+
+	for chunk_x in range(4, 8):
+		world.load_chunk(chunk_x, 0, _chunk_data(chunk_x + 1, 1))
+
+	for chunk_x in range(8):
+		assert world.is_loaded(chunk_x, 0)
+		expected = (100, 200, 300)[chunk_x] if chunk_x < 3 else chunk_x + 1
+		assert world.get_block(chunk_x * 16, 0, 0) == expected, (chunk_x, world.get_block(chunk_x * 16, 0, 0))
+
+	# Unmodified blocks of modified columns are kept too
+	assert world.get_block(1, 0, 0) == 1
+
+class _Update:
+	def __init__(self, key: int, value: int) -> None:
+		self.key = key
+		self.value = value
+
+	def __repr__(self) -> str:
+		return f"{type(self).__name__}({self.key}, {self.value})"
+
+class _Move(_Update):
+	pass
+
+class _Teleport(_Update):
+	pass
+
+def check_conflation_order() -> None:
+	""" Updates of different classes with the same key are never reordered
+	"""
+
+	from asyncraft.proto.conflation import ConflationQueue # pylint: disable=import-outside-toplevel
+
+	async def run() -> None:
+		queue = ConflationQueue()
+		queue.add_key(_Move, lambda update: update.key)
+		queue.add_key(_Teleport, lambda update: update.key)
+
+		await queue.put([_Move(1, 1), _Teleport(1, 2), _Move(1, 3), _Move(2, 1), _Move(1, 4), _Move(2, 2)])
+		batch = [(type(update), update.key, update.value) for update in await queue.get_batch()]
+
+		expected = [(_Move, 1, 1), (_Teleport, 1, 2), (_Move, 1, 4), (_Move, 2, 2)]
+		assert batch == expected, batch
+		assert queue.conflated == 2
+
+	asyncio.run(run())
+
+def check_login_kick() -> None:
+	""" Logins ending before LoginSuccess fail at once and count as failed connects
+	"""
+
+	from asyncraft.proto.connectscheduler import ConnectScheduler # pylint: disable=import-outside-toplevel
+	from asyncraft.proto.protocol import Protocol # pylint: disable=import-outside-toplevel
+
+	class BrokenProtocol:
+		async def connect(self, user_name: str) -> None:
+			raise RuntimeError(f"{user_name} is broken")
+
+		def close(self) -> None:
+			pass
+
+	async def kick(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+		await reader.read(1)
+		writer.close()
+
+	async def run() -> None:
+		listener = await asyncio.start_server(kick, "127.0.0.1", 0)
+		port = listener.sockets[0].getsockname()[1]
+
+		protocols = [(Protocol("127.0.0.1", port, 760), f"bot{index}") for index in range(3)]
+		protocols.append((BrokenProtocol(), "broken"))
+
+		start_time = time.perf_counter()
+		try:
+			stats = await ConnectScheduler(max_concurrency = 2, timeout = 10).connect_all(protocols)
+		finally:
+			listener.close()
+
+		assert stats.failed == 4 and stats.succeeded == 0, stats
+		assert time.perf_counter() - start_time < 5, "Kicked logins waited for the timeout"
+
+	asyncio.run(run())
+
+def check_import_time() -> None:
+	""" Importing the package stays within IMPORT_TIME_BUDGET without side effects
+	"""
+
+	# Directory containing the asyncraft package
+	root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	env = dict(os.environ, PYTHONPATH = os.pathsep.join(filter(None, (root, os.environ.get("PYTHONPATH")))))
+
+	# Submodules imported from the packages must not pull in the packets either
+	script = "import sys, logging, asyncraft.proto; " \
+				"from asyncraft import proto, utils; " \
+				"from asyncraft.proto import fields, enums, framing; " \
+				f"print([name for name in {_LAZY_MODULES!r} if name in sys.modules]); " \
+				"print(len(logging.getLogger().handlers))"
+
+	times = []
+	# Best of three, the first run may pay for a cold disk cache
+	for _ in range(3):
+		process = subprocess.run([sys.executable, "-X", "importtime", "-c", script],
+									env = env, capture_output = True, text = True, check = True)
+
+		loaded, handlers = process.stdout.splitlines()
+		assert loaded == "[]", f"Imported eagerly: {loaded}"
+		assert handlers == "0", "Importing configured logging"
+
+		# "import time: self [us] | cumulative | imported package"
+		for line in process.stderr.splitlines():
+			fields = line.split("|")
+			if len(fields) == 3 and fields[2].strip() == "asyncraft.proto":
+				times.append(int(fields[1]) / 1000000)
+
+	assert len(times) == 3, "No import time of asyncraft.proto reported"
+	assert min(times) <= IMPORT_TIME_BUDGET, \
+		f"Import took {min(times) * 1000:.1f} ms, budget is {IMPORT_TIME_BUDGET * 1000:.0f} ms"
+
+def check_codegen_sample() -> None:
+	""" Generated sample module is up to date and its packets survive encoding and decoding
+	"""
+
+	# pylint: disable=import-outside-toplevel
+	from asyncraft.proto import codegen, sample_packets
+	from asyncraft.proto.packet import PacketTemplate
+	from asyncraft.proto.packetparser import PacketParser
+	from asyncraft.utils import Version
+
+	directory = os.path.dirname(codegen.__file__)
+	packets = PacketParser(Version.from_string("1.18.2"), os.path.join(directory, "sample_spec.txt")).parse()
+
+	with open(os.path.join(directory, "sample_packets.py"), "r", encoding = "utf-8") as file:
+		assert file.read() == codegen.generate_module(packets, "sample_spec.txt"), \
+			"sample_packets.py is out of date, regenerate it from sample_spec.txt"
+
+	assert sample_packets.NextHandshakeState.LOGIN == 2
+
+	for packet_class in sample_packets.PACKETS.values():
+		packet = packet_class()
+		reader = BufferReader(packet.to_bytes())
+
+		assert VarInt.read_from_buffer(reader) == packet_class.ID
+		decoded = packet_class.read_from_buffer(reader)
+
+		for name in packet_class.FIELDS:
+			assert getattr(decoded, name) == getattr(packet, name), f"{packet_class.__name__}.{name}"
+
+	packet = sample_packets.BlockChange((1, 2, 3), 5)
+	try:
+		packet.blockid = 6
+	except AttributeError:
+		pass
+	else:
+		raise AssertionError("Compiled packet accepted an unknown attribute")
+
+	encoded = packet.to_bytes()
+	assert packet.to_bytes() is encoded, "Encoding is not cached"
+
+	packet.block_id = 6
+	assert packet.to_bytes() == sample_packets.BlockChange((1, 2, 3), 6).to_bytes(), "Setting a field kept the old encoding"
+
+	template = PacketTemplate(packet)
+	buffer = template._buffer # pylint: disable=protected-access
+	template.set("block_id", 7)
+	assert template._buffer is buffer, "Field was not patched in place" # pylint: disable=protected-access
+	assert template.to_bytes() == sample_packets.BlockChange((1, 2, 3), 7).to_bytes()
+
+def _frame(packet_bytes: bytes) -> bytes:
+	return VarInt.encode(len(packet_bytes)) + packet_bytes
+
+def check_decode_cache() -> None:
+	""" Only frames of cacheable classes are looked up, cached packets can not be changed in place
+	"""
+
+	# pylint: disable=import-outside-toplevel
+	from asyncraft.proto import fields, sample_packets
+	from asyncraft.proto.connection import Connection
+	from asyncraft.proto.decodecache import DecodeCache
+	from asyncraft.proto.packet import Packet, copy_packet, freeze_packet
+	from asyncraft.proto.packets import Handshake, NextHandshakeState, StatusResponse, PongResponse
+	from asyncraft.proto.utils import PacketDirection, ProtocolState
+
+	cache = DecodeCache((StatusResponse,), min_frame_size = 0)
+	connection = Connection()
+	connection.set_decode_cache(cache)
+	connection.send_packet(Handshake(760, "localhost", 25565, NextHandshakeState.STATUS))
+
+	status = StatusResponse()
+	status.json_response = "{}"
+	pong = PongResponse()
+	pong.payload = 1
+
+	packets = connection.feed(_frame(pong.to_bytes()) + _frame(status.to_bytes()) * 2)
+	assert [type(packet) for packet in packets] == [PongResponse, StatusResponse, StatusResponse], packets
+	assert packets[1] is packets[2], "Second frame was not served from the cache"
+	assert (cache.misses, cache.hits, len(cache)) == (1, 1, 1), (cache.misses, cache.hits, len(cache))
+
+	@dataclass
+	class BlockUpdate(Packet):
+		ID = 0
+		state = ProtocolState.PLAY
+		direction = PacketDirection.CLIENTBOUND
+
+		location: fields.Position
+		data: fields.ByteArray
+
+	packet = BlockUpdate((1, 2, 3), bytearray(b"data"))
+	freeze_packet(packet)
+	assert packet.location == (1, 2, 3) and isinstance(packet.data, bytes)
+
+	for change in (lambda: setattr(packet.location, "x", 5), lambda: setattr(packet, "data", b"")):
+		try:
+			change()
+		except (AttributeError, dataclasses.FrozenInstanceError):
+			pass
+		else:
+			raise AssertionError("Frozen packet was changed")
+
+	copy = copy_packet(packet)
+	copy.location.x = 5
+	copy.data = b""
+	assert (copy.location.x, copy.data, packet.location.x, packet.data) == (5, b"", 1, b"data")
+
+	compiled = sample_packets.BlockChange((1, 2, 3), 5)
+	freeze_packet(compiled)
+	assert compiled.location == fields.BlockPosition(1, 2, 3)
+
+	for change in (lambda: setattr(compiled, "block_id", 6), compiled.invalidate):
+		try:
+			change()
+		except dataclasses.FrozenInstanceError:
+			pass
+		else:
+			raise AssertionError("Frozen compiled packet was changed")
+
+	copy = copy_packet(compiled)
+	copy.block_id = 6
+	assert (copy.block_id, compiled.block_id) == (6, 5)
+
+def check_chat_string() -> None:
+	""" Chat components read from buffers and streams match what was written
+	"""
+
+	# pylint: disable=import-outside-toplevel
+	from asyncraft.proto.fields import ChatColor, ChatComponent, ChatString
+	from asyncraft.streams import ByteArrayStreamReader
+
+	component = ChatComponent()
+	component.set_text("hello")
+	component.set_color(ChatColor.GOLD)
+	data = ChatString(component).to_bytes()
+
+	field = ChatString.create_from_buffer(BufferReader(data))
+	assert field.root_component.to_json() == component.to_json(), field
+
+	coro = ChatString.create_from(ByteArrayStreamReader(bytearray(data)))
+	try:
+		coro.send(None)
+	except StopIteration as ex:
+		field = ex.value
+	else:
+		raise AssertionError("Reader suspended on in-memory stream")
+
+	assert field.root_component.to_json() == component.to_json(), field
+
+	plain = ChatString.create_from_buffer(BufferReader(VarInt.encode(7) + b'"hello"'))
+	assert plain.root_component.to_json() == '{"text": "hello"}', plain
+
+	try:
+		ChatString.create_from_buffer(BufferReader(VarInt.encode(1) + b"5"))
+	except ValueError:
+		pass
+	else:
+		raise AssertionError("Number was read as chat component")
+
+def check_disconnect_listeners() -> None:
+	""" A failing disconnect listener neither stops the others nor escapes the connection handler
+	"""
+
+	# pylint: disable=import-outside-toplevel
+	from asyncraft.proto.protocol import Protocol
+	from asyncraft.proto.server import Server
+
+	async def run() -> None:
+		loop = asyncio.get_running_loop()
+		errors = []
+		loop.set_exception_handler(lambda loop, context: errors.append(context))
+
+		server = Server(760)
+		disconnected = asyncio.Event()
+
+		async def fail(connection) -> None: # pylint: disable=unused-argument
+			raise RuntimeError("Listener failed")
+
+		async def record(connection) -> None: # pylint: disable=unused-argument
+			disconnected.set()
+
+		server.add_disconnect_listener(fail)
+		server.add_disconnect_listener(record)
+
+		listener = await server.serve("127.0.0.1", 0)
+		try:
+			protocol = Protocol("127.0.0.1", listener.sockets[0].getsockname()[1], 760)
+			await protocol.connect("bot")
+			await asyncio.wait_for(protocol.wait_logged_in(), 5)
+			protocol.close()
+
+			await asyncio.wait_for(disconnected.wait(), 5)
+			# Lets the handler task finish
+			await asyncio.sleep(0.1)
+		finally:
+			listener.close()
+
+		assert not errors, errors
+
+	asyncio.run(run())
+
+def check_subscription_close() -> None:
+	""" Closing a subscription releases a reader blocked on its full queue and a waiting consumer
+	"""
+
+	# pylint: disable=import-outside-toplevel
+	from asyncraft.proto.subscription import DropPolicy, PacketSubscription
+
+	class Unsubscribing:
+		def _unsubscribe(self, subscription: PacketSubscription) -> None:
+			pass
+
+	async def run() -> None:
+		subscription = PacketSubscription(Unsubscribing(), (), 1, DropPolicy.BLOCK)
+		await subscription.put(object())
+
+		put = asyncio.create_task(subscription.put(object()))
+		await asyncio.sleep(0)
+		assert not put.done(), "Put did not wait for room"
+
+		subscription.close()
+		await asyncio.wait_for(put, 1)
+		assert await subscription.get_batch() == []
+
+		subscription = PacketSubscription(Unsubscribing(), (), 1, DropPolicy.BLOCK)
+		get = asyncio.create_task(subscription.get_batch())
+		await asyncio.sleep(0)
+
+		subscription.close()
+		assert await asyncio.wait_for(get, 1) == []
+
+	asyncio.run(run())
+
+def check_login_success() -> None:
+	""" LoginSuccess sent by Server carries the offline mode UUID of the user
+	"""
+
+	# pylint: disable=import-outside-toplevel
+	from asyncraft.proto.packets import LoginSuccess
+	from asyncraft.proto.protocol import Protocol
+	from asyncraft.proto.server import Server, offline_uuid
+
+	async def run() -> None:
+		received = []
+		server = Server(760)
+		listener = await server.serve("127.0.0.1", 0)
+		try:
+			protocol = Protocol("127.0.0.1", listener.sockets[0].getsockname()[1], 760)
+
+			async def record(packet: LoginSuccess) -> None:
+				received.append(packet)
+
+			protocol.add_packet_listener(LoginSuccess, record)
+
+			await protocol.connect("bot")
+			await asyncio.wait_for(protocol.wait_logged_in(), 5)
+			protocol.close()
+
+			# Lets the handler see the connection closed before the loop ends
+			for _ in range(100):
+				if not server.connections:
+					break
+
+				await asyncio.sleep(0.05)
+		finally:
+			listener.close()
+
+		packet, = received
+		uuid_int = (packet.uuid_most & 0xFFFFFFFFFFFFFFFF) << 64 | packet.uuid_least & 0xFFFFFFFFFFFFFFFF
+		assert uuid_int == offline_uuid("bot").int, packet
+		assert packet.user_name == "bot", packet
+
+	asyncio.run(run())
+
+# Name to check, each raises AssertionError when it fails
+def check_write_buffers() -> None:
+	""" Packets are framed in pooled buffers that go back to the pool as the transport sends them
+	"""
+
+	# pylint: disable=import-outside-toplevel
+	from asyncraft.proto import fields
+	from asyncraft.proto.connection import Connection
+	from asyncraft.proto.framing import BufferPool
+	from asyncraft.proto.packet import Packet, PacketTemplate
+	from asyncraft.proto.utils import PacketDirection, ProtocolState
+
+	@dataclass
+	class Payload(Packet):
+		ID = 0x20
+		state = ProtocolState.PLAY
+		direction = PacketDirection.SERVERBOUND
+
+		data: fields.String
+
+	# Small, just past the first buffer and compressible
+	packets = [Payload("small"), Payload("a" * 256), Payload("asyncraft " * 400),
+				PacketTemplate(Payload("template"))]
+
+	connection = Connection()
+	for threshold in (-1, 64):
+		connection.set_compression(threshold)
+		for packet in packets:
+			reader = BufferReader(bytes(connection.encode_packet(packet)))
+			assert VarInt.read_from_buffer(reader) == reader.remaining()
+
+			if threshold < 0:
+				data = reader.read_rest()
+			else:
+				data_length = VarInt.read_from_buffer(reader)
+				data = zlib.decompress(reader.read_rest()) if data_length else reader.read_rest()
+				assert data_length in (0, len(data)), (data_length, len(data))
+
+			assert data == packet.to_bytes(), (threshold, packet)
+
+		connection.release_buffers()
+
+	pool = BufferPool()
+	connection = Connection(buffer_pool = pool)
+	views = [connection.encode_packet(packets[0]) for _ in range(3)]
+
+	# Only the first view left the transport
+	connection.release_buffers(len(views[1]) + len(views[2]))
+	assert pool.acquire(256) is views[0].obj, "Sent buffer was not released"
+	assert pool.acquire(256) not in (views[1].obj, views[2].obj), "Unsent buffer was released"
+
+	connection.release_buffers(0)
+	assert {id(pool.acquire(256)), id(pool.acquire(256))} == {id(views[1].obj), id(views[2].obj)}
+
+CHECKS: Dict[str, Callable[[], None]] = {
+	"chunk_store_readd": check_chunk_store_readd,
+	"chunk_store_eviction": check_chunk_store_eviction,
+	"conflation_order": check_conflation_order,
+	"login_kick": check_login_kick,
+	"import_time": check_import_time,
+	"codegen_sample": check_codegen_sample,
+	"decode_cache": check_decode_cache,
+	"chat_string": check_chat_string,
+	"disconnect_listeners": check_disconnect_listeners,
+	"subscription_close": check_subscription_close,
+	"login_success": check_login_success,
+	"write_buffers": check_write_buffers
+}
+
+def run_checks(names: List[str] = None) -> List[CheckFailure]:
+	failures = []
+	for name in names or CHECKS:
+		try:
+			CHECKS[name]()
+		except Exception as ex: # pylint: disable=broad-except
+			failures.append(CheckFailure(name, ex))
+
+	return failures
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description = "Regression checks of behaviour fuzz and soak runs do not cover")
+	parser.add_argument("checks", nargs = "*", help = "checks to run, all by default")
+	args = parser.parse_args()
+
+	unknown = set(args.checks).difference(CHECKS)
+	if unknown:
+		parser.error(f"unknown checks: {', '.join(sorted(unknown))}, choose from {', '.join(CHECKS)}")
+
+	logging.basicConfig(level = logging.INFO)
+	logger = logging.getLogger("checks")
+
+	failures = run_checks(args.checks)
+	for failure in failures:
+		logger.error("%s", failure)
+
+	logger.info("%d checks, %d failures", len(args.checks or CHECKS), len(failures))
+
+	if failures:
+		raise SystemExit(1)
+
+if __name__ == "__main__":
+	main()
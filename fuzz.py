@@ -0,0 +1,228 @@
+
+import argparse
+import inspect
+import logging
+import random
+import zlib
+from dataclasses import dataclass, field
+from typing import Callable, Coroutine, List, Tuple, Type
+
+from asyncraft.proto import fields
+from asyncraft.proto.connection import Connection
+from asyncraft.proto.fields import FieldTooLongError, PacketField
+from asyncraft.proto.utils import PacketDirection, ProtocolState
+from asyncraft.streams import BufferReader, ByteArrayStreamReader
+from asyncraft.varint import VarInt
+
+__all__ = (
+	"FuzzConfig", "FuzzFailure", "FuzzReport",
+	"field_types", "fuzz_fields", "fuzz_connection", "check_field_limits"
+)
+
+# Malformed input may fail with these, anything else is a bug
+EXPECTED_ERRORS = (EOFError, ValueError)
+
+# ByteArray is read by packets knowing its length
+_SKIPPED_FIELDS = {fields.ByteArray}
+
+@dataclass
+class FuzzConfig:
+	iterations: int = 10000
+	seed: int = 0
+	# Small limits so generated lengths actually cross them
+	max_frame_length: int = 4096
+	max_packet_length: int = 16384
+
+@dataclass
+class FuzzFailure:
+	target: str
+	data: bytes
+	error: BaseException
+
+	def __str__(self) -> str:
+		return f"{self.target}: {self.error!r} on {self.data[:64].hex()}"
+
+@dataclass
+class FuzzReport:
+	inputs: int = 0
+	rejected_frames: int = 0
+	failures: List[FuzzFailure] = field(default_factory = list)
+
+def field_types() -> List[Type[PacketField]]:
+	""" Returns field classes of asyncraft.proto.fields that can be read
+	"""
+
+	return [value for value in vars(fields).values()
+			if inspect.isclass(value) and issubclass(value, PacketField) and
+				value is not PacketField and value not in _SKIPPED_FIELDS]
+
+def _run(coro: Coroutine) -> None:
+	# In-memory streams never suspend
+	try:
+		coro.send(None)
+	except StopIteration:
+		return
+
+	coro.close()
+	raise RuntimeError("Reader suspended on in-memory stream")
+
+def _random_input(rng: random.Random) -> bytes:
+	kind = rng.randrange(3)
+	if kind == 0:
+		return rng.randbytes(rng.randrange(64))
+
+	if kind == 1:
+		# Length prefix anywhere from negative to far past any limit
+		length = rng.choice((-1, 0, 1, rng.randrange(1 << 31), (1 << 31) - 1, rng.randrange(-(1 << 31), 0)))
+		return VarInt.encode(length) + rng.randbytes(rng.randrange(32))
+
+	# Unterminated and overlong varints
+	return bytes([0x80 | rng.randrange(128)] * rng.randrange(1, 8)) + rng.randbytes(rng.randrange(8))
+
+def fuzz_fields(config: FuzzConfig, report: FuzzReport) -> None:
+	""" Decodes random input with every field class from buffers and streams
+	"""
+
+	rng = random.Random(config.seed)
+	types = field_types()
+
+	for _ in range(config.iterations):
+		data = _random_input(rng)
+		field_type = rng.choice(types)
+		report.inputs += 1
+
+		readers: List[Tuple[str, Callable[[], None]]] = [
+			("buffer", lambda: field_type.create_from_buffer(BufferReader(data))),
+			("stream", lambda: _run(field_type.create_from(ByteArrayStreamReader(bytearray(data)))))
+		]
+
+		for name, read in readers:
+			try:
+				read()
+			except EXPECTED_ERRORS:
+				pass
+			except Exception as ex: # pylint: disable=broad-except
+				report.failures.append(FuzzFailure(f"{field_type.__name__} {name}", data, ex))
+
+def check_field_limits(report: FuzzReport) -> None:
+	""" Checks that length prefixes past MAX_LENGTH are rejected before reading
+	"""
+
+	for field_type in field_types():
+		if field_type.MAX_LENGTH is None:
+			continue
+
+		# Nothing follows the prefix, reaching read_exactly would raise EOFError instead
+		data = VarInt.encode(field_type.MAX_LENGTH + 1)
+		report.inputs += 1
+
+		try:
+			field_type.create_from_buffer(BufferReader(data))
+		except FieldTooLongError:
+			continue
+		except Exception as ex: # pylint: disable=broad-except
+			report.failures.append(FuzzFailure(f"{field_type.__name__} limit", data, ex))
+			continue
+
+		report.failures.append(FuzzFailure(f"{field_type.__name__} limit", data,
+											AssertionError("Length over MAX_LENGTH was accepted")))
+
+def _random_frame(rng: random.Random, config: FuzzConfig, compressed: bool) -> bytes:
+	kind = rng.randrange(4)
+	if kind == 0:
+		# Declared length past the frame limit, body follows in later chunks
+		length = rng.randrange(config.max_frame_length + 1, config.max_frame_length * 4)
+		return VarInt.encode(length) + rng.randbytes(length)
+
+	body = VarInt.encode(rng.randrange(0x80)) + rng.randbytes(rng.randrange(256))
+	if compressed:
+		if kind == 1:
+			# Inflates far past its declared length
+			bomb = zlib.compress(bytes(config.max_packet_length * 4))
+			body = VarInt.encode(rng.randrange(1, config.max_packet_length)) + bomb
+		elif kind == 2:
+			body = VarInt.encode(len(body)) + zlib.compress(body)
+		else:
+			body = VarInt.encode(0) + body
+
+	if kind == 3 and rng.random() < 0.2:
+		body = rng.randbytes(rng.randrange(16))
+
+	return VarInt.encode(len(body)) + body
+
+def fuzz_connection(config: FuzzConfig, report: FuzzReport) -> None:
+	""" Feeds random frame streams in random chunks, checks that buffering stays bounded
+	"""
+
+	rng = random.Random(config.seed)
+
+	for _ in range(max(config.iterations // 100, 1)):
+		compressed = rng.random() < 0.5
+
+		connection = Connection(direction = PacketDirection.CLIENTBOUND)
+		connection.switch_state(rng.choice(list(ProtocolState)))
+		connection.set_length_limits(config.max_frame_length, config.max_packet_length)
+		if compressed:
+			connection.set_compression(256)
+
+		stream = b"".join(_random_frame(rng, config, compressed) for _ in range(rng.randrange(1, 20)))
+		report.inputs += 1
+
+		offset = 0
+		while offset < len(stream):
+			chunk = stream[offset:offset + rng.randrange(1, 8192)]
+			offset += len(chunk)
+
+			try:
+				connection.feed(chunk)
+			except EXPECTED_ERRORS:
+				# Stream can not be framed anymore
+				break
+			except Exception as ex: # pylint: disable=broad-except
+				report.failures.append(FuzzFailure("Connection.feed", stream, ex))
+				break
+
+			# Incomplete frame and its length prefix at most
+			pending_size = connection._pending_size # pylint: disable=protected-access
+			if pending_size > config.max_frame_length + 5:
+				report.failures.append(FuzzFailure("Connection.feed", stream,
+													AssertionError(f"{pending_size} bytes buffered")))
+				break
+
+		report.rejected_frames += connection.rejected_frames
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description = "Fuzz field decoders and frame parsing")
+	parser.add_argument("--iterations", type = int, default = 10000)
+	parser.add_argument("--seed", type = int, default = 0)
+	args = parser.parse_args()
+
+	logging.basicConfig(level = logging.INFO)
+	# Malformed input is logged by design
+	logging.getLogger("proto").setLevel(logging.CRITICAL)
+
+	logger = logging.getLogger("fuzz")
+
+	config = FuzzConfig(iterations = args.iterations, seed = args.seed)
+	report = FuzzReport()
+
+	check_field_limits(report)
+	fuzz_fields(config, report)
+	fuzz_connection(config, report)
+
+	logger.info("%d inputs, %d frames rejected, %d failures",
+				report.inputs, report.rejected_frames, len(report.failures))
+
+	# First failure of each kind
+	kinds = {}
+	for failure in report.failures:
+		kinds.setdefault((failure.target, type(failure.error)), failure)
+
+	for failure in kinds.values():
+		logger.error("%s", failure)
+
+	if report.failures:
+		raise SystemExit(1)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,339 @@
+
+import argparse
+import keyword
+import os
+import sys
+from typing import Dict, List, Tuple, Type
+
+from asyncraft.proto import enums, fields
+from asyncraft.proto.fields import PacketField
+from asyncraft.proto.packetparser import FieldInfo, PacketInfo, PacketParser
+from asyncraft.utils import Version
+from asyncraft.varint import VarInt
+
+__all__ = (
+	"CodegenError", "generate_module", "main"
+)
+
+# Class attributes of Packet that generated slots must not shadow
+_RESERVED_NAMES = {"ID", "state", "direction", "offload_decode", "FIELDS", "ENCODERS"}
+
+_HEADER = '''
+# Generated by asyncraft.proto.codegen from {source}, do not edit
+
+import struct
+from typing import Dict, Tuple, Type
+
+from asyncraft.proto import fields
+# Re-exported, hand-written code imports enums from the packet module
+from asyncraft.proto.enums import {enums} # pylint: disable=unused-import
+from asyncraft.proto.packet import CompiledPacket
+from asyncraft.proto.utils import PacketDirection, ProtocolState
+from asyncraft.streams import BufferReader
+from asyncraft.varint import VarInt, VarLong
+
+_new = object.__new__
+
+def _read_string(reader: BufferReader) -> str:
+	length = fields.String.check_length(VarInt.read_from_buffer(reader))
+	return reader.read_exactly(length).decode("utf-8")
+
+def _read_byte_array(reader: BufferReader) -> bytes:
+	length = fields.VarByteArray.check_length(VarInt.read_from_buffer(reader))
+	return reader.read_exactly(length)
+
+def _encode_string(value: str) -> bytes:
+	data = value.encode("utf-8")
+	return VarInt.encode(len(data)) + data
+
+def _encode_byte_array(value: bytes) -> bytes:
+	return VarInt.encode(len(value)) + bytes(value)
+
+def _encode_field(field_type: Type[fields.PacketField], value) -> bytes:
+	if isinstance(value, field_type):
+		return value.to_bytes()
+
+	field = field_type()
+	field.setter(value)
+	return field.to_bytes()
+'''
+
+class CodegenError(ValueError):
+	pass
+
+class _ModuleWriter:
+	def __init__(self) -> None:
+		self._lines: List[str] = []
+		# Struct format -> module level name
+		self._structs: Dict[str, str] = {}
+
+	def struct_name(self, fmt: str) -> str:
+		name = self._structs.get(fmt)
+		if name is None:
+			name = f"_STRUCT_{len(self._structs)}"
+			self._structs[fmt] = name
+
+		return name
+
+	def add(self, line: str = "") -> None:
+		self._lines.append(line)
+
+	def render(self, source: str) -> str:
+		header = _HEADER.format(source = source, enums = ", ".join(enums.__all__))
+
+		structs = [f"{name} = struct.Struct({'!' + fmt!r})" for fmt, name in self._structs.items()]
+
+		return "\n".join([header] + structs + [""] + self._lines) + "\n"
+
+def _field_class(field: FieldInfo) -> Type[PacketField]:
+	field_type = getattr(fields, field.type, None)
+	if not isinstance(field_type, type) or not issubclass(field_type, PacketField):
+		raise CodegenError(f"Unknown field type {field.type!r} of {field.name!r}")
+
+	return field_type
+
+def _struct_format(field_type: Type[PacketField]) -> str:
+	if field_type.STRUCT is None:
+		return None
+
+	return field_type.STRUCT.format.lstrip("!")
+
+def _group_fields(packet: PacketInfo) -> List[Tuple[str, List[FieldInfo]]]:
+	""" Splits fields into runs of fixed-width ones packed with a single struct and single others
+	"""
+
+	groups: List[Tuple[str, List[FieldInfo]]] = []
+	for field in packet.fields:
+		fmt = _struct_format(_field_class(field))
+		if fmt is not None and groups and groups[-1][0] is not None:
+			groups[-1] = (groups[-1][0] + fmt, groups[-1][1] + [field])
+		else:
+			groups.append((fmt, [field]))
+
+	return groups
+
+def _read_expression(packet: PacketInfo, field: FieldInfo) -> str:
+	field_type = _field_class(field)
+
+	match field.type:
+		case "VarIntField":
+			return "VarInt.read_from_buffer(reader)"
+		case "VarLongField":
+			return "VarLong.read_from_buffer(reader)"
+		case "String":
+			return "_read_string(reader)"
+		case "VarByteArray":
+			return "_read_byte_array(reader)"
+		case "ByteArray":
+			# Length comes from an earlier field, otherwise the array takes the rest
+			length_name = field.name + "_length"
+			earlier_fields = packet.fields[:packet.fields.index(field)]
+			if any(other.name == length_name for other in earlier_fields):
+				return f"reader.read_exactly(self._{length_name})"
+
+			return "reader.read_rest()"
+
+	return f"fields.{field_type.__name__}.create_from_buffer(reader).getter()"
+
+def _write_expression(writer: _ModuleWriter, field: FieldInfo) -> str:
+	field_type = _field_class(field)
+	value = f"self._{field.name}"
+
+	fmt = _struct_format(field_type)
+	if fmt is not None:
+		return f"{writer.struct_name(fmt)}.pack({value})"
+
+	match field.type:
+		case "VarIntField":
+			return f"VarInt.encode({value})"
+		case "VarLongField":
+			return f"VarLong.encode({value})"
+		case "String":
+			return f"_encode_string({value})"
+		case "VarByteArray":
+			return f"_encode_byte_array({value})"
+		case "ByteArray":
+			return f"bytes({value})"
+
+	return f"_encode_field(fields.{field_type.__name__}, {value})"
+
+def _default(field: FieldInfo) -> Tuple[str, str]:
+	""" Returns annotation and default value of the init argument
+	"""
+
+	field_type = _field_class(field)
+	fmt = _struct_format(field_type)
+
+	if fmt == "?":
+		return "bool", "False"
+
+	if fmt in ("f", "d"):
+		return "float", "0.0"
+
+	if fmt is not None or field.type in ("VarIntField", "VarLongField"):
+		return "int", "0"
+
+	if field.type == "String":
+		return "str", "\"\""
+
+	if field.type in ("ByteArray", "VarByteArray"):
+		return "bytes", "b\"\""
+
+	# Mutable values, created in __init__
+	return "object", "None"
+
+def _validate(packet: PacketInfo) -> None:
+	names = set()
+	for field in packet.fields:
+		# Values are kept in slots named after fields with a leading underscore
+		if field.name in _RESERVED_NAMES or keyword.iskeyword(field.name) or field.name.startswith("_"):
+			raise CodegenError(f"Field name {field.name!r} of {packet.name} is reserved")
+
+		if field.name in names:
+			raise CodegenError(f"Duplicate field {field.name!r} of {packet.name}")
+
+		names.add(field.name)
+		_field_class(field)
+
+def _write_packet(writer: _ModuleWriter, packet: PacketInfo) -> None:
+	_validate(packet)
+
+	writer.add(f"class {packet.name}(CompiledPacket):")
+	writer.add(f"\tID = {packet.id}")
+	writer.add(f"\tstate = ProtocolState.{packet.state.name}")
+	writer.add(f"\tdirection = PacketDirection.{packet.direction.name}")
+	writer.add()
+
+	names = [field.name for field in packet.fields]
+	writer.add(f"\tFIELDS = {tuple(names)!r}")
+	writer.add(f"\t__slots__ = {tuple('_' + name for name in names)!r}")
+	writer.add()
+
+	# __init__
+	arguments = "".join(", {}: {} = {}".format(field.name, *_default(field)) for field in packet.fields)
+	writer.add(f"\tdef __init__(self{arguments}) -> None:")
+	for field in packet.fields:
+		if _default(field)[1] == "None":
+			writer.add(f"\t\tself._{field.name} = fields.{_field_class(field).__name__}().getter() "
+						f"if {field.name} is None else {field.name}")
+		else:
+			writer.add(f"\t\tself._{field.name} = {field.name}")
+
+	writer.add("\t\tself._encoded = None")
+	writer.add("\t\tself._frozen = False")
+	writer.add()
+
+	# Setters drop the cached encoding, shared packets raise FrozenInstanceError
+	for field in packet.fields:
+		annotation = _default(field)[0]
+
+		writer.add("\t@property")
+		writer.add(f"\tdef {field.name}(self) -> {annotation}:")
+		writer.add(f"\t\treturn self._{field.name}")
+		writer.add()
+		writer.add(f"\t@{field.name}.setter")
+		writer.add(f"\tdef {field.name}(self, value: {annotation}) -> None:")
+		writer.add("\t\tif self._frozen:")
+		writer.add("\t\t\tself.raise_frozen()")
+		writer.add()
+		writer.add("\t\tself._encoded = None")
+		writer.add(f"\t\tself._{field.name} = value")
+		writer.add()
+
+	# Single fields for PacketTemplate
+	writer.add("\tENCODERS = {")
+	writer.add(",\n".join(f"\t\t{field.name!r}: lambda self: {_write_expression(writer, field)}"
+							for field in packet.fields))
+	writer.add("\t}")
+	writer.add()
+
+	groups = _group_fields(packet)
+
+	# read_from_buffer
+	writer.add("\t@classmethod")
+	writer.add(f"\tdef read_from_buffer(cls, reader: BufferReader) -> \"{packet.name}\":")
+	writer.add("\t\tself = _new(cls)")
+	for fmt, group in groups:
+		if fmt is not None:
+			targets = ", ".join(f"self._{field.name}" for field in group)
+			if len(group) == 1:
+				targets += ","
+
+			writer.add(f"\t\t{targets} = reader.unpack({writer.struct_name(fmt)})")
+		else:
+			field = group[0]
+			writer.add(f"\t\tself._{field.name} = {_read_expression(packet, field)}")
+
+	writer.add("\t\tself._encoded = None")
+	writer.add("\t\tself._frozen = False")
+	writer.add("\t\treturn self")
+	writer.add()
+
+	# to_bytes, fixed-width runs are packed with one struct
+	parts = [repr(VarInt.encode(packet.id))]
+	for fmt, group in groups:
+		if fmt is not None:
+			values = ", ".join(f"self._{field.name}" for field in group)
+			parts.append(f"{writer.struct_name(fmt)}.pack({values})")
+		else:
+			parts.append(_write_expression(writer, group[0]))
+
+	writer.add("\tdef to_bytes(self) -> bytes:")
+	writer.add("\t\tencoded = self._encoded")
+	writer.add("\t\tif encoded is None:")
+	if len(parts) == 1:
+		writer.add(f"\t\t\tencoded = self._encoded = {parts[0]}")
+	else:
+		writer.add("\t\t\tencoded = self._encoded = b\"\".join((")
+		writer.add(",\n".join(f"\t\t\t\t{part}" for part in parts))
+		writer.add("\t\t\t))")
+
+	writer.add()
+	writer.add("\t\treturn encoded")
+	writer.add()
+
+def generate_module(packets: List[PacketInfo], source: str = "packet spec") -> str:
+	""" Returns source of a module with compiled classes and registry of packets
+
+		Generated module provides `get_packet_class` and the enums of
+		asyncraft.proto.enums like asyncraft.proto.packets
+	"""
+
+	writer = _ModuleWriter()
+
+	for packet in packets:
+		_write_packet(writer, packet)
+
+	writer.add("PACKETS: Dict[Tuple[PacketDirection, ProtocolState, int], Type[CompiledPacket]] = {")
+	writer.add(",\n".join(f"\t(PacketDirection.{packet.direction.name}, "
+							f"ProtocolState.{packet.state.name}, {packet.id}): {packet.name}"
+							for packet in packets))
+	writer.add("}")
+	writer.add()
+	writer.add("def get_packet_class(direction: PacketDirection, "
+				"state: ProtocolState, packet_id: int) -> Type[CompiledPacket]:")
+	writer.add("\treturn PACKETS[(direction, state, packet_id)]")
+
+	return writer.render(source)
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description = "Generate packet module from version spec")
+	parser.add_argument("version", help = "version of packets/versions/<version>.txt")
+	parser.add_argument("--spec", help = "spec file to read instead")
+	parser.add_argument("-o", "--output", help = "module to write, stdout if omitted")
+	args = parser.parse_args()
+
+	version = Version.from_string(args.version)
+	packets = PacketParser(version, args.spec).parse()
+
+	source = generate_module(packets, os.path.basename(args.spec) if args.spec else f"{version}.txt")
+
+	if args.output is None:
+		sys.stdout.write(source)
+		return
+
+	with open(args.output, "w", encoding = "utf-8") as file:
+		file.write(source)
+
+if __name__ == "__main__":
+	main()
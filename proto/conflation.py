@@ -0,0 +1,112 @@
+
+import asyncio
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Tuple, Type
+
+from asyncraft.proto.packet import Packet
+
+__all__ = (
+	"ConflationQueue", "KeyFunction"
+)
+
+# Extracts what an update is about, entity id for example
+KeyFunction = Callable[[Packet], Hashable]
+
+class ConflationQueue:
+	""" Received packets waiting for dispatch, queued updates of the same key collapse
+
+		A packet of a class added with add_key() replaces the queued packet of
+		the same class and key in place, unless another packet was queued after
+		it. Keys are shared by all classes, an update of another class with the
+		same key stays after older updates and before newer ones. Packets of
+		classes without key pass through untouched and in order, no update is
+		moved across them. At most `max_backlog` packets are queued, put()
+		waits for the consumer beyond that
+	"""
+
+	def __init__(self, max_backlog: int = 1024) -> None:
+		self._max_backlog = max_backlog
+		self._key_functions: Dict[Type[Packet], KeyFunction] = {}
+
+		self._packets: List[Any] = []
+		# Class and index of the latest queued update of each key, replaced by the same class only
+		self._updates: Dict[Hashable, Tuple[Type[Packet], int]] = {}
+
+		self._readable = asyncio.Event()
+		self._writable = asyncio.Event()
+		self._writable.set()
+		self._closed = False
+
+		self._conflated = 0
+
+	@property
+	def conflated(self) -> int:
+		""" Number of packets replaced by newer ones before dispatch
+		"""
+
+		return self._conflated
+
+	def __len__(self) -> int:
+		return len(self._packets)
+
+	def add_key(self, packet_class: Type[Packet], key: KeyFunction) -> None:
+		self._key_functions[packet_class] = key
+
+	async def put(self, packets: Iterable[Any]) -> None:
+		key_functions = self._key_functions
+
+		for packet in packets:
+			packet_class = type(packet)
+			key_function = key_functions.get(packet_class)
+			if key_function is not None:
+				key = key_function(packet)
+
+				update = self._updates.get(key)
+				if update is not None and update[0] is packet_class:
+					self._packets[update[1]] = packet
+					self._conflated += 1
+					continue
+			else:
+				key = None
+				# Updates queued so far must stay in front of this packet
+				self._updates.clear()
+
+			while len(self._packets) >= self._max_backlog and not self._closed:
+				self._readable.set()
+				self._writable.clear()
+				await self._writable.wait()
+
+			# Consumer may have taken the queue meanwhile
+			if key is not None:
+				self._updates[key] = (packet_class, len(self._packets))
+
+			self._packets.append(packet)
+
+		if self._packets:
+			self._readable.set()
+
+	async def get_batch(self) -> List[Any]:
+		""" Waits for packets and takes all queued ones, returns empty list once closed
+		"""
+
+		while not self._packets:
+			if self._closed:
+				return []
+
+			self._readable.clear()
+			await self._readable.wait()
+
+		packets = self._packets
+		self._packets = []
+		self._updates.clear()
+
+		self._writable.set()
+
+		return packets
+
+	def close(self) -> None:
+		""" Ends get_batch() after queued packets are taken
+		"""
+
+		self._closed = True
+		self._readable.set()
+		self._writable.set()
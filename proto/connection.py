@@ -0,0 +1,550 @@
+
+import logging
+import zlib
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Collection, Deque, Iterable, List, Tuple, Type, Union
+
+from asyncraft.proto.utils import ProtocolState, PacketDirection
+from asyncraft.proto.packets import get_packet_class, Handshake, LoginSuccess, SetCompression
+from asyncraft.proto.packet import Packet, PacketTemplate
+from asyncraft.proto.fields import LengthLimitError
+from asyncraft.proto.framing import BufferPool, default_buffer_pool
+from asyncraft.streams import BufferReader, BufferWriter
+from asyncraft.varint import VarInt
+
+if TYPE_CHECKING:
+	from asyncraft.proto.crypto import ProtocolCipher
+	from asyncraft.proto.flightrecorder import FlightRecorder
+	from asyncraft.proto.decodecache import DecodeCache
+
+__all__ = (
+	"Connection", "RawPacket", "RawFrame", "PacketTooLongError",
+	"MAX_FRAME_LENGTH", "MAX_PACKET_LENGTH"
+)
+
+# Length prefix of vanilla frames takes at most three bytes
+MAX_FRAME_LENGTH = (1 << 21) - 1
+# Largest uncompressed packet vanilla servers accept
+MAX_PACKET_LENGTH = 1 << 23
+
+# Deflate can not inflate more than this many bytes out of one
+_MAX_DEFLATE_RATIO = 1032
+
+# Compressed frames at least this long are peeked before inflating them whole
+_PEEK_MIN_LENGTH = 1024
+# Enough for the packet id and the start of a flight recorder sample
+_PEEK_SIZE = 16
+
+# Packets are encoded after room for the frame length and data length prefixes,
+# five bytes each at most
+_HEADER_ROOM = 10
+# Packets are encoded into a buffer as large as the previous one needed, up to this size,
+# larger ones move to a bigger buffer while encoding
+_MAX_ENCODE_SIZE_HINT = 1 << 14
+
+# Always decoded, connection state depends on them
+_TRACKED_PACKETS = (Handshake, SetCompression, LoginSuccess)
+
+_OPPOSITE_DIRECTION = {
+	PacketDirection.CLIENTBOUND: PacketDirection.SERVERBOUND,
+	PacketDirection.SERVERBOUND: PacketDirection.CLIENTBOUND
+}
+
+class PacketTooLongError(LengthLimitError):
+	pass
+
+@dataclass(slots = True)
+class RawPacket:
+	""" Packet left undecoded for offloading
+
+		`data` holds the decompressed packet body after the packet id
+	"""
+
+	packet_class: Type[Packet]
+	data: bytes
+
+@dataclass(slots = True)
+class RawFrame:
+	""" Frame passed through undecoded
+
+		`data` holds the whole decrypted frame with its length prefix,
+		still compressed if compression is on
+	"""
+
+	data: memoryview
+
+class Connection:
+	""" Sans-IO protocol core
+
+		Turns received bytes into packets and packets into bytes to send.
+		Tracks protocol state, encryption and compression, performs no IO
+	"""
+
+	__slots__ = ("_cipher", "_direction", "_state",
+					"_compression_threshold", "_encryption_enabled",
+					"_decode_offload_enabled", "_pass_through_enabled", "_packet_filter",
+					"_pending", "_pending_size", "_frame_size",
+					"_max_frame_length", "_max_packet_length", "_skip_size", "_rejected_frames",
+					"_buffer_pool", "_borrowed", "_sent_size", "_writer", "_encode_size_hint", "_recorder", "_decode_cache")
+
+	_logger = logging.getLogger("proto")
+
+	def __init__(self,
+					cipher: "ProtocolCipher" = None,
+					direction: PacketDirection = PacketDirection.CLIENTBOUND,
+					buffer_pool: BufferPool = None) -> None:
+		self._cipher = cipher
+		# Direction of received packets
+		self._direction = direction
+
+		self._state = ProtocolState.HANDSHAKING
+
+		self._compression_threshold = -1
+		self._encryption_enabled = False
+		self._decode_offload_enabled = False
+		self._pass_through_enabled = False
+		# Packet classes to decode, None decodes every known packet
+		self._packet_filter: Collection[Type[Packet]] = None
+
+		# Decrypted bytes of incomplete frames
+		self._pending: List[bytes] = []
+		self._pending_size = 0
+		# Bytes needed to complete the next frame, 0 if unknown
+		self._frame_size = 0
+
+		self._max_frame_length = MAX_FRAME_LENGTH
+		self._max_packet_length = MAX_PACKET_LENGTH
+		# Bytes of a rejected frame still to be dropped as they arrive
+		self._skip_size = 0
+		self._rejected_frames = 0
+
+		self._buffer_pool = buffer_pool or default_buffer_pool
+		# Pool buffers backing views returned by encode_packet with the
+		# number of bytes sent up to the end of their view
+		self._borrowed: Deque[Tuple[int, bytearray]] = deque()
+		# Bytes returned for sending so far
+		self._sent_size = 0
+		# Reused by encode_packet
+		self._writer = BufferWriter(None, 0, self._buffer_pool.acquire)
+		self._encode_size_hint = 0
+
+		self._recorder: "FlightRecorder" = None
+		self._decode_cache: "DecodeCache" = None
+
+	@property
+	def state(self) -> ProtocolState:
+		return self._state
+
+	@property
+	def direction(self) -> PacketDirection:
+		return self._direction
+
+	@property
+	def compression_threshold(self) -> int:
+		return self._compression_threshold
+
+	@property
+	def encryption_enabled(self) -> bool:
+		return self._encryption_enabled
+
+	@property
+	def rejected_frames(self) -> int:
+		""" Number of frames dropped for exceeding length limits
+		"""
+
+		return self._rejected_frames
+
+	def set_length_limits(self,
+							max_frame_length: int = MAX_FRAME_LENGTH,
+							max_packet_length: int = MAX_PACKET_LENGTH) -> None:
+		""" Limits frames as received and packets after decompression
+
+			Longer frames are dropped without being buffered,
+			field limits are set with MAX_LENGTH of field classes
+		"""
+
+		self._max_frame_length = max_frame_length
+		self._max_packet_length = max_packet_length
+
+	@property
+	def flight_recorder(self) -> "FlightRecorder":
+		return self._recorder
+
+	def set_flight_recorder(self, recorder: "FlightRecorder") -> None:
+		""" Records metadata of every sent and received frame, None disables recording
+		"""
+
+		self._recorder = recorder
+
+	@property
+	def decode_cache(self) -> "DecodeCache":
+		return self._decode_cache
+
+	def set_decode_cache(self, cache: "DecodeCache") -> None:
+		""" Shares decoded packets with other connections using the same cache, None disables it
+
+			Cached classes are decoded in place instead of being offloaded,
+			so connections receiving the same frame meanwhile find it cached
+		"""
+
+		self._decode_cache = cache
+
+	def switch_state(self, state: ProtocolState) -> None:
+		self._state = state
+
+	def set_compression(self, threshold: int) -> None:
+		self._compression_threshold = threshold
+
+	def enable_encryption(self, cipher: "ProtocolCipher" = None) -> None:
+		if cipher is not None:
+			self._cipher = cipher
+
+		if self._cipher is None:
+			raise ValueError("Connection has no cipher")
+
+		if self._encryption_enabled:
+			return
+
+		self._encryption_enabled = True
+
+		# Bytes received after the switch are already encrypted
+		self._pending = [self._cipher.decrypt(chunk) for chunk in self._pending]
+
+	def enable_decode_offload(self) -> None:
+		""" Return packets of classes with `offload_decode` set as RawPacket
+		"""
+
+		self._decode_offload_enabled = True
+
+	def enable_pass_through(self) -> None:
+		""" Return frames that are not decoded as RawFrame instead of dropping them
+
+			Includes frames of unknown packets and frames that failed to decode
+		"""
+
+		self._pass_through_enabled = True
+
+	def set_packet_filter(self, packet_classes: Collection[Type[Packet]]) -> None:
+		""" Skips decoding of packets with classes outside of packet_classes
+
+			None decodes every known packet
+		"""
+
+		self._packet_filter = packet_classes
+
+	def feed(self, data: bytes) -> List[Union[Packet, RawPacket, RawFrame]]:
+		""" Consumes received bytes and returns packets completed by them
+		"""
+
+		if self._encryption_enabled:
+			data = self._cipher.decrypt(data)
+
+		if self._skip_size:
+			if len(data) <= self._skip_size:
+				self._skip_size -= len(data)
+				return []
+
+			data = data[self._skip_size:]
+			self._skip_size = 0
+
+		self._pending.append(data)
+		self._pending_size += len(data)
+		if self._pending_size < self._frame_size:
+			return []
+
+		buffer = b"".join(self._pending)
+		view = memoryview(buffer)
+		buffer_length = len(buffer)
+
+		packets: List[Union[Packet, RawPacket, RawFrame]] = []
+
+		offset = 0
+		frame_size = 0
+		while offset < buffer_length:
+			try:
+				frame_length, frame_start = VarInt.decode_from(buffer, offset)
+			except EOFError:
+				break
+
+			if frame_length < 0:
+				raise ValueError(f"Negative frame length {frame_length}")
+
+			frame_end = frame_start + frame_length
+			if frame_length > self._max_frame_length:
+				self._reject_frame(f"frame length {frame_length} over {self._max_frame_length}")
+
+				# Dropped as it arrives instead of being buffered
+				if frame_end > buffer_length:
+					self._skip_size = frame_end - buffer_length
+					offset = buffer_length
+					break
+
+				offset = frame_end
+				continue
+
+			if frame_end > buffer_length:
+				frame_size = frame_end - offset
+				break
+
+			frame = view[frame_start:frame_end]
+			frame_offset = offset
+			offset = frame_end
+
+			try:
+				packet = self._decode_frame(frame)
+			except LengthLimitError as ex:
+				# Never passed through either
+				self._reject_frame(str(ex))
+				continue
+			except Exception: # pylint: disable=broad-except
+				self._logger.exception("Failed to decode packet, length=%d", frame_length)
+				packet = None
+
+			if packet is None and self._pass_through_enabled:
+				# Views keep the joined buffer alive, no copy is made
+				packet = RawFrame(view[frame_offset:frame_end])
+
+			if packet is not None:
+				packets.append(packet)
+
+		rest = buffer[offset:]
+
+		self._pending.clear()
+		if rest:
+			self._pending.append(rest)
+
+		self._pending_size = len(rest)
+		self._frame_size = frame_size
+
+		return packets
+
+	def send_packet(self, packet: Union[Packet, PacketTemplate]) -> bytes:
+		""" Encodes packet and returns bytes to send
+		"""
+
+		return self.send_packets((packet,))
+
+	def send_packets(self, packets: Iterable[Union[Packet, PacketTemplate]]) -> bytes:
+		""" Encodes packets and returns their bytes joined for a single write
+		"""
+
+		borrowed_count = len(self._borrowed)
+
+		data = b"".join([self.encode_packet(packet) for packet in packets])
+
+		while len(self._borrowed) > borrowed_count:
+			self._buffer_pool.release(self._borrowed.pop()[1])
+
+		return data
+
+	def encode_packet(self, packet: Union[Packet, PacketTemplate]) -> memoryview:
+		""" Encodes packet into a pooled buffer and returns view of bytes to send
+
+			The view stays valid until release_buffers() is called with
+			less unsent bytes than were returned after it
+		"""
+
+		pool = self._buffer_pool
+
+		writer = self._writer
+		writer.buffer = first_buffer = pool.acquire(self._encode_size_hint)
+		writer.offset = _HEADER_ROOM
+		packet.encode_into(writer)
+
+		buffer = writer.buffer
+		end = writer.offset
+		writer.buffer = None
+
+		if buffer is not first_buffer:
+			pool.release(first_buffer)
+
+		self._encode_size_hint = min(end, _MAX_ENCODE_SIZE_HINT)
+
+		packet_size = end - _HEADER_ROOM
+
+		if self._recorder is not None:
+			self._recorder.record(_OPPOSITE_DIRECTION[self._direction],
+									self._state,
+									packet.ID,
+									packet_size,
+									buffer,
+									_HEADER_ROOM)
+
+		# Uncompressed length prefix of compressed frames, -1 if compression is off
+		data_length = -1
+		if self._compression_threshold >= 0:
+			if packet_size >= self._compression_threshold:
+				data_length = packet_size
+
+				compressed = zlib.compress(memoryview(buffer)[_HEADER_ROOM:end])
+				end = _HEADER_ROOM + len(compressed)
+				if end > len(buffer):
+					pool.release(buffer)
+					buffer = pool.acquire(end)
+
+				buffer[_HEADER_ROOM:end] = compressed
+			else:
+				data_length = 0
+
+		frame_length = end - _HEADER_ROOM
+		if data_length >= 0:
+			frame_length += VarInt.size_of(data_length)
+
+		# Prefixes go right before the packet
+		start = end - frame_length - VarInt.size_of(frame_length)
+		offset = VarInt.encode_into(frame_length, buffer, start)
+		if data_length >= 0:
+			VarInt.encode_into(data_length, buffer, offset)
+
+		self._track_packet(packet)
+
+		if self._encryption_enabled:
+			# CFB8 may buffer up to a block, encrypt_into needs the spare room
+			encrypted = pool.acquire(end - start + 15)
+			end = self._cipher.encrypt_into(memoryview(buffer)[start:end], encrypted)
+			start = 0
+
+			pool.release(buffer)
+			buffer = encrypted
+
+		self._sent_size += end - start
+		self._borrowed.append((self._sent_size, buffer))
+
+		return memoryview(buffer)[start:end]
+
+	def release_buffers(self, unsent: int = 0) -> None:
+		""" Returns buffers of views from encode_packet to the pool
+
+			`unsent` is the number of bytes the transport still holds, buffers
+			of views within them stay borrowed
+		"""
+
+		sent_size = self._sent_size - unsent
+		borrowed = self._borrowed
+		while borrowed and borrowed[0][0] <= sent_size:
+			self._buffer_pool.release(borrowed.popleft()[1])
+
+	def send_data(self, data: bytes) -> bytes:
+		""" Returns raw bytes to send, encrypted if needed
+		"""
+
+		if self._encryption_enabled:
+			data = self._cipher.encrypt(data)
+
+		self._sent_size += len(data)
+
+		return data
+
+	def _decode_frame(self, frame: memoryview) -> Union[Packet, RawPacket]:
+		# Frames are cached by their bytes before inflating
+		raw_frame = frame
+		cache = self._decode_cache
+
+		offset = 0
+		data_length = 0
+		if self._compression_threshold >= 0:
+			data_length, offset = VarInt.decode_from(frame)
+			if not 0 <= data_length <= self._max_packet_length:
+				raise PacketTooLongError(f"packet length {data_length} outside of 0-{self._max_packet_length}")
+
+		# Set while only the start of the frame was inflated into head
+		decompressor = None
+		if data_length == 0:
+			head = frame
+			head_offset = offset
+			length = len(frame) - offset
+		elif data_length >= _PEEK_MIN_LENGTH and (self._packet_filter is not None or cache is not None):
+			# Inflate just enough for the packet id, the frame may not be wanted
+			decompressor = zlib.decompressobj()
+			head = decompressor.decompress(frame[offset:], _PEEK_SIZE)
+			head_offset = 0
+			length = data_length
+		else:
+			frame = head = self._inflate(frame[offset:], data_length)
+			head_offset = 0
+			length = data_length
+
+		packet_id, id_end = VarInt.decode_from(head, head_offset)
+
+		if self._recorder is not None:
+			self._recorder.record(self._direction,
+									self._state,
+									packet_id,
+									length,
+									head,
+									head_offset)
+
+		try:
+			packet_class = get_packet_class(self._direction,
+											self._state,
+											packet_id)
+		except KeyError:
+			if not self._pass_through_enabled:
+				self._logger.warning("Unknown packet id=%d, length=%d", packet_id, length)
+
+			return None
+
+		if self._packet_filter is not None and \
+			packet_class not in self._packet_filter and \
+			packet_class not in _TRACKED_PACKETS:
+			return None
+
+		cache_key = None
+		if cache is not None and \
+			packet_class in cache.packet_classes and \
+			packet_class not in _TRACKED_PACKETS:
+			cache_key = cache.key(self._direction, self._state, self._compression_threshold >= 0, raw_frame)
+			if cache_key is not None:
+				packet = cache.get(cache_key)
+				if packet is not None:
+					return packet
+
+		if decompressor is not None:
+			# Wanted after all, carry on where the peek stopped
+			frame = head + _bounded_inflate(decompressor, decompressor.unconsumed_tail, data_length - len(head))
+
+		reader = BufferReader(frame, id_end)
+
+		if cache_key is not None:
+			packet = packet_class.read_from_buffer(reader)
+			cache.put(cache_key, packet)
+			return packet
+
+		if self._decode_offload_enabled and packet_class.offload_decode:
+			return RawPacket(packet_class, reader.read_rest())
+
+		packet = packet_class.read_from_buffer(reader)
+
+		self._track_packet(packet)
+
+		return packet
+
+	def _inflate(self, data: memoryview, data_length: int) -> bytes:
+		if len(data) * _MAX_DEFLATE_RATIO <= self._max_packet_length:
+			# Can not get past the limit, one call is cheaper
+			return zlib.decompress(data)
+
+		return _bounded_inflate(zlib.decompressobj(), data, data_length)
+
+	def _reject_frame(self, reason: str) -> None:
+		self._rejected_frames += 1
+		self._logger.warning("Rejected %s", reason)
+
+	def _track_packet(self, packet: Packet) -> None:
+		if isinstance(packet, Handshake):
+			self._state = ProtocolState(packet.next_state)
+		elif isinstance(packet, SetCompression):
+			self._compression_threshold = packet.threshold
+		elif isinstance(packet, LoginSuccess):
+			self._state = ProtocolState.PLAY
+
+def _bounded_inflate(decompressor: "zlib._Decompress", data: bytes, max_length: int) -> bytes:
+	""" Inflates at most max_length bytes, raises PacketTooLongError if the stream does not end there
+	"""
+
+	packet_data = decompressor.decompress(data, max_length)
+	if not decompressor.eof:
+		raise PacketTooLongError(f"compressed packet does not end within its length {max_length}")
+
+	return packet_data
@@ -0,0 +1,198 @@
+
+import argparse
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Tuple
+
+from asyncraft.proto.protocol import Protocol
+
+__all__ = (
+	"ConnectScheduler", "ConnectStats", "main"
+)
+
+@dataclass(slots = True)
+class ConnectStats:
+	started: int = 0
+	succeeded: int = 0
+	failed: int = 0
+	# Seconds from the first connect attempt to the last finished one
+	elapsed: float = 0
+	# Seconds from opening the socket to LoginSuccess
+	latencies: List[float] = field(default_factory = list)
+
+	@property
+	def connects_per_second(self) -> float:
+		if self.elapsed <= 0:
+			return 0
+
+		return self.succeeded / self.elapsed
+
+	def latency_percentile(self, percentile: float) -> float:
+		""" Returns handshake latency percentile (0-100) in seconds
+		"""
+
+		if not self.latencies:
+			return 0
+
+		latencies = sorted(self.latencies)
+		index = round(percentile / 100 * (len(latencies) - 1))
+		return latencies[min(max(index, 0), len(latencies) - 1)]
+
+class ConnectScheduler:
+	""" Brings up many protocols with bounded concurrency and ramp rate
+
+		`max_concurrency` limits logins in progress at once,
+		`rate` limits started connects per second (None for no limit)
+	"""
+
+	def __init__(self,
+					max_concurrency: int = 100,
+					rate: float = None,
+					timeout: float = 30) -> None:
+		self._semaphore = asyncio.Semaphore(max_concurrency)
+		self._interval = 1 / rate if rate else 0
+		self._timeout = timeout
+
+		self._next_start = 0
+		self._first_start: float = None
+
+		self._stats = ConnectStats()
+
+		self._logger = logging.getLogger("proto")
+
+	@property
+	def stats(self) -> ConnectStats:
+		return self._stats
+
+	async def connect(self, protocol: Protocol, user_name: str) -> bool:
+		""" Connects and waits for login, returns whether it succeeded
+		"""
+
+		async with self._semaphore:
+			await self._wait_turn()
+
+			start_time = time.perf_counter()
+			if self._first_start is None:
+				self._first_start = start_time
+
+			self._stats.started += 1
+
+			try:
+				await asyncio.wait_for(self._connect(protocol, user_name), self._timeout)
+			except Exception as ex: # pylint: disable=broad-except
+				# One broken connect must not abort the others of connect_all
+				self._stats.failed += 1
+				self._logger.warning("Connect of %r failed: %r", user_name, ex)
+
+				protocol.close()
+				return False
+			finally:
+				self._stats.elapsed = time.perf_counter() - self._first_start
+
+			self._stats.succeeded += 1
+			self._stats.latencies.append(time.perf_counter() - start_time)
+
+			return True
+
+	async def connect_all(self, protocols: Iterable[Tuple[Protocol, str]]) -> ConnectStats:
+		""" Connects (protocol, user name) pairs, returns stats
+		"""
+
+		await asyncio.gather(*(self.connect(protocol, user_name)
+								for protocol, user_name in protocols))
+
+		return self._stats
+
+	async def _connect(self, protocol: Protocol, user_name: str) -> None:
+		await protocol.connect(user_name)
+		await protocol.wait_logged_in()
+
+	async def _wait_turn(self) -> None:
+		if self._interval == 0:
+			return
+
+		loop = asyncio.get_running_loop()
+
+		now = loop.time()
+		start = max(now, self._next_start)
+		self._next_start = start + self._interval
+
+		if start > now:
+			await asyncio.sleep(start - now)
+
+def _run_server(args: argparse.Namespace, ready: threading.Event, stop: threading.Event, result: Dict[str, Any]) -> None:
+	# Lazy import, the server is only needed by the benchmark
+	from asyncraft.proto.server import Server # pylint: disable=import-outside-toplevel
+
+	server_key = None
+	if args.encryption:
+		from asyncraft.proto.crypto import ServerKey # pylint: disable=import-outside-toplevel
+		server_key = ServerKey()
+
+	async def serve() -> None:
+		server = Server(args.proto_version,
+						compression_threshold = args.compression_threshold,
+						server_key = server_key)
+
+		listener = await server.serve("127.0.0.1", 0, backlog = args.clients)
+		result["port"] = listener.sockets[0].getsockname()[1]
+		ready.set()
+
+		while not stop.is_set():
+			await asyncio.sleep(0.05)
+
+		listener.close()
+
+	asyncio.run(serve())
+
+async def _connect_clients(args: argparse.Namespace, port: int) -> ConnectStats:
+	scheduler = ConnectScheduler(args.concurrency, args.rate, args.timeout)
+	protocols = [Protocol("127.0.0.1", port, args.proto_version) for _ in range(args.clients)]
+
+	try:
+		return await scheduler.connect_all((protocol, f"bot{index}") for index, protocol in enumerate(protocols))
+	finally:
+		for protocol in protocols:
+			protocol.close()
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description = "Connect rate and login latency against a local server")
+	parser.add_argument("--clients", type = int, default = 1000)
+	parser.add_argument("--concurrency", type = int, default = 100)
+	parser.add_argument("--rate", type = float, default = None, help = "connects started per second, no limit by default")
+	parser.add_argument("--timeout", type = float, default = 30)
+	parser.add_argument("--encryption", action = "store_true", help = "log in with RSA key exchange and encryption")
+	parser.add_argument("--compression-threshold", type = int, default = -1)
+	parser.add_argument("--proto-version", type = int, default = 760)
+	args = parser.parse_args()
+
+	logging.basicConfig(level = logging.WARNING)
+
+	ready = threading.Event()
+	stop = threading.Event()
+	result: Dict[str, Any] = {}
+
+	# Own loop so serving does not count towards client latency
+	server_thread = threading.Thread(target = _run_server, args = (args, ready, stop, result), daemon = True)
+	server_thread.start()
+	ready.wait()
+
+	try:
+		stats = asyncio.run(_connect_clients(args, result["port"]))
+	finally:
+		stop.set()
+		server_thread.join()
+
+	print(f"{stats.succeeded} of {stats.started} connects in {stats.elapsed:.2f} s, "
+			f"{stats.connects_per_second:.0f} connects/s, latency "
+			f"p50 {stats.latency_percentile(50) * 1000:.1f} ms, "
+			f"p99 {stats.latency_percentile(99) * 1000:.1f} ms")
+
+	if stats.failed:
+		raise SystemExit(1)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,118 @@
+
+from collections import OrderedDict
+from typing import FrozenSet, Iterable, Optional, Tuple, Type
+
+from asyncraft.proto.utils import PacketDirection, ProtocolState
+from asyncraft.proto.packet import Packet, freeze_packet
+
+__all__ = (
+	"DecodeCache",
+)
+
+# Direction, state, whether the frame has the compressed length prefix and its bytes
+CacheKey = Tuple[PacketDirection, ProtocolState, bool, bytes]
+
+class DecodeCache:
+	""" Decoded packets shared by connections receiving byte-identical frames
+
+		Frames are looked up by their decrypted bytes once the packet id is known,
+		a hit skips inflating the rest of the frame and decoding. Lookups hash
+		the frame with the builtin bytes hash and compare it in full, equal hashes
+		never alias. Only frames of `packet_classes` are looked up and stored,
+		frames shorter than `min_frame_size` are not looked up at all. `max_bytes` bounds the total
+		size of cached frames, least recently used ones are evicted first.
+
+		Cached packets are frozen with freeze_packet(), compiled ones included.
+		Setting a field raises FrozenInstanceError and getters return values
+		that can not be changed in place. Change a copy_packet() copy instead
+	"""
+
+	def __init__(self,
+					packet_classes: Iterable[Type[Packet]],
+					max_bytes: int = 64 << 20,
+					min_frame_size: int = 256) -> None:
+		self._packet_classes = frozenset(packet_classes)
+		self._max_bytes = max_bytes
+		self._min_frame_size = min_frame_size
+
+		self._entries: "OrderedDict[CacheKey, Packet]" = OrderedDict()
+		self._size = 0
+
+		self._hits = 0
+		self._misses = 0
+		self._evictions = 0
+
+	@property
+	def packet_classes(self) -> FrozenSet[Type[Packet]]:
+		return self._packet_classes
+
+	@property
+	def size(self) -> int:
+		""" Total size of cached frames
+		"""
+
+		return self._size
+
+	@property
+	def hits(self) -> int:
+		return self._hits
+
+	@property
+	def misses(self) -> int:
+		return self._misses
+
+	@property
+	def evictions(self) -> int:
+		return self._evictions
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+	def key(self,
+			direction: PacketDirection,
+			state: ProtocolState,
+			compressed: bool,
+			frame: memoryview) -> Optional[CacheKey]:
+		""" Returns lookup key of frame, None if the frame is too short to be worth it
+
+			Call only for frames of packet_classes, the frame is copied
+		"""
+
+		if len(frame) < self._min_frame_size:
+			return None
+
+		# Dicts compare views with bytes far slower than copying the frame once
+		return (direction, state, compressed, bytes(frame))
+
+	def get(self, key: CacheKey) -> Optional[Packet]:
+		packet = self._entries.get(key)
+		if packet is None:
+			self._misses += 1
+			return None
+
+		self._entries.move_to_end(key)
+		self._hits += 1
+
+		return packet
+
+	def put(self, key: CacheKey, packet: Packet) -> None:
+		""" Stores decoded packet of frame from key() and freezes it
+		"""
+
+		size = len(key[3])
+		if size > self._max_bytes or key in self._entries:
+			return
+
+		freeze_packet(packet)
+
+		self._entries[key] = packet
+		self._size += size
+
+		while self._size > self._max_bytes:
+			old_key, _ = self._entries.popitem(last = False)
+			self._size -= len(old_key[3])
+			self._evictions += 1
+
+	def clear(self) -> None:
+		self._entries.clear()
+		self._size = 0
@@ -0,0 +1,152 @@
+
+import asyncio
+import logging
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional, Tuple, Type, Union
+
+from asyncraft.proto.packet import Packet
+from asyncraft.proto.connection import RawPacket
+from asyncraft.streams import BufferReader
+
+__all__ = (
+	"DecodePool",
+)
+
+# Pickled packet, name of shared memory holding out-of-band buffers and their sizes
+DecodeResult = Tuple[bytes, Optional[str], List[int]]
+
+def _decode_in_worker(packet_class: Type[Packet], shm_name: str, size: int) -> DecodeResult:
+	shm = SharedMemory(shm_name)
+	try:
+		view = shm.buf[:size]
+		try:
+			packet = packet_class.read_from_buffer(BufferReader(view))
+		finally:
+			view.release()
+	finally:
+		shm.close()
+
+	# Large buffers (NumPy arrays, PickleBuffer) go through shared memory
+	buffers: List[pickle.PickleBuffer] = []
+	data = pickle.dumps(packet, protocol = 5, buffer_callback = buffers.append)
+	if not buffers:
+		return data, None, []
+
+	raw_buffers = [buffer.raw() for buffer in buffers]
+	sizes = [raw_buffer.nbytes for raw_buffer in raw_buffers]
+
+	result_shm = SharedMemory(create = True, size = max(sum(sizes), 1))
+	try:
+		offset = 0
+		for raw_buffer, buffer_size in zip(raw_buffers, sizes):
+			result_shm.buf[offset:offset + buffer_size] = raw_buffer
+			offset += buffer_size
+
+		return data, result_shm.name, sizes
+	finally:
+		result_shm.close()
+
+def _load_result(data: bytes, shm_name: Optional[str], sizes: List[int]) -> Packet:
+	if shm_name is None:
+		return pickle.loads(data)
+
+	shm = SharedMemory(shm_name)
+	try:
+		buffers = []
+
+		offset = 0
+		for size in sizes:
+			buffers.append(bytearray(shm.buf[offset:offset + size]))
+			offset += size
+	finally:
+		shm.close()
+		shm.unlink()
+
+	return pickle.loads(data, buffers = buffers)
+
+def _discard_result(future: asyncio.Future) -> None:
+	# Result of a decode whose caller went away, shared memory would outlive the process otherwise
+	if future.cancelled() or future.exception() is not None:
+		return
+
+	_, shm_name, _ = future.result()
+	if shm_name is None:
+		return
+
+	shm = SharedMemory(shm_name)
+	shm.close()
+	shm.unlink()
+
+class DecodePool:
+	""" Decodes packets with `offload_decode` set in worker processes
+
+		Frames are passed to workers through shared memory,
+		large buffers of decoded packets are passed back the same way.
+		Packets failing to decode are logged and dropped as Connection does
+	"""
+
+	_logger = logging.getLogger("proto")
+
+	def __init__(self, max_workers: int = None, min_frame_size: int = 4096) -> None:
+		self._executor = ProcessPoolExecutor(max_workers)
+		# Smaller frames are cheaper to decode than to hand over
+		self._min_frame_size = min_frame_size
+
+	def submit(self, raw_packet: RawPacket) -> Union[Packet, asyncio.Future, None]:
+		""" Decodes small packets in place, schedules decoding of large ones
+
+			None or a future resolving to None means the packet failed to decode
+		"""
+
+		if len(raw_packet.data) < self._min_frame_size:
+			try:
+				return raw_packet.packet_class.read_from_buffer(BufferReader(raw_packet.data))
+			except Exception: # pylint: disable=broad-except
+				self._log_failure(raw_packet)
+				return None
+
+		return asyncio.ensure_future(self._decode(raw_packet))
+
+	async def _decode(self, raw_packet: RawPacket) -> Optional[Packet]:
+		size = len(raw_packet.data)
+
+		shm = SharedMemory(create = True, size = max(size, 1))
+		try:
+			shm.buf[:size] = raw_packet.data
+
+			loop = asyncio.get_running_loop()
+			future = loop.run_in_executor(self._executor,
+											_decode_in_worker,
+											raw_packet.packet_class,
+											shm.name,
+											size)
+			try:
+				# Shielded so a result arriving after cancelling is still seen and freed
+				result = await asyncio.shield(future)
+			except asyncio.CancelledError:
+				future.add_done_callback(_discard_result)
+				raise
+			except Exception: # pylint: disable=broad-except
+				self._log_failure(raw_packet)
+				return None
+		finally:
+			shm.close()
+			shm.unlink()
+
+		try:
+			return _load_result(*result)
+		except Exception: # pylint: disable=broad-except
+			self._log_failure(raw_packet)
+			return None
+
+	def _log_failure(self, raw_packet: RawPacket) -> None:
+		packet_class = raw_packet.packet_class
+		self._logger.exception("Failed to decode packet id=0x%02x, state=%s, length=%d",
+								packet_class.ID,
+								packet_class.state.name,
+								len(raw_packet.data))
+
+	def shutdown(self, wait: bool = True) -> None:
+		self._executor.shutdown(wait)
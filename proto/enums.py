@@ -0,0 +1,12 @@
+
+from enum import IntEnum
+
+__all__ = (
+	"NextHandshakeState",
+)
+
+# Values of packet fields used by hand-written code, re-exported by generated packet modules
+
+class NextHandshakeState(IntEnum):
+	STATUS = 1
+	LOGIN = 2
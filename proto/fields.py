@@ -1,354 +1,501 @@
-
-import struct
-import json
-from dataclasses import dataclass
-from typing import Any, Dict, Tuple, Type, TypeVar
-from enum import IntEnum
-
-from asyncraft.varint import VarInt, VarLong
-from asyncraft.streams import IStreamWriter, IStreamReader, ByteArrayStreamWriter
-from asyncraft.utils import unsigned_to_signed
-
-__all__ = (
-	"Bool", "Byte", "UByte",
-	"Short", "UShort", "Int",
-	"UInt", "Long", "ULong",
-	"Float", "Double", "String",
-	"VarIntField", "VarLongField",
-	"Position", "Angle", "ChatColor",
-	"ChatComponent", "ChatString", "InvalidIdentifierError",
-	"Identifier"
-)
-
-# pylint: disable=abstract-method,bad-staticmethod-argument
-
-FieldUnderlyingType = TypeVar("FieldUnderlyingType")
-PacketFieldT = TypeVar("PacketFieldT", bound = "PacketField")
-class PacketField:
-	def __init__(self, *args, **kwargs) -> None:
-		raise NotImplementedError()
-
-	def setter(self, value: FieldUnderlyingType) -> None:
-		raise NotImplementedError()
-
-	def getter(self) -> FieldUnderlyingType:
-		raise NotImplementedError()
-
-	async def read_from(self: PacketFieldT, stream: IStreamReader) -> None:
-		raise NotImplementedError()
-
-	@classmethod
-	async def create_from(cls, stream: IStreamReader) -> PacketFieldT:
-		""" Creates field from stream
-		"""
-
-		field = cls.__new__(cls)
-		await cls.read_from(field, stream)
-		return field
-
-	def write_to(self, stream: IStreamWriter) -> None:
-		raise NotImplementedError
-
-	def to_bytes(self) -> bytes:
-		buffer = bytearray()
-		stream = ByteArrayStreamWriter(buffer)
-		self.write_to(stream)
-
-		return bytes(buffer)
-
-def _auto_pack(fmt: str):
-	# All data sent over the network (except for VarInt and VarLong) is big-endian
-	fmt = "!" + fmt
-
-	def decorator(cls) -> Type[PacketField]:
-		async def custom_read_from(self, stream: IStreamReader) -> None:
-			size = struct.calcsize(fmt)
-			self.value = struct.unpack(fmt, await stream.read_exactly(size))[0]
-
-		def custom_write_to(self, stream: IStreamWriter) -> None:
-			data = struct.pack(fmt, self.value)
-			stream.write(data)
-
-		setattr(cls, "read_from", custom_read_from)
-		setattr(cls, "write_to", custom_write_to)
-
-		return cls
-
-	return decorator
-
-def _auto_getset(cls):
-	def custom_setter(self, value: FieldUnderlyingType) -> None:
-		self.value = value
-
-	def custom_getter(self) -> FieldUnderlyingType:
-		return self.value
-
-	setattr(cls, "setter", custom_setter)
-	setattr(cls, "getter", custom_getter)
-
-	return cls
-
-@dataclass(slots = True)
-@_auto_pack("?")
-@_auto_getset
-class Bool(PacketField):
-	value: bool = 0
-
-@dataclass(slots = True)
-@_auto_pack("b")
-@_auto_getset
-class Byte(PacketField):
-	value: int = 0
-
-@dataclass(slots = True)
-@_auto_pack("B")
-@_auto_getset
-class UByte(PacketField):
-	value: int = 0
-
-@dataclass(slots = True)
-@_auto_pack("h")
-@_auto_getset
-class Short(PacketField):
-	value: int = 0
-
-@dataclass(slots = True)
-@_auto_pack("H")
-@_auto_getset
-class UShort(PacketField):
-	value: int = 0
-
-@dataclass(slots = True)
-@_auto_pack("i")
-@_auto_getset
-class Int(PacketField):
-	value: int = 0
-
-@dataclass(slots = True)
-@_auto_pack("I")
-@_auto_getset
-class UInt(PacketField):
-	value: int = 0
-
-@dataclass(slots = True)
-@_auto_pack("q")
-@_auto_getset
-class Long(PacketField):
-	value: int = 0
-
-@dataclass(slots = True)
-@_auto_pack("Q")
-@_auto_getset
-class ULong(PacketField):
-	value: int = 0
-
-@dataclass(slots = True)
-@_auto_pack("f")
-@_auto_getset
-class Float(PacketField):
-	value: float = 0
-
-@dataclass(slots = True)
-@_auto_pack("d")
-@_auto_getset
-class Double(PacketField):
-	value: float = 0
-
-@dataclass(slots = True)
-@_auto_getset
-class ByteArray(PacketField):
-	value: bytearray = bytearray()
-
-@dataclass(slots = True)
-@_auto_getset
-class String(PacketField):
-	value: str = ""
-
-	async def read_from(self: PacketField, stream: IStreamReader) -> None:
-		length = await VarInt.read_from(stream)
-		self.value = (await stream.read_exactly(length)).decode("utf-8")
-
-	def write_to(self, stream: IStreamWriter) -> None:
-		length = len(self.value.encode("utf-8"))
-		VarInt.write_to(length, stream)
-		stream.write(self.value.encode("utf-8"))
-
-@dataclass(slots = True)
-@_auto_getset
-class VarIntField(PacketField):
-	value: int = 0
-
-	async def read_from(self: PacketField, stream: IStreamReader) -> None:
-		self.value = await VarInt.read_from(stream)
-
-	def write_to(self, stream: IStreamWriter) -> None:
-		VarInt.write_to(self.value, stream)
-
-@dataclass(slots = True)
-@_auto_getset
-class VarLongField(PacketField):
-	value: int = 0
-
-	async def read_from(self: PacketField, stream: IStreamReader) -> None:
-		self.value = await VarLong.read_from(stream)
-
-	def write_to(self, stream: IStreamWriter) -> None:
-		VarLong.write_to(self.value, stream)
-
-@dataclass(slots = True)
-@_auto_getset
-class VarByteArray(PacketField):
-	value: bytearray
-
-	async def read_from(self: PacketField, stream: IStreamReader) -> None:
-		length = await VarInt.read_from(stream)
-		self.value = await stream.read_exactly(length)
-
-	def write_to(self, stream: IStreamWriter) -> None:
-		VarInt.write_to(self.value, stream)
-
-@dataclass(slots = True)
-class Position(PacketField):
-	x: int = 0
-	y: int = 0
-	z: int = 0
-
-	def setter(self, value: Tuple[int, int, int]) -> None:
-		self.x, self.y, self.z = value
-
-	def getter(self):
-		return self
-
-	async def read_from(self: PacketField, stream: IStreamReader) -> None:
-		xyz = struct.unpack_from("!Q", await stream.read_exactly(8))
-
-		self.x = unsigned_to_signed(xyz >> 38, 26)
-		self.y = unsigned_to_signed(xyz & 0xFFF, 12)
-		self.z = unsigned_to_signed(xyz << 26 >> 38, 26)
-
-	def write_to(self, stream: IStreamWriter) -> None:
-		long = (self.x & 0x3FFFFFF) << 38	|	\
-				(self.z & 0x3FFFFFF) << 12	|	\
-				(self.y & 0xFFF)
-
-		data = struct.pack("!q", long)
-		stream.write(data)
-
-Angle = Byte
-
-class ChatColor(IntEnum):
-	BLACK = 0
-	DARK_BLUE = 1
-	DARK_GREEN = 2
-	DARK_CYAN = 3
-	DARK_RED = 4
-	PURPLE = 5
-	GOLD = 6
-	GRAY = 7
-	DARK_GRAY = 8
-	BLUE = 9
-	BRIGHT_GREEN = 0xA
-	CYAN = 0xB
-	RED = 0xC
-	PINK = 0xD
-	YELLOW = 0xE
-	WHITE = 0xF
-
-	def to_str(self) -> str:
-		return "§" + hex(self.value)[3]
-
-class ChatComponent:
-	__slots__ = ("_body",)
-
-	def __init__(self) -> None:
-		self._body: Dict[str, ChatComponent] = {}
-
-	@staticmethod
-	def bool_to_string(b) -> str:
-		return "true" if b else "false"
-
-	def set_text(self, text: str) -> None:
-		self._body["text"] = text
-
-	def set_bold(self, enabled: bool) -> None:
-		self._body["bold"] = self.bool_to_string(enabled)
-
-	def set_italic(self, enabled: bool) -> None:
-		self._body["italic"] = self.bool_to_string(enabled)
-
-	def set_underlined(self, enabled: bool) -> None:
-		self._body["underlined"] = self.bool_to_string(enabled)
-
-	def set_strikethrough(self, enabled: bool) -> None:
-		self._body["strikethrough"] = self.bool_to_string(enabled)
-
-	def set_obfuscated(self, enabled: bool) -> None:
-		self._body["obfuscated"] = self.bool_to_string(enabled)
-
-	def set_color(self, color: ChatColor) -> None:
-		self._body["color"] = color.to_str()
-
-	def add_component(self, component) -> None:
-		if "extra" not in self._body:
-			self._body["extra"] = []
-
-		self._body["extra"].append(component)
-
-	def to_json(self) -> str:
-		return json.dumps(self._body)
-
-	def __repr__(self) -> str:
-		return self.to_json()
-
-	def __str__(self) -> str:
-		return self.to_json()
-
-@dataclass(slots = True)
-class ChatString(PacketField):
-	root_component: ChatComponent = ChatComponent()
-
-	def setter(self, value: ChatComponent) -> None:
-		self.root_component = value
-
-	def getter(self) -> ChatComponent:
-		return self.root_component
-
-	# TODO
-	async def read_from(self: PacketField, stream: IStreamReader) -> None:
-		raise NotImplementedError()
-
-	def write_to(self, stream: IStreamWriter) -> None:
-		json_data = self.root_component.to_json().encode("utf-8")
-		VarInt.write_to(len(json_data), stream)
-		stream.write(json_data)
-
-class InvalidIdentifierError(ValueError):
-	pass
-
-@_auto_getset
-class Identifier(PacketField):
-	__slots__ = ("_value",)
-
-	# pylint: disable=super-init-not-called
-	def __init__(self) -> None:
-		self._value = ""
-
-	@property
-	def value(self) -> str:
-		return self._value
-
-	@value.setter
-	def value(self, identifier) -> None:
-		valid_chars = "01​​234​5​6​78​9abcdefghijklmnopqrstuvwxyz-_"
-		if any([char not in valid_chars for char in identifier]):
-			raise InvalidIdentifierError()
-
-		self._value = identifier
-
-	async def read_from(self: PacketField, stream: IStreamReader) -> None:
-		length = await VarInt.read_from(stream)
-		self._value = await stream.read_exactly(length)
-
-	def write_to(self, stream: IStreamWriter) -> None:
-		VarInt.write_to(len(self.value), stream)
-		stream.write(self.value.encode("utf-8"))
+
+import copy
+import struct
+import json
+import dataclasses
+from dataclasses import dataclass
+from typing import Any, Dict, NamedTuple, Tuple, Type, TypeVar
+from enum import IntEnum
+
+from asyncraft.varint import VarInt, VarLong
+from asyncraft.streams import IStreamWriter, IStreamReader, ByteArrayStreamWriter, BufferReader
+from asyncraft.utils import unsigned_to_signed
+
+__all__ = (
+	"Bool", "Byte", "UByte",
+	"Short", "UShort", "Int",
+	"UInt", "Long", "ULong",
+	"Float", "Double", "String",
+	"VarIntField", "VarLongField",
+	"Position", "BlockPosition", "Angle", "ChatColor",
+	"ChatComponent", "ChatString", "InvalidIdentifierError",
+	"Identifier", "LengthLimitError", "FieldTooLongError"
+)
+
+# pylint: disable=abstract-method,bad-staticmethod-argument
+
+FieldUnderlyingType = TypeVar("FieldUnderlyingType")
+PacketFieldT = TypeVar("PacketFieldT", bound = "PacketField")
+class LengthLimitError(ValueError):
+	pass
+
+class FieldTooLongError(LengthLimitError):
+	pass
+
+class PacketField:
+	# Set for fixed-width fields packed with a single struct format
+	STRUCT: struct.Struct = None
+	# Largest length prefix accepted by length-prefixed fields,
+	# override on the class or a subclass to change the limit
+	MAX_LENGTH: int = None
+
+	@classmethod
+	def check_length(cls, length: int) -> int:
+		""" Returns length read from the wire, raises FieldTooLongError before anything is allocated for it
+		"""
+
+		if length < 0 or length > cls.MAX_LENGTH:
+			raise FieldTooLongError(f"{cls.__name__} length {length} outside of 0-{cls.MAX_LENGTH}")
+
+		return length
+
+	def __init__(self, *args, **kwargs) -> None:
+		raise NotImplementedError()
+
+	def setter(self, value: FieldUnderlyingType) -> None:
+		raise NotImplementedError()
+
+	def getter(self) -> FieldUnderlyingType:
+		raise NotImplementedError()
+
+	def frozen(self: PacketFieldT) -> PacketFieldT:
+		""" Returns field whose getter gives values that can not be changed in place
+
+			Fields of immutable values return themselves
+		"""
+
+		return self
+
+	async def read_from(self: PacketFieldT, stream: IStreamReader) -> None:
+		raise NotImplementedError()
+
+	@classmethod
+	async def create_from(cls, stream: IStreamReader) -> PacketFieldT:
+		""" Creates field from stream
+		"""
+
+		field = cls.__new__(cls)
+		await cls.read_from(field, stream)
+		return field
+
+	def read_from_buffer(self: PacketFieldT, reader: BufferReader) -> None:
+		raise NotImplementedError()
+
+	@classmethod
+	def create_from_buffer(cls, reader: BufferReader) -> PacketFieldT:
+		""" Creates field from in-memory buffer
+		"""
+
+		field = cls.__new__(cls)
+		cls.read_from_buffer(field, reader)
+		return field
+
+	def write_to(self, stream: IStreamWriter) -> None:
+		raise NotImplementedError
+
+	def to_bytes(self) -> bytes:
+		buffer = bytearray()
+		stream = ByteArrayStreamWriter(buffer)
+		self.write_to(stream)
+
+		return bytes(buffer)
+
+def _auto_pack(fmt: str):
+	# All data sent over the network (except for VarInt and VarLong) is big-endian
+	fmt = struct.Struct("!" + fmt)
+
+	def decorator(cls) -> Type[PacketField]:
+		async def custom_read_from(self, stream: IStreamReader) -> None:
+			self.value = fmt.unpack(await stream.read_exactly(fmt.size))[0]
+
+		def custom_read_from_buffer(self, reader: BufferReader) -> None:
+			self.value = reader.unpack(fmt)[0]
+
+		def custom_write_to(self, stream: IStreamWriter) -> None:
+			data = fmt.pack(self.value)
+			stream.write(data)
+
+		setattr(cls, "STRUCT", fmt)
+		setattr(cls, "read_from", custom_read_from)
+		setattr(cls, "read_from_buffer", custom_read_from_buffer)
+		setattr(cls, "write_to", custom_write_to)
+
+		return cls
+
+	return decorator
+
+def _auto_getset(cls):
+	def custom_setter(self, value: FieldUnderlyingType) -> None:
+		self.value = value
+
+	def custom_getter(self) -> FieldUnderlyingType:
+		return self.value
+
+	setattr(cls, "setter", custom_setter)
+	setattr(cls, "getter", custom_getter)
+
+	return cls
+
+@dataclass(slots = True)
+@_auto_pack("?")
+@_auto_getset
+class Bool(PacketField):
+	value: bool = 0
+
+@dataclass(slots = True)
+@_auto_pack("b")
+@_auto_getset
+class Byte(PacketField):
+	value: int = 0
+
+@dataclass(slots = True)
+@_auto_pack("B")
+@_auto_getset
+class UByte(PacketField):
+	value: int = 0
+
+@dataclass(slots = True)
+@_auto_pack("h")
+@_auto_getset
+class Short(PacketField):
+	value: int = 0
+
+@dataclass(slots = True)
+@_auto_pack("H")
+@_auto_getset
+class UShort(PacketField):
+	value: int = 0
+
+@dataclass(slots = True)
+@_auto_pack("i")
+@_auto_getset
+class Int(PacketField):
+	value: int = 0
+
+@dataclass(slots = True)
+@_auto_pack("I")
+@_auto_getset
+class UInt(PacketField):
+	value: int = 0
+
+@dataclass(slots = True)
+@_auto_pack("q")
+@_auto_getset
+class Long(PacketField):
+	value: int = 0
+
+@dataclass(slots = True)
+@_auto_pack("Q")
+@_auto_getset
+class ULong(PacketField):
+	value: int = 0
+
+@dataclass(slots = True)
+@_auto_pack("f")
+@_auto_getset
+class Float(PacketField):
+	value: float = 0
+
+@dataclass(slots = True)
+@_auto_pack("d")
+@_auto_getset
+class Double(PacketField):
+	value: float = 0
+
+@dataclass(slots = True)
+@_auto_getset
+class ByteArray(PacketField):
+	value: bytearray = dataclasses.field(default_factory = bytearray)
+
+	def frozen(self) -> "ByteArray":
+		return ByteArray(bytes(self.value))
+
+@dataclass(slots = True)
+@_auto_getset
+class String(PacketField):
+	value: str = ""
+
+	# 32767 UTF-16 code units take at most three bytes each
+	MAX_LENGTH = 32767 * 3
+
+	async def read_from(self: PacketField, stream: IStreamReader) -> None:
+		length = self.check_length(await VarInt.read_from(stream))
+		self.value = (await stream.read_exactly(length)).decode("utf-8")
+
+	def read_from_buffer(self: PacketField, reader: BufferReader) -> None:
+		length = self.check_length(VarInt.read_from_buffer(reader))
+		self.value = reader.read_exactly(length).decode("utf-8")
+
+	def write_to(self, stream: IStreamWriter) -> None:
+		length = len(self.value.encode("utf-8"))
+		VarInt.write_to(length, stream)
+		stream.write(self.value.encode("utf-8"))
+
+@dataclass(slots = True)
+@_auto_getset
+class VarIntField(PacketField):
+	value: int = 0
+
+	async def read_from(self: PacketField, stream: IStreamReader) -> None:
+		self.value = await VarInt.read_from(stream)
+
+	def read_from_buffer(self: PacketField, reader: BufferReader) -> None:
+		self.value = VarInt.read_from_buffer(reader)
+
+	def write_to(self, stream: IStreamWriter) -> None:
+		VarInt.write_to(self.value, stream)
+
+@dataclass(slots = True)
+@_auto_getset
+class VarLongField(PacketField):
+	value: int = 0
+
+	async def read_from(self: PacketField, stream: IStreamReader) -> None:
+		self.value = await VarLong.read_from(stream)
+
+	def read_from_buffer(self: PacketField, reader: BufferReader) -> None:
+		self.value = VarLong.read_from_buffer(reader)
+
+	def write_to(self, stream: IStreamWriter) -> None:
+		VarLong.write_to(self.value, stream)
+
+@dataclass(slots = True)
+@_auto_getset
+class VarByteArray(PacketField):
+	value: bytearray
+
+	# Largest uncompressed packet vanilla servers accept
+	MAX_LENGTH = 1 << 23
+
+	async def read_from(self: PacketField, stream: IStreamReader) -> None:
+		length = self.check_length(await VarInt.read_from(stream))
+		self.value = await stream.read_exactly(length)
+
+	def read_from_buffer(self: PacketField, reader: BufferReader) -> None:
+		length = self.check_length(VarInt.read_from_buffer(reader))
+		self.value = reader.read_exactly(length)
+
+	def write_to(self, stream: IStreamWriter) -> None:
+		VarInt.write_to(len(self.value), stream)
+		stream.write(bytes(self.value))
+
+	def frozen(self) -> "VarByteArray":
+		return VarByteArray(bytes(self.value))
+
+_POSITION_STRUCT = struct.Struct("!Q")
+
+class BlockPosition(NamedTuple):
+	""" Position of frozen packets
+	"""
+
+	x: int
+	y: int
+	z: int
+
+@dataclass(slots = True)
+class Position(PacketField):
+	x: int = 0
+	y: int = 0
+	z: int = 0
+
+	def setter(self, value: Tuple[int, int, int]) -> None:
+		self.x, self.y, self.z = value
+
+	def getter(self):
+		return self
+
+	async def read_from(self: PacketField, stream: IStreamReader) -> None:
+		self._unpack(struct.unpack("!Q", await stream.read_exactly(8))[0])
+
+	def read_from_buffer(self: PacketField, reader: BufferReader) -> None:
+		self._unpack(reader.unpack(_POSITION_STRUCT)[0])
+
+	def _unpack(self, xyz: int) -> None:
+		self.x = unsigned_to_signed(xyz >> 38, 26)
+		self.y = unsigned_to_signed(xyz & 0xFFF, 12)
+		self.z = unsigned_to_signed(xyz >> 12 & 0x3FFFFFF, 26)
+
+	def write_to(self, stream: IStreamWriter) -> None:
+		long = (self.x & 0x3FFFFFF) << 38	|	\
+				(self.z & 0x3FFFFFF) << 12	|	\
+				(self.y & 0xFFF)
+
+		stream.write(_POSITION_STRUCT.pack(long))
+
+	def frozen(self) -> "Position":
+		return _FrozenPosition(self.x, self.y, self.z)
+
+class _FrozenPosition(Position):
+	__slots__ = ()
+
+	def getter(self) -> BlockPosition:
+		return BlockPosition(self.x, self.y, self.z)
+
+	def __deepcopy__(self, memo: Dict[int, Any]) -> Position:
+		# Copies of frozen packets may be changed again
+		return Position(self.x, self.y, self.z)
+
+Angle = Byte
+
+class ChatColor(IntEnum):
+	BLACK = 0
+	DARK_BLUE = 1
+	DARK_GREEN = 2
+	DARK_CYAN = 3
+	DARK_RED = 4
+	PURPLE = 5
+	GOLD = 6
+	GRAY = 7
+	DARK_GRAY = 8
+	BLUE = 9
+	BRIGHT_GREEN = 0xA
+	CYAN = 0xB
+	RED = 0xC
+	PINK = 0xD
+	YELLOW = 0xE
+	WHITE = 0xF
+
+	def to_str(self) -> str:
+		return "§" + format(self.value, "x")
+
+class ChatComponent:
+	__slots__ = ("_body",)
+
+	def __init__(self) -> None:
+		self._body: Dict[str, ChatComponent] = {}
+
+	@staticmethod
+	def bool_to_string(b) -> str:
+		return "true" if b else "false"
+
+	def set_text(self, text: str) -> None:
+		self._body["text"] = text
+
+	def set_bold(self, enabled: bool) -> None:
+		self._body["bold"] = self.bool_to_string(enabled)
+
+	def set_italic(self, enabled: bool) -> None:
+		self._body["italic"] = self.bool_to_string(enabled)
+
+	def set_underlined(self, enabled: bool) -> None:
+		self._body["underlined"] = self.bool_to_string(enabled)
+
+	def set_strikethrough(self, enabled: bool) -> None:
+		self._body["strikethrough"] = self.bool_to_string(enabled)
+
+	def set_obfuscated(self, enabled: bool) -> None:
+		self._body["obfuscated"] = self.bool_to_string(enabled)
+
+	def set_color(self, color: ChatColor) -> None:
+		self._body["color"] = color.to_str()
+
+	def add_component(self, component) -> None:
+		if "extra" not in self._body:
+			self._body["extra"] = []
+
+		self._body["extra"].append(component)
+
+	def to_json(self) -> str:
+		return json.dumps(self._body)
+
+	@classmethod
+	def from_json(cls, data: str) -> "ChatComponent":
+		""" Parses chat JSON, children are kept as parsed
+
+			Plain strings become text components, lists become children of an empty one
+		"""
+
+		body = json.loads(data)
+		if isinstance(body, str):
+			body = {"text": body}
+		elif isinstance(body, list):
+			body = {"text": "", "extra": body}
+		elif not isinstance(body, dict):
+			raise ValueError(f"Chat component must be an object, not {type(body).__name__}")
+
+		component = cls()
+		component._body = body
+
+		return component
+
+	def __repr__(self) -> str:
+		return self.to_json()
+
+	def __str__(self) -> str:
+		return self.to_json()
+
+@dataclass(slots = True)
+class ChatString(PacketField):
+	root_component: ChatComponent = dataclasses.field(default_factory = ChatComponent)
+
+	# 262144 UTF-16 code units take at most three bytes each
+	MAX_LENGTH = 262144 * 3
+
+	def setter(self, value: ChatComponent) -> None:
+		self.root_component = value
+
+	def getter(self) -> ChatComponent:
+		return self.root_component
+
+	async def read_from(self: PacketField, stream: IStreamReader) -> None:
+		length = self.check_length(await VarInt.read_from(stream))
+		self.root_component = ChatComponent.from_json((await stream.read_exactly(length)).decode("utf-8"))
+
+	def read_from_buffer(self: PacketField, reader: BufferReader) -> None:
+		length = self.check_length(VarInt.read_from_buffer(reader))
+		self.root_component = ChatComponent.from_json(reader.read_exactly(length).decode("utf-8"))
+
+	def write_to(self, stream: IStreamWriter) -> None:
+		json_data = self.root_component.to_json().encode("utf-8")
+		VarInt.write_to(len(json_data), stream)
+		stream.write(json_data)
+
+	def frozen(self) -> "ChatString":
+		return _FrozenChatString(self.root_component)
+
+class _FrozenChatString(ChatString):
+	__slots__ = ()
+
+	def getter(self) -> ChatComponent:
+		# Components can not be frozen, every caller gets its own
+		return copy.deepcopy(self.root_component)
+
+	def __deepcopy__(self, memo: Dict[int, Any]) -> ChatString:
+		return ChatString(copy.deepcopy(self.root_component, memo))
+
+class InvalidIdentifierError(ValueError):
+	pass
+
+@_auto_getset
+class Identifier(PacketField):
+	__slots__ = ("_value",)
+
+	MAX_LENGTH = 32767
+
+	# pylint: disable=super-init-not-called
+	def __init__(self) -> None:
+		self._value = ""
+
+	@property
+	def value(self) -> str:
+		return self._value
+
+	@value.setter
+	def value(self, identifier) -> None:
+		valid_chars = "01​​234​5​6​78​9abcdefghijklmnopqrstuvwxyz-_"
+		if any([char not in valid_chars for char in identifier]):
+			raise InvalidIdentifierError()
+
+		self._value = identifier
+
+	async def read_from(self: PacketField, stream: IStreamReader) -> None:
+		length = self.check_length(await VarInt.read_from(stream))
+		self._value = (await stream.read_exactly(length)).decode("utf-8")
+
+	def read_from_buffer(self: PacketField, reader: BufferReader) -> None:
+		length = self.check_length(VarInt.read_from_buffer(reader))
+		self._value = reader.read_exactly(length).decode("utf-8")
+
+	def write_to(self, stream: IStreamWriter) -> None:
+		VarInt.write_to(len(self.value), stream)
+		stream.write(self.value.encode("utf-8"))
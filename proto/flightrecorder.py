@@ -0,0 +1,177 @@
+
+import argparse
+import importlib
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+from asyncraft.proto.utils import PacketDirection, ProtocolState
+
+if TYPE_CHECKING:
+	from asyncraft.proto.packet import Packet
+
+__all__ = (
+	"FlightRecorder", "FrameRecord", "main"
+)
+
+@dataclass(slots = True)
+class FrameRecord:
+	# time.monotonic() when the frame was encoded or decoded
+	timestamp: float
+	direction: PacketDirection
+	state: ProtocolState
+	packet_id: int
+	length: int
+	# Leading bytes of the decrypted and decompressed packet, if sampled
+	data: Optional[bytes] = None
+
+	def __str__(self) -> str:
+		text = f"{self.timestamp:.6f} {self.direction.name} {self.state.name} " \
+				f"id=0x{self.packet_id:02x} length={self.length}"
+
+		if self.data is not None:
+			text += f" data={self.data.hex()}"
+
+		return text
+
+class FlightRecorder:
+	""" Fixed-size ring of metadata of the most recent frames
+
+		Cheap enough to leave on, recording a frame stores a single tuple.
+		Every `sample_every`-th frame also keeps its first `sample_bytes` bytes
+	"""
+
+	def __init__(self,
+					capacity: int = 256,
+					sample_bytes: int = 0,
+					sample_every: int = 1) -> None:
+		if capacity <= 0:
+			raise ValueError("Capacity must be positive")
+
+		self._capacity = capacity
+		self._sample_bytes = sample_bytes
+		self._sample_every = sample_every
+
+		self._entries: List[tuple] = [None] * capacity
+		# Number of frames recorded so far
+		self._count = 0
+
+	@property
+	def capacity(self) -> int:
+		return self._capacity
+
+	@property
+	def count(self) -> int:
+		return self._count
+
+	def record(self,
+				direction: PacketDirection,
+				state: ProtocolState,
+				packet_id: int,
+				length: int,
+				data: bytes = None,
+				offset: int = 0) -> None:
+		""" Records a frame, `data` from `offset` on is the packet to sample
+		"""
+
+		count = self._count
+		self._count = count + 1
+
+		sample = None
+		if self._sample_bytes and data is not None and count % self._sample_every == 0:
+			sample = bytes(data[offset:offset + self._sample_bytes])
+
+		self._entries[count % self._capacity] = (time.monotonic(), direction, state, packet_id, length, sample)
+
+	def clear(self) -> None:
+		self._entries = [None] * self._capacity
+		self._count = 0
+
+	def dump(self) -> List[FrameRecord]:
+		""" Returns recorded frames from oldest to newest
+		"""
+
+		count = self._count
+		capacity = self._capacity
+		if count <= capacity:
+			entries = self._entries[:count]
+		else:
+			start = count % capacity
+			entries = self._entries[start:] + self._entries[:start]
+
+		return [FrameRecord(*entry) for entry in entries]
+
+	def format(self) -> str:
+		return "\n".join(str(record) for record in self.dump())
+
+def _load_packet(path: str) -> "Packet":
+	""" Loads packet from "module:attribute"
+	"""
+
+	module_name, attribute = path.split(":")
+	return getattr(importlib.import_module(module_name), attribute)
+
+def _feed_time(args: argparse.Namespace,
+				data: bytes,
+				packet_filter: frozenset,
+				recorder: Optional[FlightRecorder]) -> float:
+	# Lazy import, connection is only needed by the benchmark
+	from asyncraft.proto.connection import Connection # pylint: disable=import-outside-toplevel
+
+	connection = Connection(direction = PacketDirection.CLIENTBOUND)
+	connection.switch_state(ProtocolState.PLAY)
+	connection.set_compression(args.compression_threshold)
+	connection.set_packet_filter(packet_filter)
+	connection.set_flight_recorder(recorder)
+
+	# CPU time, steal and preemption on shared machines would swamp the difference
+	start_time = time.process_time()
+	connection.feed(data)
+	return time.process_time() - start_time
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description = "Feed throughput with and without a flight recorder")
+	parser.add_argument("packet", help = "module:attribute of clientbound PLAY packet to feed")
+	parser.add_argument("--count", type = int, default = 2000, help = "frames fed in one call")
+	parser.add_argument("--repeats", type = int, default = 100, help = "best of this many runs is reported")
+	parser.add_argument("--compression-threshold", type = int, default = 256, help = "-1 for no compression")
+	parser.add_argument("--sample-bytes", type = int, default = 32)
+	parser.add_argument("--sample-every", type = int, default = 16)
+	args = parser.parse_args()
+
+	if args.count < 1 or args.repeats < 1:
+		parser.error("--count and --repeats must be positive")
+
+	from asyncraft.proto.connection import Connection # pylint: disable=import-outside-toplevel
+
+	packet = _load_packet(args.packet)
+
+	# Frames are independent, one encoded frame repeated is the same stream
+	encoder = Connection(direction = PacketDirection.SERVERBOUND)
+	encoder.switch_state(ProtocolState.PLAY)
+	encoder.set_compression(args.compression_threshold)
+	data = bytes(encoder.send_packet(packet)) * args.count
+
+	recorders = (
+		("no recorder", lambda: None),
+		("recorder", FlightRecorder),
+		(f"recorder sampling {args.sample_bytes} bytes of every {args.sample_every}th",
+			lambda: FlightRecorder(sample_bytes = args.sample_bytes, sample_every = args.sample_every))
+	)
+
+	print(f"{args.count} frames of {len(data) // args.count} bytes, best of {args.repeats}")
+
+	for mode, packet_filter in (("filtered", frozenset()), ("decoded", frozenset((type(packet),)))):
+		best = [float("inf")] * len(recorders)
+
+		# Interleaved so drift of the machine hits every recorder alike
+		for _ in range(args.repeats):
+			for index, (_, create_recorder) in enumerate(recorders):
+				best[index] = min(best[index], _feed_time(args, data, packet_filter, create_recorder()))
+
+		for (name, _), elapsed in zip(recorders, best):
+			print(f"{mode:>8}, {name}: {elapsed / args.count * 1000000:.2f} us/frame "
+					f"({(elapsed / best[0] - 1) * 100:+.1f}%)")
+
+if __name__ == "__main__":
+	main()
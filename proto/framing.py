@@ -0,0 +1,53 @@
+
+from typing import Dict, List
+
+__all__ = (
+	"BufferPool", "default_buffer_pool"
+)
+
+class BufferPool:
+	""" Pool of reusable bytearrays grouped by power of two size classes
+	"""
+
+	def __init__(self,
+					min_size: int = 256,
+					max_size: int = 1 << 21,
+					max_per_class: int = 64) -> None:
+		self._min_bits = (min_size - 1).bit_length()
+		self._max_size = max_size
+		self._max_per_class = max_per_class
+
+		self._classes: Dict[int, List[bytearray]] = {}
+
+	def acquire(self, size: int) -> bytearray:
+		""" Returns buffer of at least `size` bytes
+		"""
+
+		if size > self._max_size:
+			return bytearray(size)
+
+		bits = max((size - 1).bit_length(), self._min_bits)
+
+		buffers = self._classes.get(bits)
+		if buffers:
+			return buffers.pop()
+
+		return bytearray(1 << bits)
+
+	def release(self, buffer: bytearray) -> None:
+		size = len(buffer)
+		if size > self._max_size or size & (size - 1) != 0:
+			return
+
+		bits = size.bit_length() - 1
+		if bits < self._min_bits:
+			return
+
+		buffers = self._classes.setdefault(bits, [])
+		if len(buffers) < self._max_per_class:
+			buffers.append(buffer)
+
+	def clear(self) -> None:
+		self._classes.clear()
+
+default_buffer_pool = BufferPool()
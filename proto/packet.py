@@ -1,138 +1,434 @@
-
-import dataclasses
-from typing import Any, Type, TypeVar, overload
-
-from asyncraft.proto.utils import PacketDirection, ProtocolState
-from asyncraft.proto.fields import PacketField
-from asyncraft.streams import IStreamReader, IStreamWriter, ByteArrayStreamWriter
-from asyncraft.varint import VarInt
-
-__all__ = (
-	"Packet", "decorate_packet_type"
-)
-
-PacketT = TypeVar("PacketT", bound = "Packet")
-class Packet:
-	ID: int
-	state: ProtocolState
-	direction: PacketDirection
-
-	@overload
-	def get_field(self, name: str, default: Any = None) -> PacketField:
-		...
-
-	@staticmethod
-	async def _read_from_impl(self: PacketT, stream: IStreamReader) -> None: # pylint: disable=bad-staticmethod-argument
-		for field in dataclasses.fields(self):
-			field_type: Type[PacketField] = field.type
-
-			field_instance: PacketField = await field_type.create_from(stream)
-			setattr(self, field.name, field_instance)
-
-	@classmethod
-	async def read_from(cls: Type[PacketT], stream: IStreamReader) -> PacketT:
-		""" Creates packet from stream
-		"""
-
-		new_packet = cls()
-		await cls._read_from_impl(new_packet, stream)
-		return new_packet
-
-	def _write_to_impl(self, stream: IStreamWriter) -> None:
-		for field in dataclasses.fields(self):
-			field_instance: PacketField = self.get_field(field.name)
-			field_instance.write_to(stream)
-
-	def write_to(self, stream: IStreamWriter) -> None:
-		""" Encodes packet's fields and writes it to stream
-		"""
-
-		VarInt.write_to(self.ID, stream)
-		self._write_to_impl(stream)
-
-	# TODO
-	def __to_bytes(self) -> bytes:
-		""" Encodes packet's fields
-		"""
-
-		buffer = bytearray()
-		stream = ByteArrayStreamWriter(buffer)
-		for slot_name in self.__slots__: # pylint: disable=no-member
-			slot_value: PacketField = super().__getattribute__(slot_name)
-			slot_value.write_to(stream)
-
-		return bytes(buffer)
-
-	def __new__(cls: Type[PacketT], *args, **kwargs) -> PacketT: # pylint: disable=unused-argument
-		decorate_packet_type(cls)
-		return super(Packet, cls).__new__(cls)
-
-def _create_descriptors(cls: Type[Packet]) -> None:
-	readwrite_overriden = False
-	if cls.direction == PacketDirection.CLIENTBOUND:
-		readwrite_overriden = getattr(cls, "_read_from_impl") != Packet._read_from_impl # pylint: disable=comparison-with-callable,protected-access
-	else:
-		readwrite_overriden = getattr(cls, "_write_to_impl") != Packet._write_to_impl # pylint: disable=comparison-with-callable,protected-access
-
-	for field in dataclasses.fields(cls):
-		if not readwrite_overriden and not issubclass(field.type, PacketField):
-			raise ValueError(f"Field {field.name!r} must inherit from PacketField " \
-								"to use automatic reading/writing")
-
-		def create_descriptor(descriptor_name: str,
-								field_name: str,
-								field_type: Type[PacketField]) -> None:
-			def getter(self: Packet) -> Any:
-				field: PacketField = self.get_field(descriptor_name)
-				return field.getter()
-
-			def setter(self: Packet, value: Any) -> None:
-				field: PacketField = self.get_field(descriptor_name)
-				if field is None:
-					field = field_type()
-					setattr(self, field_name, field)
-
-				field.setter(value)
-
-			prop = property(fget = getter, fset = setter)
-			setattr(cls, descriptor_name, prop)
-
-		create_descriptor(field.name, "__" + field.name, field.type)
-
-	# TODO: better method to get real fields
-	def get_field_method(self, name: str, default: Any = None) -> PacketField:
-		return getattr(self, "__" + name, default)
-
-	setattr(cls, "get_field", get_field_method)
-
-def _create_init(cls: Type[Packet]) -> None:
-	params = cls.__dataclass_params__
-	if params.init:
-		return
-
-	def custom_init(instance: Packet) -> None:
-		for field in dataclasses.fields(instance):
-			field_instance: PacketField = field.type()
-			setattr(instance, "__" + field.name, field_instance)
-
-	setattr(cls, "__init__", custom_init)
-
-def decorate_packet_type(cls: Type[Packet] = None, /) -> Type[Packet]:
-	""" Add descriptors to packet fields
-	"""
-
-	if cls is None:
-		def decorator(cls: Type[Packet]) -> Type[Packet]:
-			return decorate_packet_type(cls)
-
-		return decorator
-
-	if hasattr(cls, "__decorated"):
-		return
-
-	setattr(cls, "__decorated", True)
-
-	_create_descriptors(cls)
-	_create_init(cls)
-
-	return cls
+
+import copy
+import dataclasses
+from typing import Any, Callable, Coroutine, Dict, Tuple, Type, TypeVar, overload
+
+from asyncraft.proto.utils import PacketDirection, ProtocolState
+from asyncraft.proto.fields import PacketField
+from asyncraft.streams import IStreamReader, IStreamWriter, ByteArrayStreamReader, ByteArrayStreamWriter, BufferReader, BufferWriter
+from asyncraft.varint import VarInt
+
+__all__ = (
+	"Packet", "CompiledPacket", "PacketTemplate", "decorate_packet_type", "freeze_packet", "copy_packet", "set_byte_array"
+)
+
+PacketT = TypeVar("PacketT", bound = "Packet")
+class Packet:
+	# Dataclass packets still get a __dict__, compiled ones only have their slots
+	__slots__ = ()
+
+	ID: int
+	state: ProtocolState
+	direction: PacketDirection
+	# Decode in DecodePool worker processes when the protocol has one
+	offload_decode: bool = False
+
+	@overload
+	def get_field(self, name: str, default: Any = None) -> PacketField:
+		...
+
+	@staticmethod
+	async def _read_from_impl(self: PacketT, stream: IStreamReader) -> None: # pylint: disable=bad-staticmethod-argument
+		for field in dataclasses.fields(self):
+			field_type: Type[PacketField] = field.type
+
+			field_instance: PacketField = await field_type.create_from(stream)
+			setattr(self, "__" + field.name, field_instance)
+
+	@classmethod
+	async def read_from(cls: Type[PacketT], stream: IStreamReader) -> PacketT:
+		""" Creates packet from stream
+		"""
+
+		new_packet = cls()
+		await cls._read_from_impl(new_packet, stream)
+		return new_packet
+
+	@staticmethod
+	def _read_from_buffer_impl(self: PacketT, reader: BufferReader) -> None: # pylint: disable=bad-staticmethod-argument
+		cls = type(self)
+		if cls._read_from_impl != Packet._read_from_impl: # pylint: disable=comparison-with-callable,protected-access
+			# Packet only knows how to read itself from a stream,
+			# the buffer stream never suspends so the coroutine completes in one step
+			stream = ByteArrayStreamReader(bytearray(reader.read_rest()))
+			_run_to_completion(cls._read_from_impl(self, stream))
+			return
+
+		for field in dataclasses.fields(self):
+			field_type: Type[PacketField] = field.type
+
+			field_instance: PacketField = field_type.create_from_buffer(reader)
+			setattr(self, "__" + field.name, field_instance)
+
+	@classmethod
+	def read_from_buffer(cls: Type[PacketT], reader: BufferReader) -> PacketT:
+		""" Creates packet from in-memory buffer without awaiting
+		"""
+
+		new_packet = cls.__new__(cls)
+		cls._read_from_buffer_impl(new_packet, reader)
+		return new_packet
+
+	def _write_to_impl(self, stream: IStreamWriter) -> None:
+		for field in dataclasses.fields(self):
+			field_instance: PacketField = self.get_field(field.name)
+			field_instance.write_to(stream)
+
+	def write_to(self, stream: IStreamWriter) -> None:
+		""" Encodes packet's fields and writes it to stream
+		"""
+
+		stream.write(self.to_bytes())
+
+	def to_bytes(self) -> bytes:
+		""" Encodes packet id and fields
+
+			Result is cached until a field is set through its descriptor,
+			call invalidate() after changing a field object in place
+		"""
+
+		encoded: bytes = getattr(self, "_encoded", None)
+		if encoded is None:
+			buffer = bytearray()
+			stream = ByteArrayStreamWriter(buffer)
+
+			VarInt.write_to(self.ID, stream)
+			self._write_to_impl(stream)
+
+			encoded = bytes(buffer)
+			self._encoded = encoded # pylint: disable=attribute-defined-outside-init
+
+		return encoded
+
+	def encode_into(self, writer: BufferWriter) -> None:
+		""" Encodes packet id and fields straight into the writer's buffer
+
+			Encoding is cached like by to_bytes()
+		"""
+
+		encoded: bytes = getattr(self, "_encoded", None)
+		if encoded is not None:
+			writer.write(encoded)
+			return
+
+		start = writer.offset
+
+		VarInt.write_to(self.ID, writer)
+		self._write_to_impl(writer)
+
+		self._encoded = bytes(memoryview(writer.buffer)[start:writer.offset]) # pylint: disable=attribute-defined-outside-init
+
+	def invalidate(self) -> None:
+		""" Drops cached encoding
+		"""
+
+		self._encoded = None # pylint: disable=attribute-defined-outside-init
+
+	def __new__(cls: Type[PacketT], *args, **kwargs) -> PacketT: # pylint: disable=unused-argument
+		decorate_packet_type(cls)
+		return super(Packet, cls).__new__(cls)
+
+class CompiledPacket(Packet):
+	""" Base of packet classes generated by asyncraft.proto.codegen
+
+		Fields are properties over slots read and written by generated code,
+		nothing is looked up through dataclasses at runtime. Encoding is cached
+		until a field is set, call invalidate() after changing a field object in place
+	"""
+
+	__slots__ = ("_encoded", "_frozen")
+
+	# Names of fields in wire order
+	FIELDS: Tuple[str, ...] = ()
+	# Field name to function encoding just that field of a packet
+	ENCODERS: Dict[str, Callable[["CompiledPacket"], bytes]] = {}
+
+	@classmethod
+	async def read_from(cls: Type[PacketT], stream: IStreamReader) -> PacketT:
+		raise NotImplementedError("Compiled packets are read with read_from_buffer")
+
+	@classmethod
+	def read_from_buffer(cls: Type[PacketT], reader: BufferReader) -> PacketT:
+		raise NotImplementedError()
+
+	def _write_to_impl(self, stream: IStreamWriter) -> None:
+		# Lets PacketTemplate fall back to encoding the whole packet
+		stream.write(self.to_bytes()[VarInt.size_of(self.ID):])
+
+	def to_bytes(self) -> bytes:
+		raise NotImplementedError()
+
+	def encode_into(self, writer: BufferWriter) -> None:
+		writer.write(self.to_bytes())
+
+	def encode_field(self, name: str) -> bytes:
+		return self.ENCODERS[name](self)
+
+	def invalidate(self) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+
+	@staticmethod
+	def raise_frozen() -> None:
+		_frozen_invalidate()
+
+	def __new__(cls: Type[PacketT], *args, **kwargs) -> PacketT: # pylint: disable=unused-argument
+		# Skips decorate_packet_type, there are no descriptors to create
+		return object.__new__(cls)
+
+	def __eq__(self, other: Any) -> bool:
+		if type(other) is not type(self):
+			return NotImplemented
+
+		return all(getattr(self, name) == getattr(other, name) for name in self.FIELDS)
+
+	def __repr__(self) -> str:
+		fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+		return f"{type(self).__name__}({fields})"
+
+def _run_to_completion(coro: Coroutine) -> Any:
+	try:
+		coro.send(None)
+	except StopIteration as ex:
+		return ex.value
+
+	coro.close()
+	raise RuntimeError("Packet reader suspended on in-memory buffer")
+
+def _create_descriptors(cls: Type[Packet]) -> None:
+	readwrite_overriden = False
+	if cls.direction == PacketDirection.CLIENTBOUND:
+		readwrite_overriden = getattr(cls, "_read_from_impl") != Packet._read_from_impl # pylint: disable=comparison-with-callable,protected-access
+	else:
+		readwrite_overriden = getattr(cls, "_write_to_impl") != Packet._write_to_impl # pylint: disable=comparison-with-callable,protected-access
+
+	for field in dataclasses.fields(cls):
+		if not readwrite_overriden and not issubclass(field.type, PacketField):
+			raise ValueError(f"Field {field.name!r} must inherit from PacketField " \
+								"to use automatic reading/writing")
+
+		def create_descriptor(descriptor_name: str,
+								field_name: str,
+								field_type: Type[PacketField]) -> None:
+			def getter(self: Packet) -> Any:
+				field: PacketField = self.get_field(descriptor_name)
+				return field.getter()
+
+			def setter(self: Packet, value: Any) -> None:
+				# Before changing anything, frozen packets raise here
+				self.invalidate()
+
+				field: PacketField = self.get_field(descriptor_name)
+				if field is None:
+					field = field_type()
+					setattr(self, field_name, field)
+
+				field.setter(value)
+
+			prop = property(fget = getter, fset = setter)
+			setattr(cls, descriptor_name, prop)
+
+		create_descriptor(field.name, "__" + field.name, field.type)
+
+	# TODO: better method to get real fields
+	def get_field_method(self, name: str, default: Any = None) -> PacketField:
+		return getattr(self, "__" + name, default)
+
+	setattr(cls, "get_field", get_field_method)
+
+def _create_init(cls: Type[Packet]) -> None:
+	params = cls.__dataclass_params__
+	if params.init:
+		return
+
+	def custom_init(instance: Packet) -> None:
+		for field in dataclasses.fields(instance):
+			field_instance: PacketField = field.type()
+			setattr(instance, "__" + field.name, field_instance)
+
+	setattr(cls, "__init__", custom_init)
+
+def decorate_packet_type(cls: Type[Packet] = None, /) -> Type[Packet]:
+	""" Add descriptors to packet fields
+	"""
+
+	if cls is None:
+		def decorator(cls: Type[Packet]) -> Type[Packet]:
+			return decorate_packet_type(cls)
+
+		return decorator
+
+	if hasattr(cls, "__decorated"):
+		return
+
+	setattr(cls, "__decorated", True)
+
+	_create_descriptors(cls)
+	_create_init(cls)
+
+	return cls
+
+def _frozen_invalidate() -> None:
+	raise dataclasses.FrozenInstanceError("Packet is shared, change a copy_packet() copy instead")
+
+def _frozen_value(value: Any) -> Any:
+	if isinstance(value, PacketField):
+		return value.frozen().getter()
+
+	if isinstance(value, (bytearray, memoryview)):
+		return bytes(value)
+
+	return value
+
+def freeze_packet(packet: Packet) -> None:
+	""" Makes setting fields of packet through its descriptors raise FrozenInstanceError
+
+		Getters return values that can not be changed in place, bytes
+		instead of byte arrays and BlockPosition instead of Position.
+		Compiled packets are guarded by their generated setters
+	"""
+
+	if isinstance(packet, CompiledPacket):
+		# Slots behind the properties, the encoding stays the same
+		for name in packet.FIELDS:
+			setattr(packet, "_" + name, _frozen_value(getattr(packet, name)))
+
+		packet._frozen = True # pylint: disable=protected-access
+		return
+
+	for field in dataclasses.fields(packet):
+		field_instance = packet.get_field(field.name)
+		if isinstance(field_instance, PacketField):
+			setattr(packet, "__" + field.name, field_instance.frozen())
+
+	# Shadows the method for this instance only, every setter calls it first
+	packet.invalidate = _frozen_invalidate
+
+def copy_packet(packet: PacketT) -> PacketT:
+	""" Returns deep copy of packet that is not frozen
+	"""
+
+	new_packet = copy.deepcopy(packet)
+	if isinstance(new_packet, CompiledPacket):
+		new_packet._frozen = False # pylint: disable=protected-access
+	else:
+		vars(new_packet).pop("invalidate", None)
+
+	return new_packet
+
+def set_byte_array(packet: Packet, name: str, value: bytes) -> None:
+	""" Sets byte array field and its length field if the packet has one
+	"""
+
+	setattr(packet, name, value)
+	if hasattr(packet, name + "_length"):
+		setattr(packet, name + "_length", len(value))
+
+class PacketTemplate:
+	""" Pre-encoded packet with in-place field updates
+
+		Setting a field whose encoded size stays the same patches it into
+		the cached bytes, otherwise the whole packet is encoded again
+	"""
+
+	__slots__ = ("_packet", "_buffer", "_offsets", "_encoded")
+
+	def __init__(self, packet: Packet) -> None:
+		self._packet = packet
+
+		self._buffer = bytearray()
+		self._offsets: Dict[str, Tuple[int, int]] = {}
+		self._encoded: bytes = None
+
+		self._encode()
+
+	@property
+	def packet(self) -> Packet:
+		return self._packet
+
+	@property
+	def ID(self) -> int: # pylint: disable=invalid-name
+		return self._packet.ID
+
+	@property
+	def state(self) -> ProtocolState:
+		return self._packet.state
+
+	@property
+	def direction(self) -> PacketDirection:
+		return self._packet.direction
+
+	def set(self, name: str, value: Any) -> None:
+		setattr(self._packet, name, value)
+
+		if name not in self._offsets:
+			self._encode()
+			return
+
+		start, end = self._offsets[name]
+
+		if isinstance(self._packet, CompiledPacket):
+			data = self._packet.encode_field(name)
+		else:
+			field: PacketField = self._packet.get_field(name)
+			if field.STRUCT is not None:
+				field.STRUCT.pack_into(self._buffer, start, field.value)
+				self._encoded = None
+				return
+
+			data = field.to_bytes()
+
+		if len(data) != end - start:
+			self._encode()
+			return
+
+		self._buffer[start:end] = data
+
+		self._encoded = None
+
+	def to_bytes(self) -> bytes:
+		if self._encoded is None:
+			self._encoded = bytes(self._buffer)
+
+		return self._encoded
+
+	def write_to(self, stream: IStreamWriter) -> None:
+		stream.write(self.to_bytes())
+
+	def encode_into(self, writer: BufferWriter) -> None:
+		# Copied right away, no bytes object is made for every change
+		writer.write(self._buffer)
+
+	def _encode(self) -> None:
+		packet = self._packet
+
+		self._offsets.clear()
+		self._encoded = None
+
+		if isinstance(packet, CompiledPacket):
+			buffer = bytearray(VarInt.encode(packet.ID))
+			for name in packet.FIELDS:
+				start = len(buffer)
+				buffer += packet.encode_field(name)
+				self._offsets[name] = (start, len(buffer))
+
+			self._buffer = buffer
+			return
+
+		if type(packet)._write_to_impl != Packet._write_to_impl: # pylint: disable=comparison-with-callable,protected-access
+			# Field boundaries are unknown for custom writers
+			self._buffer = bytearray(packet.to_bytes())
+			return
+
+		buffer = bytearray()
+		stream = ByteArrayStreamWriter(buffer)
+
+		VarInt.write_to(packet.ID, stream)
+		for field in dataclasses.fields(packet):
+			start = len(buffer)
+			packet.get_field(field.name).write_to(stream)
+			self._offsets[field.name] = (start, len(buffer))
+
+		self._buffer = buffer
@@ -0,0 +1,381 @@
+
+import logging
+import asyncio
+
+from typing import TYPE_CHECKING, Callable, Coroutine, Dict, FrozenSet, Iterable, List, Tuple, Type, Union
+
+from asyncraft.proto.utils import ProtocolState
+from asyncraft.proto.packets import Handshake, NextHandshakeState, LoginStart, \
+										EncryptionRequest, EncryptionResponse, LoginSuccess
+from asyncraft.proto.packet import Packet, PacketTemplate
+from asyncraft.proto.connection import Connection, RawPacket
+from asyncraft.proto.subscription import DropPolicy, PacketSubscription
+from asyncraft.proto.conflation import ConflationQueue, KeyFunction
+from asyncraft.streams import AsyncIOStreamReader, AsyncIOStreamWriter
+
+if TYPE_CHECKING:
+	from asyncraft.proto.decodecache import DecodeCache
+	from asyncraft.proto.decodepool import DecodePool
+	from asyncraft.proto.flightrecorder import FlightRecorder
+
+__all__ = (
+	"Protocol",
+)
+
+class Protocol:
+	# Bots run by the thousand, keep idle ones small
+	__slots__ = ("_host", "_port", "_proto_version", "_user_name",
+					"_reader", "_writer", "_read_task", "_connection", "_decode_pool",
+					"_packet_listeners", "_subscriptions", "_conflation", "_logged_in")
+
+	READ_SIZE: int = 65536
+	# Packets queued between reading and listeners once conflation is enabled
+	CONFLATION_BACKLOG: int = 1024
+
+	_logger = logging.getLogger("proto")
+
+	def __init__(self,
+					host: str,
+					port: int,
+					proto_version: int,
+					decode_pool: "DecodePool" = None,
+					flight_recorder: "FlightRecorder" = None,
+					decode_cache: "DecodeCache" = None) -> None:
+		self._host = host
+		self._port = port
+		self._proto_version = proto_version
+
+		self._user_name: str = None
+
+		self._reader: AsyncIOStreamReader = None
+		self._writer: AsyncIOStreamWriter = None
+		self._read_task: asyncio.Task = None
+		self._connection = Connection()
+
+		self._decode_pool = decode_pool
+		if decode_pool is not None:
+			self._connection.enable_decode_offload()
+
+		# Recent frames are logged when the connection fails or the server drops it
+		self._connection.set_flight_recorder(flight_recorder)
+		# Usually shared by all protocols of a swarm
+		self._connection.set_decode_cache(decode_cache)
+		self._connection.set_packet_filter(self._DEFAULT_PACKET_FILTER)
+
+		# Created on first use, most bots never add listeners of their own
+		self._packet_listeners: Dict[Type[Packet], List[Coroutine]] = None
+		self._subscriptions: Dict[Type[Packet], List[PacketSubscription]] = None
+		self._conflation: ConflationQueue = None
+		self._logged_in: asyncio.Event = None
+
+	@property
+	def state(self) -> ProtocolState:
+		return self._connection.state
+
+	@property
+	def connection(self) -> Connection:
+		return self._connection
+
+	@property
+	def user_name(self) -> str:
+		return self._user_name
+
+	async def wait_logged_in(self) -> None:
+		""" Waits for LoginSuccess, raises ConnectionError if reading ends before it
+		"""
+
+		if self._connection.state == ProtocolState.PLAY:
+			return
+
+		if self._logged_in is None:
+			self._logged_in = asyncio.Event()
+
+		if self._read_task is None:
+			await self._logged_in.wait()
+			return
+
+		# Kicked or failed clients would wait for the caller's timeout otherwise
+		logged_in = asyncio.ensure_future(self._logged_in.wait())
+		try:
+			await asyncio.wait((logged_in, self._read_task), return_when = asyncio.FIRST_COMPLETED)
+		finally:
+			logged_in.cancel()
+
+		if self._logged_in.is_set():
+			return
+
+		error = None
+		if not self._read_task.cancelled():
+			error = self._read_task.exception()
+
+		raise ConnectionError(f"Connection of {self._user_name!r} ended before login") from error
+
+	def add_packet_listener(self, packet_class: Type[Packet], coro: Coroutine) -> None:
+		if self._packet_listeners is None:
+			self._packet_listeners = {}
+
+		self._packet_listeners.setdefault(packet_class, []).append(coro)
+
+		self._update_packet_filter()
+
+	def packets(self,
+				*packet_classes: Type[Packet],
+				maxsize: int = 1024,
+				policy: DropPolicy = DropPolicy.BLOCK) -> PacketSubscription:
+		""" Subscribes to received packets of given classes
+
+			Use as `async for packet in protocol.packets(...)`,
+			each subscription has its own queue of up to maxsize packets
+		"""
+
+		subscription = PacketSubscription(self, packet_classes, maxsize, policy)
+		if self._subscriptions is None:
+			self._subscriptions = {}
+
+		for packet_class in packet_classes:
+			self._subscriptions.setdefault(packet_class, []).append(subscription)
+
+		self._update_packet_filter()
+
+		return subscription
+
+	def conflate(self, packet_class: Type[Packet], key: KeyFunction) -> None:
+		""" Collapses received packets of packet_class with equal key(packet) while listeners lag behind
+
+			Reading then goes on in its own task once logged in, listeners and
+			subscriptions get only the latest of the updates queued meanwhile.
+			Packets of other classes are never dropped or reordered.
+			For state updates only, `lambda packet: packet.entity_id` for example.
+			Related classes should share keys, updates of different classes with
+			equal keys keep their order
+		"""
+
+		if self._conflation is None:
+			self._conflation = ConflationQueue(self.CONFLATION_BACKLOG)
+
+		self._conflation.add_key(packet_class, key)
+
+	async def connect(self, user_name: str) -> None:
+		self._user_name = user_name
+
+		reader, writer = await asyncio.open_connection(self._host, self._port)
+
+		self._reader = AsyncIOStreamReader(reader)
+		self._writer = AsyncIOStreamWriter(writer)
+
+		self._read_task = asyncio.create_task(self._read_packets_task())
+
+		await self._handshake()
+
+	def write(self, data: bytes) -> None:
+		self._writer.write(self._connection.send_data(data))
+
+	async def write_packet(self, packet: Union[Packet, PacketTemplate], flush: bool = True) -> None:
+		self._writer.write(self._connection.encode_packet(packet))
+		self._release_written_buffers()
+		if flush:
+			await self.flush()
+
+	def write_packets(self, packets: Iterable[Union[Packet, PacketTemplate]]) -> None:
+		""" Writes packets with a single write without waiting for them to be sent
+		"""
+
+		self._writer.write(self._connection.send_packets(packets))
+
+	def get_write_buffer_size(self) -> int:
+		return self._writer.get_write_buffer_size()
+
+	async def flush(self) -> None:
+		await self._writer.flush()
+		self._release_written_buffers()
+
+	async def wait_closed(self) -> None:
+		await self._writer.wait_closed()
+
+	def is_closing(self) -> bool:
+		return self._writer.is_closing()
+
+	def close(self) -> None:
+		if self._writer is not None:
+			self._writer.close()
+
+		if self._read_task is not None and not self._read_task.done():
+			self._read_task.cancel()
+
+	def _unsubscribe(self, subscription: PacketSubscription) -> None:
+		for packet_class in subscription.packet_classes:
+			subscriptions = self._subscriptions.get(packet_class, [])
+			if subscription in subscriptions:
+				subscriptions.remove(subscription)
+
+			if not subscriptions:
+				self._subscriptions.pop(packet_class, None)
+
+		self._update_packet_filter()
+
+	def _update_packet_filter(self) -> None:
+		# Packets nobody listens to are not decoded at all
+		packet_classes = self._DEFAULT_PACKET_FILTER
+		if self._packet_listeners:
+			packet_classes = packet_classes.union(self._packet_listeners)
+
+		if self._subscriptions:
+			packet_classes = packet_classes.union(self._subscriptions)
+
+		self._connection.set_packet_filter(packet_classes)
+
+	def _release_written_buffers(self) -> None:
+		# Transport may keep views of pending data until it is sent
+		self._connection.release_buffers(self._writer.get_write_buffer_size())
+
+	async def _handshake(self):
+		await self.write_packet(Handshake(self._proto_version,
+											self._host,
+											self._port,
+											NextHandshakeState.LOGIN))
+
+		await self.write_packet(LoginStart(self._user_name))
+
+	async def _read_packets_task(self) -> None:
+		try:
+			await self._read_packets()
+		except Exception:
+			self._dump_flight_recorder("Reading packets failed")
+			raise
+		else:
+			if not self.is_closing():
+				self._dump_flight_recorder("Server closed connection")
+		finally:
+			if self._subscriptions:
+				for subscriptions in list(self._subscriptions.values()):
+					for subscription in subscriptions:
+						subscription.finish()
+
+	async def _read_packets(self) -> None:
+		while not self.is_closing():
+			# Login is dispatched in step with reading, its listeners change how frames are read
+			if self._conflation is not None and self._connection.state == ProtocolState.PLAY:
+				await self._read_conflated()
+				return
+
+			data = await self._reader.read(self.READ_SIZE)
+			if not data:
+				break
+
+			# Separate coroutine so the batch is not kept alive while waiting for the next read
+			await self._dispatch_packets(self._connection.feed(data))
+
+			# Hand pooled write buffers back as the transport sends them
+			self._release_written_buffers()
+
+	async def _read_conflated(self) -> None:
+		tasks = (asyncio.create_task(self._feed_conflation()),
+					asyncio.create_task(self._dispatch_conflated()))
+		try:
+			await asyncio.wait(tasks, return_when = asyncio.FIRST_EXCEPTION)
+		finally:
+			for task in tasks:
+				task.cancel()
+
+			await asyncio.gather(*tasks, return_exceptions = True)
+
+		for task in tasks:
+			if not task.cancelled() and task.exception() is not None:
+				raise task.exception()
+
+	async def _feed_conflation(self) -> None:
+		conflation = self._conflation
+		try:
+			while not self.is_closing():
+				data = await self._reader.read(self.READ_SIZE)
+				if not data:
+					break
+
+				# Waits while the backlog is full, the server is then held back by TCP
+				await conflation.put(self._connection.feed(data))
+
+				self._release_written_buffers()
+		finally:
+			# Dispatching ends after the queued packets
+			conflation.close()
+
+	async def _dispatch_conflated(self) -> None:
+		while True:
+			packets = await self._conflation.get_batch()
+			if not packets:
+				return
+
+			await self._dispatch_packets(packets)
+
+	async def _dispatch_packets(self, packets: List[Union[Packet, RawPacket]]) -> None:
+		if self._decode_pool is not None:
+			# Start all offloaded decodes of the batch before waiting for any
+			packets = [self._decode_pool.submit(packet) if isinstance(packet, RawPacket) else packet
+						for packet in packets]
+
+		for packet in packets:
+			if not isinstance(packet, Packet):
+				# Future of an offloaded decode
+				if packet is not None:
+					packet = await packet
+
+				# Failed to decode, logged by the pool
+				if packet is None:
+					continue
+
+			packet_class = type(packet)
+			for listener in self._DEFAULT_LISTENERS.get(packet_class, ()):
+				await listener(self, packet)
+
+			if self._packet_listeners is not None:
+				for listener in self._packet_listeners.get(packet_class, ()):
+					await listener(packet)
+
+			if self._subscriptions is not None:
+				for subscription in self._subscriptions.get(packet_class, ()):
+					await subscription.put(packet)
+
+	def _dump_flight_recorder(self, reason: str) -> None:
+		recorder = self._connection.flight_recorder
+		if recorder is not None:
+			self._logger.warning("%s, last %d frames of %r:\n%s",
+									reason,
+									min(recorder.count, recorder.capacity),
+									self._user_name,
+									recorder.format())
+
+	async def _on_encryption_request(self, packet: EncryptionRequest) -> None:
+		# Only online mode servers request encryption, keep cryptography out of startup
+		from asyncraft.proto.crypto import ProtocolCipher # pylint: disable=import-outside-toplevel
+
+		cipher = ProtocolCipher()
+
+		# RSA is slow enough to stall the loop when many clients log in at once
+		loop = asyncio.get_running_loop()
+		verify_token, shared_secret = await loop.run_in_executor(None,
+																	cipher.encrypt_token_and_secret,
+																	bytes(packet.verify_token),
+																	bytes(packet.public_key))
+
+		await self.write_packet(EncryptionResponse(len(shared_secret),
+												shared_secret,
+												len(verify_token),
+												verify_token))
+
+		self._connection.enable_encryption(cipher)
+
+		self._logger.debug("Enabled encryption")
+
+	async def _on_login_success(self, packet: LoginSuccess) -> None: # pylint: disable=unused-argument
+		if self._logged_in is not None:
+			self._logged_in.set()
+
+	# Listeners of every protocol, called with the protocol and the packet
+	_DEFAULT_LISTENERS: Dict[Type[Packet], Tuple[Callable, ...]] = {
+		EncryptionRequest: (_on_encryption_request,),
+		LoginSuccess: (_on_login_success,)
+	}
+	_DEFAULT_PACKET_FILTER: FrozenSet[Type[Packet]] = frozenset(_DEFAULT_LISTENERS)
+
+	def __del__(self) -> None:
+		self.close()
@@ -0,0 +1,303 @@
+
+import asyncio
+import logging
+import os
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional, Set, Type
+
+from asyncraft.proto.utils import PacketDirection
+from asyncraft.proto.packets import EncryptionRequest, EncryptionResponse
+from asyncraft.proto.packet import Packet, set_byte_array
+from asyncraft.proto.connection import Connection, RawFrame
+from asyncraft.streams import AsyncIOStreamReader, AsyncIOStreamWriter
+
+if TYPE_CHECKING:
+	from asyncraft.proto.crypto import ServerKey
+
+__all__ = (
+	"Relay", "RelaySession"
+)
+
+# Returns packet to forward, None drops it
+RelayHandler = Callable[["RelaySession", Packet], Awaitable[Optional[Packet]]]
+
+class RelaySession:
+	""" One client proxied to the target server
+
+		Frames of packets without handlers are forwarded as they are,
+		only decrypted and encrypted again in bulk
+	"""
+
+	def __init__(self,
+					relay: "Relay",
+					client_reader: AsyncIOStreamReader,
+					client_writer: AsyncIOStreamWriter,
+					server_reader: AsyncIOStreamReader,
+					server_writer: AsyncIOStreamWriter) -> None:
+		self._relay = relay
+
+		self._client_reader = client_reader
+		self._client_writer = client_writer
+		self._server_reader = server_reader
+		self._server_writer = server_writer
+
+		# Receives serverbound packets of the client
+		self._client_connection = Connection(direction = PacketDirection.SERVERBOUND)
+		# Receives clientbound packets of the server
+		self._server_connection = Connection(direction = PacketDirection.CLIENTBOUND)
+
+		for connection in (self._client_connection, self._server_connection):
+			connection.enable_pass_through()
+			connection.set_packet_filter(relay.intercepted_classes)
+
+		# Set once encryption could not be terminated, bytes are piped from then on
+		self._opaque = False
+
+		self._server_public_key: bytes = None
+		self._server_verify_token: bytes = None
+		self._verify_token: bytes = None
+
+		self._forwarded_frames = 0
+		self._decoded_packets = 0
+
+		self._logger = logging.getLogger("proto")
+
+	@property
+	def client_connection(self) -> Connection:
+		return self._client_connection
+
+	@property
+	def server_connection(self) -> Connection:
+		return self._server_connection
+
+	@property
+	def forwarded_frames(self) -> int:
+		return self._forwarded_frames
+
+	@property
+	def decoded_packets(self) -> int:
+		return self._decoded_packets
+
+	def send_to_client(self, packet: Packet) -> None:
+		self._client_writer.write(self._client_connection.send_packet(packet))
+
+	def send_to_server(self, packet: Packet) -> None:
+		self._server_writer.write(self._server_connection.send_packet(packet))
+
+	async def run(self) -> None:
+		""" Relays both directions until either side closes
+		"""
+
+		tasks = [
+			asyncio.create_task(self._relay_task(self._client_reader,
+													self._client_connection,
+													self._server_connection,
+													self._server_writer)),
+			asyncio.create_task(self._relay_task(self._server_reader,
+													self._server_connection,
+													self._client_connection,
+													self._client_writer))
+		]
+
+		try:
+			await asyncio.wait(tasks, return_when = asyncio.FIRST_COMPLETED)
+		finally:
+			for task in tasks:
+				task.cancel()
+
+			self.close()
+
+			await asyncio.gather(*tasks, return_exceptions = True)
+
+	def close(self) -> None:
+		self._client_writer.close()
+		self._server_writer.close()
+
+	async def _relay_task(self,
+							reader: AsyncIOStreamReader,
+							source: Connection,
+							target: Connection,
+							writer: AsyncIOStreamWriter) -> None:
+		while True:
+			data = await reader.read(self._relay.READ_SIZE)
+			if not data:
+				break
+
+			if self._opaque:
+				writer.write(data)
+			else:
+				await self._forward(source.feed(data), target, writer)
+
+			await writer.flush()
+
+	async def _forward(self,
+						items: List,
+						target: Connection,
+						writer: AsyncIOStreamWriter) -> None:
+		frames: List[memoryview] = []
+		for item in items:
+			if isinstance(item, RawFrame):
+				frames.append(item.data)
+				continue
+
+			# Keep order with packets written by handlers
+			if frames:
+				self._write_frames(frames, target, writer)
+
+			self._decoded_packets += 1
+
+			packet = await self._relay.handle(self, item)
+			if packet is not None:
+				writer.write(target.send_packet(packet))
+
+		if frames:
+			self._write_frames(frames, target, writer)
+
+	def _write_frames(self,
+						frames: List[memoryview],
+						target: Connection,
+						writer: AsyncIOStreamWriter) -> None:
+		writer.write(target.send_data(b"".join(frames)))
+
+		self._forwarded_frames += len(frames)
+		frames.clear()
+
+	async def _on_encryption_request(self, packet: EncryptionRequest) -> Optional[Packet]:
+		server_key = self._relay.server_key
+		if server_key is None:
+			# Client and server agree on a secret we never see
+			self._logger.warning("Encryption requested without server key, relaying opaquely")
+			return packet
+
+		self._server_public_key = bytes(packet.public_key)
+		self._server_verify_token = bytes(packet.verify_token)
+		self._verify_token = os.urandom(4)
+
+		# Client encrypts its secret with our key instead
+		set_byte_array(packet, "public_key", server_key.public_key_bytes)
+		set_byte_array(packet, "verify_token", self._verify_token)
+
+		return packet
+
+	async def _on_encryption_response(self, packet: EncryptionResponse) -> Optional[Packet]:
+		server_key = self._relay.server_key
+		if server_key is None:
+			self._opaque = True
+			return packet
+
+		# Lazy import keeps cryptography optional for plain relays
+		from asyncraft.proto.crypto import ProtocolCipher # pylint: disable=import-outside-toplevel
+
+		loop = asyncio.get_running_loop()
+
+		verify_token = await loop.run_in_executor(None, server_key.decrypt, bytes(packet.verify_token))
+		if verify_token != self._verify_token:
+			raise ValueError("Client sent wrong verify token")
+
+		shared_secret = await loop.run_in_executor(None, server_key.decrypt, bytes(packet.shared_secret))
+
+		# Everything the client sends after its response is encrypted
+		self._client_connection.enable_encryption(ProtocolCipher(shared_secret))
+
+		cipher = ProtocolCipher()
+		verify_token, shared_secret = await loop.run_in_executor(None,
+																	cipher.encrypt_token_and_secret,
+																	self._server_verify_token,
+																	self._server_public_key)
+
+		self.send_to_server(EncryptionResponse(len(shared_secret),
+												shared_secret,
+												len(verify_token),
+												verify_token))
+
+		self._server_connection.enable_encryption(cipher)
+
+		return None
+
+class Relay:
+	""" Proxy between clients and a target server
+
+		Only packets of classes with handlers are decoded, optionally modified
+		and encoded again, everything else is forwarded without decoding.
+		With `server_key` set encryption is terminated on both sides, which
+		online mode servers reject as the client authenticates against our key.
+		Without it relaying becomes opaque once encryption starts
+	"""
+
+	READ_SIZE: int = 65536
+
+	def __init__(self,
+					host: str,
+					port: int,
+					server_key: "ServerKey" = None) -> None:
+		self._host = host
+		self._port = port
+		self._server_key = server_key
+
+		self._handlers: Dict[Type[Packet], List[RelayHandler]] = {}
+		self._intercepted_classes: Set[Type[Packet]] = set()
+
+		self._sessions: Set[RelaySession] = set()
+
+		self._logger = logging.getLogger("proto")
+
+		self.add_handler(EncryptionRequest, RelaySession._on_encryption_request) # pylint: disable=protected-access
+		self.add_handler(EncryptionResponse, RelaySession._on_encryption_response) # pylint: disable=protected-access
+
+	@property
+	def server_key(self) -> "ServerKey":
+		return self._server_key
+
+	@property
+	def intercepted_classes(self) -> Set[Type[Packet]]:
+		return self._intercepted_classes
+
+	@property
+	def sessions(self) -> Set[RelaySession]:
+		return self._sessions
+
+	def add_handler(self, packet_class: Type[Packet], handler: RelayHandler) -> None:
+		""" Decodes packets of packet_class in its direction and passes them to handler
+
+			Handler returns the packet to forward, modified or not, or None to drop it
+		"""
+
+		self._handlers.setdefault(packet_class, []).append(handler)
+
+		# Sessions share the set as their packet filter
+		self._intercepted_classes.add(packet_class)
+
+	async def handle(self, session: RelaySession, packet: Packet) -> Optional[Packet]:
+		for handler in self._handlers.get(type(packet), ()):
+			packet = await handler(session, packet)
+			if packet is None:
+				break
+
+		return packet
+
+	async def serve(self, host: str, port: int) -> asyncio.AbstractServer:
+		""" Starts accepting clients on host and port
+		"""
+
+		return await asyncio.start_server(self._on_client, host, port)
+
+	async def _on_client(self,
+							reader: asyncio.StreamReader,
+							writer: asyncio.StreamWriter) -> None:
+		try:
+			server_reader, server_writer = await asyncio.open_connection(self._host, self._port)
+		except OSError as ex:
+			self._logger.warning("Failed to connect to %s:%d: %r", self._host, self._port, ex)
+			writer.close()
+			return
+
+		session = RelaySession(self,
+								AsyncIOStreamReader(reader),
+								AsyncIOStreamWriter(writer),
+								AsyncIOStreamReader(server_reader),
+								AsyncIOStreamWriter(server_writer))
+
+		self._sessions.add(session)
+		try:
+			await session.run()
+		finally:
+			self._sessions.discard(session)
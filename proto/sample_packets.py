@@ -0,0 +1,1176 @@
+
+# Generated by asyncraft.proto.codegen from sample_spec.txt, do not edit
+
+import struct
+from typing import Dict, Tuple, Type
+
+from asyncraft.proto import fields
+# Re-exported, hand-written code imports enums from the packet module
+from asyncraft.proto.enums import NextHandshakeState # pylint: disable=unused-import
+from asyncraft.proto.packet import CompiledPacket
+from asyncraft.proto.utils import PacketDirection, ProtocolState
+from asyncraft.streams import BufferReader
+from asyncraft.varint import VarInt, VarLong
+
+_new = object.__new__
+
+def _read_string(reader: BufferReader) -> str:
+	length = fields.String.check_length(VarInt.read_from_buffer(reader))
+	return reader.read_exactly(length).decode("utf-8")
+
+def _read_byte_array(reader: BufferReader) -> bytes:
+	length = fields.VarByteArray.check_length(VarInt.read_from_buffer(reader))
+	return reader.read_exactly(length)
+
+def _encode_string(value: str) -> bytes:
+	data = value.encode("utf-8")
+	return VarInt.encode(len(data)) + data
+
+def _encode_byte_array(value: bytes) -> bytes:
+	return VarInt.encode(len(value)) + bytes(value)
+
+def _encode_field(field_type: Type[fields.PacketField], value) -> bytes:
+	if isinstance(value, field_type):
+		return value.to_bytes()
+
+	field = field_type()
+	field.setter(value)
+	return field.to_bytes()
+
+_STRUCT_0 = struct.Struct('!H')
+_STRUCT_1 = struct.Struct('!q')
+_STRUCT_2 = struct.Struct('!qq')
+_STRUCT_3 = struct.Struct('!b')
+_STRUCT_4 = struct.Struct('!bqq')
+_STRUCT_5 = struct.Struct('!h')
+_STRUCT_6 = struct.Struct('!?')
+_STRUCT_7 = struct.Struct('!hhh?')
+
+class Handshake(CompiledPacket):
+	ID = 0
+	state = ProtocolState.HANDSHAKING
+	direction = PacketDirection.SERVERBOUND
+
+	FIELDS = ('proto_version', 'server_address', 'server_port', 'next_state')
+	__slots__ = ('_proto_version', '_server_address', '_server_port', '_next_state')
+
+	def __init__(self, proto_version: int = 0, server_address: str = "", server_port: int = 0, next_state: int = 0) -> None:
+		self._proto_version = proto_version
+		self._server_address = server_address
+		self._server_port = server_port
+		self._next_state = next_state
+		self._encoded = None
+		self._frozen = False
+
+	@property
+	def proto_version(self) -> int:
+		return self._proto_version
+
+	@proto_version.setter
+	def proto_version(self, value: int) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._proto_version = value
+
+	@property
+	def server_address(self) -> str:
+		return self._server_address
+
+	@server_address.setter
+	def server_address(self, value: str) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._server_address = value
+
+	@property
+	def server_port(self) -> int:
+		return self._server_port
+
+	@server_port.setter
+	def server_port(self, value: int) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._server_port = value
+
+	@property
+	def next_state(self) -> int:
+		return self._next_state
+
+	@next_state.setter
+	def next_state(self, value: int) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._next_state = value
+
+	ENCODERS = {
+		'proto_version': lambda self: VarInt.encode(self._proto_version),
+		'server_address': lambda self: _encode_string(self._server_address),
+		'server_port': lambda self: _STRUCT_0.pack(self._server_port),
+		'next_state': lambda self: VarInt.encode(self._next_state)
+	}
+
+	@classmethod
+	def read_from_buffer(cls, reader: BufferReader) -> "Handshake":
+		self = _new(cls)
+		self._proto_version = VarInt.read_from_buffer(reader)
+		self._server_address = _read_string(reader)
+		self._server_port, = reader.unpack(_STRUCT_0)
+		self._next_state = VarInt.read_from_buffer(reader)
+		self._encoded = None
+		self._frozen = False
+		return self
+
+	def to_bytes(self) -> bytes:
+		encoded = self._encoded
+		if encoded is None:
+			encoded = self._encoded = b"".join((
+				b'\x00',
+				VarInt.encode(self._proto_version),
+				_encode_string(self._server_address),
+				_STRUCT_0.pack(self._server_port),
+				VarInt.encode(self._next_state)
+			))
+
+		return encoded
+
+class StatusRequest(CompiledPacket):
+	ID = 0
+	state = ProtocolState.STATUS
+	direction = PacketDirection.SERVERBOUND
+
+	FIELDS = ()
+	__slots__ = ()
+
+	def __init__(self) -> None:
+		self._encoded = None
+		self._frozen = False
+
+	ENCODERS = {
+
+	}
+
+	@classmethod
+	def read_from_buffer(cls, reader: BufferReader) -> "StatusRequest":
+		self = _new(cls)
+		self._encoded = None
+		self._frozen = False
+		return self
+
+	def to_bytes(self) -> bytes:
+		encoded = self._encoded
+		if encoded is None:
+			encoded = self._encoded = b'\x00'
+
+		return encoded
+
+class PingRequest(CompiledPacket):
+	ID = 1
+	state = ProtocolState.STATUS
+	direction = PacketDirection.SERVERBOUND
+
+	FIELDS = ('payload',)
+	__slots__ = ('_payload',)
+
+	def __init__(self, payload: int = 0) -> None:
+		self._payload = payload
+		self._encoded = None
+		self._frozen = False
+
+	@property
+	def payload(self) -> int:
+		return self._payload
+
+	@payload.setter
+	def payload(self, value: int) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._payload = value
+
+	ENCODERS = {
+		'payload': lambda self: _STRUCT_1.pack(self._payload)
+	}
+
+	@classmethod
+	def read_from_buffer(cls, reader: BufferReader) -> "PingRequest":
+		self = _new(cls)
+		self._payload, = reader.unpack(_STRUCT_1)
+		self._encoded = None
+		self._frozen = False
+		return self
+
+	def to_bytes(self) -> bytes:
+		encoded = self._encoded
+		if encoded is None:
+			encoded = self._encoded = b"".join((
+				b'\x01',
+				_STRUCT_1.pack(self._payload)
+			))
+
+		return encoded
+
+class StatusResponse(CompiledPacket):
+	ID = 0
+	state = ProtocolState.STATUS
+	direction = PacketDirection.CLIENTBOUND
+
+	FIELDS = ('json_response',)
+	__slots__ = ('_json_response',)
+
+	def __init__(self, json_response: str = "") -> None:
+		self._json_response = json_response
+		self._encoded = None
+		self._frozen = False
+
+	@property
+	def json_response(self) -> str:
+		return self._json_response
+
+	@json_response.setter
+	def json_response(self, value: str) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._json_response = value
+
+	ENCODERS = {
+		'json_response': lambda self: _encode_string(self._json_response)
+	}
+
+	@classmethod
+	def read_from_buffer(cls, reader: BufferReader) -> "StatusResponse":
+		self = _new(cls)
+		self._json_response = _read_string(reader)
+		self._encoded = None
+		self._frozen = False
+		return self
+
+	def to_bytes(self) -> bytes:
+		encoded = self._encoded
+		if encoded is None:
+			encoded = self._encoded = b"".join((
+				b'\x00',
+				_encode_string(self._json_response)
+			))
+
+		return encoded
+
+class PongResponse(CompiledPacket):
+	ID = 1
+	state = ProtocolState.STATUS
+	direction = PacketDirection.CLIENTBOUND
+
+	FIELDS = ('payload',)
+	__slots__ = ('_payload',)
+
+	def __init__(self, payload: int = 0) -> None:
+		self._payload = payload
+		self._encoded = None
+		self._frozen = False
+
+	@property
+	def payload(self) -> int:
+		return self._payload
+
+	@payload.setter
+	def payload(self, value: int) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._payload = value
+
+	ENCODERS = {
+		'payload': lambda self: _STRUCT_1.pack(self._payload)
+	}
+
+	@classmethod
+	def read_from_buffer(cls, reader: BufferReader) -> "PongResponse":
+		self = _new(cls)
+		self._payload, = reader.unpack(_STRUCT_1)
+		self._encoded = None
+		self._frozen = False
+		return self
+
+	def to_bytes(self) -> bytes:
+		encoded = self._encoded
+		if encoded is None:
+			encoded = self._encoded = b"".join((
+				b'\x01',
+				_STRUCT_1.pack(self._payload)
+			))
+
+		return encoded
+
+class LoginStart(CompiledPacket):
+	ID = 0
+	state = ProtocolState.LOGIN
+	direction = PacketDirection.SERVERBOUND
+
+	FIELDS = ('user_name',)
+	__slots__ = ('_user_name',)
+
+	def __init__(self, user_name: str = "") -> None:
+		self._user_name = user_name
+		self._encoded = None
+		self._frozen = False
+
+	@property
+	def user_name(self) -> str:
+		return self._user_name
+
+	@user_name.setter
+	def user_name(self, value: str) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._user_name = value
+
+	ENCODERS = {
+		'user_name': lambda self: _encode_string(self._user_name)
+	}
+
+	@classmethod
+	def read_from_buffer(cls, reader: BufferReader) -> "LoginStart":
+		self = _new(cls)
+		self._user_name = _read_string(reader)
+		self._encoded = None
+		self._frozen = False
+		return self
+
+	def to_bytes(self) -> bytes:
+		encoded = self._encoded
+		if encoded is None:
+			encoded = self._encoded = b"".join((
+				b'\x00',
+				_encode_string(self._user_name)
+			))
+
+		return encoded
+
+class EncryptionResponse(CompiledPacket):
+	ID = 1
+	state = ProtocolState.LOGIN
+	direction = PacketDirection.SERVERBOUND
+
+	FIELDS = ('shared_secret_length', 'shared_secret', 'verify_token_length', 'verify_token')
+	__slots__ = ('_shared_secret_length', '_shared_secret', '_verify_token_length', '_verify_token')
+
+	def __init__(self, shared_secret_length: int = 0, shared_secret: bytes = b"", verify_token_length: int = 0, verify_token: bytes = b"") -> None:
+		self._shared_secret_length = shared_secret_length
+		self._shared_secret = shared_secret
+		self._verify_token_length = verify_token_length
+		self._verify_token = verify_token
+		self._encoded = None
+		self._frozen = False
+
+	@property
+	def shared_secret_length(self) -> int:
+		return self._shared_secret_length
+
+	@shared_secret_length.setter
+	def shared_secret_length(self, value: int) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._shared_secret_length = value
+
+	@property
+	def shared_secret(self) -> bytes:
+		return self._shared_secret
+
+	@shared_secret.setter
+	def shared_secret(self, value: bytes) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._shared_secret = value
+
+	@property
+	def verify_token_length(self) -> int:
+		return self._verify_token_length
+
+	@verify_token_length.setter
+	def verify_token_length(self, value: int) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._verify_token_length = value
+
+	@property
+	def verify_token(self) -> bytes:
+		return self._verify_token
+
+	@verify_token.setter
+	def verify_token(self, value: bytes) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._verify_token = value
+
+	ENCODERS = {
+		'shared_secret_length': lambda self: VarInt.encode(self._shared_secret_length),
+		'shared_secret': lambda self: bytes(self._shared_secret),
+		'verify_token_length': lambda self: VarInt.encode(self._verify_token_length),
+		'verify_token': lambda self: bytes(self._verify_token)
+	}
+
+	@classmethod
+	def read_from_buffer(cls, reader: BufferReader) -> "EncryptionResponse":
+		self = _new(cls)
+		self._shared_secret_length = VarInt.read_from_buffer(reader)
+		self._shared_secret = reader.read_exactly(self._shared_secret_length)
+		self._verify_token_length = VarInt.read_from_buffer(reader)
+		self._verify_token = reader.read_exactly(self._verify_token_length)
+		self._encoded = None
+		self._frozen = False
+		return self
+
+	def to_bytes(self) -> bytes:
+		encoded = self._encoded
+		if encoded is None:
+			encoded = self._encoded = b"".join((
+				b'\x01',
+				VarInt.encode(self._shared_secret_length),
+				bytes(self._shared_secret),
+				VarInt.encode(self._verify_token_length),
+				bytes(self._verify_token)
+			))
+
+		return encoded
+
+class LoginDisconnect(CompiledPacket):
+	ID = 0
+	state = ProtocolState.LOGIN
+	direction = PacketDirection.CLIENTBOUND
+
+	FIELDS = ('reason',)
+	__slots__ = ('_reason',)
+
+	def __init__(self, reason: str = "") -> None:
+		self._reason = reason
+		self._encoded = None
+		self._frozen = False
+
+	@property
+	def reason(self) -> str:
+		return self._reason
+
+	@reason.setter
+	def reason(self, value: str) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._reason = value
+
+	ENCODERS = {
+		'reason': lambda self: _encode_string(self._reason)
+	}
+
+	@classmethod
+	def read_from_buffer(cls, reader: BufferReader) -> "LoginDisconnect":
+		self = _new(cls)
+		self._reason = _read_string(reader)
+		self._encoded = None
+		self._frozen = False
+		return self
+
+	def to_bytes(self) -> bytes:
+		encoded = self._encoded
+		if encoded is None:
+			encoded = self._encoded = b"".join((
+				b'\x00',
+				_encode_string(self._reason)
+			))
+
+		return encoded
+
+class EncryptionRequest(CompiledPacket):
+	ID = 1
+	state = ProtocolState.LOGIN
+	direction = PacketDirection.CLIENTBOUND
+
+	FIELDS = ('server_id', 'public_key', 'verify_token')
+	__slots__ = ('_server_id', '_public_key', '_verify_token')
+
+	def __init__(self, server_id: str = "", public_key: bytes = b"", verify_token: bytes = b"") -> None:
+		self._server_id = server_id
+		self._public_key = public_key
+		self._verify_token = verify_token
+		self._encoded = None
+		self._frozen = False
+
+	@property
+	def server_id(self) -> str:
+		return self._server_id
+
+	@server_id.setter
+	def server_id(self, value: str) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._server_id = value
+
+	@property
+	def public_key(self) -> bytes:
+		return self._public_key
+
+	@public_key.setter
+	def public_key(self, value: bytes) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._public_key = value
+
+	@property
+	def verify_token(self) -> bytes:
+		return self._verify_token
+
+	@verify_token.setter
+	def verify_token(self, value: bytes) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._verify_token = value
+
+	ENCODERS = {
+		'server_id': lambda self: _encode_string(self._server_id),
+		'public_key': lambda self: _encode_byte_array(self._public_key),
+		'verify_token': lambda self: _encode_byte_array(self._verify_token)
+	}
+
+	@classmethod
+	def read_from_buffer(cls, reader: BufferReader) -> "EncryptionRequest":
+		self = _new(cls)
+		self._server_id = _read_string(reader)
+		self._public_key = _read_byte_array(reader)
+		self._verify_token = _read_byte_array(reader)
+		self._encoded = None
+		self._frozen = False
+		return self
+
+	def to_bytes(self) -> bytes:
+		encoded = self._encoded
+		if encoded is None:
+			encoded = self._encoded = b"".join((
+				b'\x01',
+				_encode_string(self._server_id),
+				_encode_byte_array(self._public_key),
+				_encode_byte_array(self._verify_token)
+			))
+
+		return encoded
+
+class LoginSuccess(CompiledPacket):
+	ID = 2
+	state = ProtocolState.LOGIN
+	direction = PacketDirection.CLIENTBOUND
+
+	FIELDS = ('uuid_most', 'uuid_least', 'user_name')
+	__slots__ = ('_uuid_most', '_uuid_least', '_user_name')
+
+	def __init__(self, uuid_most: int = 0, uuid_least: int = 0, user_name: str = "") -> None:
+		self._uuid_most = uuid_most
+		self._uuid_least = uuid_least
+		self._user_name = user_name
+		self._encoded = None
+		self._frozen = False
+
+	@property
+	def uuid_most(self) -> int:
+		return self._uuid_most
+
+	@uuid_most.setter
+	def uuid_most(self, value: int) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._uuid_most = value
+
+	@property
+	def uuid_least(self) -> int:
+		return self._uuid_least
+
+	@uuid_least.setter
+	def uuid_least(self, value: int) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._uuid_least = value
+
+	@property
+	def user_name(self) -> str:
+		return self._user_name
+
+	@user_name.setter
+	def user_name(self, value: str) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._user_name = value
+
+	ENCODERS = {
+		'uuid_most': lambda self: _STRUCT_1.pack(self._uuid_most),
+		'uuid_least': lambda self: _STRUCT_1.pack(self._uuid_least),
+		'user_name': lambda self: _encode_string(self._user_name)
+	}
+
+	@classmethod
+	def read_from_buffer(cls, reader: BufferReader) -> "LoginSuccess":
+		self = _new(cls)
+		self._uuid_most, self._uuid_least = reader.unpack(_STRUCT_2)
+		self._user_name = _read_string(reader)
+		self._encoded = None
+		self._frozen = False
+		return self
+
+	def to_bytes(self) -> bytes:
+		encoded = self._encoded
+		if encoded is None:
+			encoded = self._encoded = b"".join((
+				b'\x02',
+				_STRUCT_2.pack(self._uuid_most, self._uuid_least),
+				_encode_string(self._user_name)
+			))
+
+		return encoded
+
+class SetCompression(CompiledPacket):
+	ID = 3
+	state = ProtocolState.LOGIN
+	direction = PacketDirection.CLIENTBOUND
+
+	FIELDS = ('threshold',)
+	__slots__ = ('_threshold',)
+
+	def __init__(self, threshold: int = 0) -> None:
+		self._threshold = threshold
+		self._encoded = None
+		self._frozen = False
+
+	@property
+	def threshold(self) -> int:
+		return self._threshold
+
+	@threshold.setter
+	def threshold(self, value: int) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._threshold = value
+
+	ENCODERS = {
+		'threshold': lambda self: VarInt.encode(self._threshold)
+	}
+
+	@classmethod
+	def read_from_buffer(cls, reader: BufferReader) -> "SetCompression":
+		self = _new(cls)
+		self._threshold = VarInt.read_from_buffer(reader)
+		self._encoded = None
+		self._frozen = False
+		return self
+
+	def to_bytes(self) -> bytes:
+		encoded = self._encoded
+		if encoded is None:
+			encoded = self._encoded = b"".join((
+				b'\x03',
+				VarInt.encode(self._threshold)
+			))
+
+		return encoded
+
+class ServerboundChatMessage(CompiledPacket):
+	ID = 3
+	state = ProtocolState.PLAY
+	direction = PacketDirection.SERVERBOUND
+
+	FIELDS = ('message',)
+	__slots__ = ('_message',)
+
+	def __init__(self, message: str = "") -> None:
+		self._message = message
+		self._encoded = None
+		self._frozen = False
+
+	@property
+	def message(self) -> str:
+		return self._message
+
+	@message.setter
+	def message(self, value: str) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._message = value
+
+	ENCODERS = {
+		'message': lambda self: _encode_string(self._message)
+	}
+
+	@classmethod
+	def read_from_buffer(cls, reader: BufferReader) -> "ServerboundChatMessage":
+		self = _new(cls)
+		self._message = _read_string(reader)
+		self._encoded = None
+		self._frozen = False
+		return self
+
+	def to_bytes(self) -> bytes:
+		encoded = self._encoded
+		if encoded is None:
+			encoded = self._encoded = b"".join((
+				b'\x03',
+				_encode_string(self._message)
+			))
+
+		return encoded
+
+class ServerboundKeepAlive(CompiledPacket):
+	ID = 15
+	state = ProtocolState.PLAY
+	direction = PacketDirection.SERVERBOUND
+
+	FIELDS = ('keep_alive_id',)
+	__slots__ = ('_keep_alive_id',)
+
+	def __init__(self, keep_alive_id: int = 0) -> None:
+		self._keep_alive_id = keep_alive_id
+		self._encoded = None
+		self._frozen = False
+
+	@property
+	def keep_alive_id(self) -> int:
+		return self._keep_alive_id
+
+	@keep_alive_id.setter
+	def keep_alive_id(self, value: int) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._keep_alive_id = value
+
+	ENCODERS = {
+		'keep_alive_id': lambda self: _STRUCT_1.pack(self._keep_alive_id)
+	}
+
+	@classmethod
+	def read_from_buffer(cls, reader: BufferReader) -> "ServerboundKeepAlive":
+		self = _new(cls)
+		self._keep_alive_id, = reader.unpack(_STRUCT_1)
+		self._encoded = None
+		self._frozen = False
+		return self
+
+	def to_bytes(self) -> bytes:
+		encoded = self._encoded
+		if encoded is None:
+			encoded = self._encoded = b"".join((
+				b'\x0f',
+				_STRUCT_1.pack(self._keep_alive_id)
+			))
+
+		return encoded
+
+class BlockChange(CompiledPacket):
+	ID = 12
+	state = ProtocolState.PLAY
+	direction = PacketDirection.CLIENTBOUND
+
+	FIELDS = ('location', 'block_id')
+	__slots__ = ('_location', '_block_id')
+
+	def __init__(self, location: object = None, block_id: int = 0) -> None:
+		self._location = fields.Position().getter() if location is None else location
+		self._block_id = block_id
+		self._encoded = None
+		self._frozen = False
+
+	@property
+	def location(self) -> object:
+		return self._location
+
+	@location.setter
+	def location(self, value: object) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._location = value
+
+	@property
+	def block_id(self) -> int:
+		return self._block_id
+
+	@block_id.setter
+	def block_id(self, value: int) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._block_id = value
+
+	ENCODERS = {
+		'location': lambda self: _encode_field(fields.Position, self._location),
+		'block_id': lambda self: VarInt.encode(self._block_id)
+	}
+
+	@classmethod
+	def read_from_buffer(cls, reader: BufferReader) -> "BlockChange":
+		self = _new(cls)
+		self._location = fields.Position.create_from_buffer(reader).getter()
+		self._block_id = VarInt.read_from_buffer(reader)
+		self._encoded = None
+		self._frozen = False
+		return self
+
+	def to_bytes(self) -> bytes:
+		encoded = self._encoded
+		if encoded is None:
+			encoded = self._encoded = b"".join((
+				b'\x0c',
+				_encode_field(fields.Position, self._location),
+				VarInt.encode(self._block_id)
+			))
+
+		return encoded
+
+class ChatMessage(CompiledPacket):
+	ID = 15
+	state = ProtocolState.PLAY
+	direction = PacketDirection.CLIENTBOUND
+
+	FIELDS = ('message', 'position', 'sender_most', 'sender_least')
+	__slots__ = ('_message', '_position', '_sender_most', '_sender_least')
+
+	def __init__(self, message: str = "", position: int = 0, sender_most: int = 0, sender_least: int = 0) -> None:
+		self._message = message
+		self._position = position
+		self._sender_most = sender_most
+		self._sender_least = sender_least
+		self._encoded = None
+		self._frozen = False
+
+	@property
+	def message(self) -> str:
+		return self._message
+
+	@message.setter
+	def message(self, value: str) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._message = value
+
+	@property
+	def position(self) -> int:
+		return self._position
+
+	@position.setter
+	def position(self, value: int) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._position = value
+
+	@property
+	def sender_most(self) -> int:
+		return self._sender_most
+
+	@sender_most.setter
+	def sender_most(self, value: int) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._sender_most = value
+
+	@property
+	def sender_least(self) -> int:
+		return self._sender_least
+
+	@sender_least.setter
+	def sender_least(self, value: int) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._sender_least = value
+
+	ENCODERS = {
+		'message': lambda self: _encode_string(self._message),
+		'position': lambda self: _STRUCT_3.pack(self._position),
+		'sender_most': lambda self: _STRUCT_1.pack(self._sender_most),
+		'sender_least': lambda self: _STRUCT_1.pack(self._sender_least)
+	}
+
+	@classmethod
+	def read_from_buffer(cls, reader: BufferReader) -> "ChatMessage":
+		self = _new(cls)
+		self._message = _read_string(reader)
+		self._position, self._sender_most, self._sender_least = reader.unpack(_STRUCT_4)
+		self._encoded = None
+		self._frozen = False
+		return self
+
+	def to_bytes(self) -> bytes:
+		encoded = self._encoded
+		if encoded is None:
+			encoded = self._encoded = b"".join((
+				b'\x0f',
+				_encode_string(self._message),
+				_STRUCT_4.pack(self._position, self._sender_most, self._sender_least)
+			))
+
+		return encoded
+
+class Disconnect(CompiledPacket):
+	ID = 26
+	state = ProtocolState.PLAY
+	direction = PacketDirection.CLIENTBOUND
+
+	FIELDS = ('reason',)
+	__slots__ = ('_reason',)
+
+	def __init__(self, reason: str = "") -> None:
+		self._reason = reason
+		self._encoded = None
+		self._frozen = False
+
+	@property
+	def reason(self) -> str:
+		return self._reason
+
+	@reason.setter
+	def reason(self, value: str) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._reason = value
+
+	ENCODERS = {
+		'reason': lambda self: _encode_string(self._reason)
+	}
+
+	@classmethod
+	def read_from_buffer(cls, reader: BufferReader) -> "Disconnect":
+		self = _new(cls)
+		self._reason = _read_string(reader)
+		self._encoded = None
+		self._frozen = False
+		return self
+
+	def to_bytes(self) -> bytes:
+		encoded = self._encoded
+		if encoded is None:
+			encoded = self._encoded = b"".join((
+				b'\x1a',
+				_encode_string(self._reason)
+			))
+
+		return encoded
+
+class KeepAlive(CompiledPacket):
+	ID = 33
+	state = ProtocolState.PLAY
+	direction = PacketDirection.CLIENTBOUND
+
+	FIELDS = ('keep_alive_id',)
+	__slots__ = ('_keep_alive_id',)
+
+	def __init__(self, keep_alive_id: int = 0) -> None:
+		self._keep_alive_id = keep_alive_id
+		self._encoded = None
+		self._frozen = False
+
+	@property
+	def keep_alive_id(self) -> int:
+		return self._keep_alive_id
+
+	@keep_alive_id.setter
+	def keep_alive_id(self, value: int) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._keep_alive_id = value
+
+	ENCODERS = {
+		'keep_alive_id': lambda self: _STRUCT_1.pack(self._keep_alive_id)
+	}
+
+	@classmethod
+	def read_from_buffer(cls, reader: BufferReader) -> "KeepAlive":
+		self = _new(cls)
+		self._keep_alive_id, = reader.unpack(_STRUCT_1)
+		self._encoded = None
+		self._frozen = False
+		return self
+
+	def to_bytes(self) -> bytes:
+		encoded = self._encoded
+		if encoded is None:
+			encoded = self._encoded = b"".join((
+				b'!',
+				_STRUCT_1.pack(self._keep_alive_id)
+			))
+
+		return encoded
+
+class EntityPosition(CompiledPacket):
+	ID = 41
+	state = ProtocolState.PLAY
+	direction = PacketDirection.CLIENTBOUND
+
+	FIELDS = ('entity_id', 'delta_x', 'delta_y', 'delta_z', 'on_ground')
+	__slots__ = ('_entity_id', '_delta_x', '_delta_y', '_delta_z', '_on_ground')
+
+	def __init__(self, entity_id: int = 0, delta_x: int = 0, delta_y: int = 0, delta_z: int = 0, on_ground: bool = False) -> None:
+		self._entity_id = entity_id
+		self._delta_x = delta_x
+		self._delta_y = delta_y
+		self._delta_z = delta_z
+		self._on_ground = on_ground
+		self._encoded = None
+		self._frozen = False
+
+	@property
+	def entity_id(self) -> int:
+		return self._entity_id
+
+	@entity_id.setter
+	def entity_id(self, value: int) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._entity_id = value
+
+	@property
+	def delta_x(self) -> int:
+		return self._delta_x
+
+	@delta_x.setter
+	def delta_x(self, value: int) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._delta_x = value
+
+	@property
+	def delta_y(self) -> int:
+		return self._delta_y
+
+	@delta_y.setter
+	def delta_y(self, value: int) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._delta_y = value
+
+	@property
+	def delta_z(self) -> int:
+		return self._delta_z
+
+	@delta_z.setter
+	def delta_z(self, value: int) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._delta_z = value
+
+	@property
+	def on_ground(self) -> bool:
+		return self._on_ground
+
+	@on_ground.setter
+	def on_ground(self, value: bool) -> None:
+		if self._frozen:
+			self.raise_frozen()
+
+		self._encoded = None
+		self._on_ground = value
+
+	ENCODERS = {
+		'entity_id': lambda self: VarInt.encode(self._entity_id),
+		'delta_x': lambda self: _STRUCT_5.pack(self._delta_x),
+		'delta_y': lambda self: _STRUCT_5.pack(self._delta_y),
+		'delta_z': lambda self: _STRUCT_5.pack(self._delta_z),
+		'on_ground': lambda self: _STRUCT_6.pack(self._on_ground)
+	}
+
+	@classmethod
+	def read_from_buffer(cls, reader: BufferReader) -> "EntityPosition":
+		self = _new(cls)
+		self._entity_id = VarInt.read_from_buffer(reader)
+		self._delta_x, self._delta_y, self._delta_z, self._on_ground = reader.unpack(_STRUCT_7)
+		self._encoded = None
+		self._frozen = False
+		return self
+
+	def to_bytes(self) -> bytes:
+		encoded = self._encoded
+		if encoded is None:
+			encoded = self._encoded = b"".join((
+				b')',
+				VarInt.encode(self._entity_id),
+				_STRUCT_7.pack(self._delta_x, self._delta_y, self._delta_z, self._on_ground)
+			))
+
+		return encoded
+
+PACKETS: Dict[Tuple[PacketDirection, ProtocolState, int], Type[CompiledPacket]] = {
+	(PacketDirection.SERVERBOUND, ProtocolState.HANDSHAKING, 0): Handshake,
+	(PacketDirection.SERVERBOUND, ProtocolState.STATUS, 0): StatusRequest,
+	(PacketDirection.SERVERBOUND, ProtocolState.STATUS, 1): PingRequest,
+	(PacketDirection.CLIENTBOUND, ProtocolState.STATUS, 0): StatusResponse,
+	(PacketDirection.CLIENTBOUND, ProtocolState.STATUS, 1): PongResponse,
+	(PacketDirection.SERVERBOUND, ProtocolState.LOGIN, 0): LoginStart,
+	(PacketDirection.SERVERBOUND, ProtocolState.LOGIN, 1): EncryptionResponse,
+	(PacketDirection.CLIENTBOUND, ProtocolState.LOGIN, 0): LoginDisconnect,
+	(PacketDirection.CLIENTBOUND, ProtocolState.LOGIN, 1): EncryptionRequest,
+	(PacketDirection.CLIENTBOUND, ProtocolState.LOGIN, 2): LoginSuccess,
+	(PacketDirection.CLIENTBOUND, ProtocolState.LOGIN, 3): SetCompression,
+	(PacketDirection.SERVERBOUND, ProtocolState.PLAY, 3): ServerboundChatMessage,
+	(PacketDirection.SERVERBOUND, ProtocolState.PLAY, 15): ServerboundKeepAlive,
+	(PacketDirection.CLIENTBOUND, ProtocolState.PLAY, 12): BlockChange,
+	(PacketDirection.CLIENTBOUND, ProtocolState.PLAY, 15): ChatMessage,
+	(PacketDirection.CLIENTBOUND, ProtocolState.PLAY, 26): Disconnect,
+	(PacketDirection.CLIENTBOUND, ProtocolState.PLAY, 33): KeepAlive,
+	(PacketDirection.CLIENTBOUND, ProtocolState.PLAY, 41): EntityPosition
+}
+
+def get_packet_class(direction: PacketDirection, state: ProtocolState, packet_id: int) -> Type[CompiledPacket]:
+	return PACKETS[(direction, state, packet_id)]
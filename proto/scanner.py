@@ -0,0 +1,195 @@
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from asyncraft.proto.utils import PacketDirection
+from asyncraft.proto.packets import Handshake, NextHandshakeState, StatusRequest, StatusResponse, \
+										PingRequest, PongResponse
+from asyncraft.proto.connection import Connection
+from asyncraft.streams import AsyncIOStreamReader, AsyncIOStreamWriter
+
+__all__ = (
+	"StatusResult", "StatusScanner", "main"
+)
+
+_STATUS_PACKETS = frozenset((StatusResponse, PongResponse))
+
+@dataclass(slots = True)
+class StatusResult:
+	host: str
+	port: int
+	# Parsed status response, None if the target failed before sending it
+	status: Optional[Dict[str, Any]] = None
+	# Seconds from sending the ping to receiving the pong,
+	# includes producing the status as the ping is pipelined behind it
+	latency: Optional[float] = None
+	error: Optional[BaseException] = None
+
+	@property
+	def online(self) -> bool:
+		return self.status is not None
+
+class StatusScanner:
+	""" Queries status of many servers without logging in
+
+		Handshake, status request and ping go out in a single write on a bare
+		Connection, no cipher, listeners or read task are set up per target.
+		`max_concurrency` caps queries in flight across all scans of the scanner,
+		`timeout` limits each query from connecting to the pong
+	"""
+
+	READ_SIZE: int = 65536
+
+	def __init__(self,
+					proto_version: int = -1,
+					max_concurrency: int = 1000,
+					timeout: float = 5,
+					ping: bool = True) -> None:
+		self._proto_version = proto_version
+		self._max_concurrency = max_concurrency
+		self._timeout = timeout
+		self._ping = ping
+
+		self._semaphore = asyncio.Semaphore(max_concurrency)
+
+	async def query(self, host: str, port: int = 25565) -> StatusResult:
+		""" Queries single target, failures are returned in the result
+		"""
+
+		result = StatusResult(host, port)
+
+		async with self._semaphore:
+			try:
+				await asyncio.wait_for(self._query(result), self._timeout)
+			except (OSError, EOFError, ValueError, asyncio.TimeoutError) as ex:
+				result.error = ex
+
+		return result
+
+	async def scan(self, targets: Iterable[Tuple[str, int]]) -> AsyncIterator[StatusResult]:
+		""" Queries (host, port) targets, yielding results in order of completion
+
+			Targets are consumed lazily, so generators of any length work
+		"""
+
+		targets = iter(targets)
+		results: asyncio.Queue = asyncio.Queue()
+		# Results not taken yet, a slow consumer holds queries back instead of piling them up
+		slots = asyncio.Semaphore(self._max_concurrency)
+
+		async def worker() -> None:
+			for host, port in targets:
+				await slots.acquire()
+				results.put_nowait(await self.query(host, port))
+
+		async def finish(workers: List[asyncio.Task]) -> None:
+			try:
+				await asyncio.gather(*workers)
+			finally:
+				results.put_nowait(None)
+
+		workers = [asyncio.create_task(worker()) for _ in range(self._max_concurrency)]
+		finisher = asyncio.create_task(finish(workers))
+		try:
+			while True:
+				result = await results.get()
+				if result is None:
+					break
+
+				slots.release()
+				yield result
+
+			# Raises errors of the targets iterable
+			await finisher
+		finally:
+			for task in workers:
+				task.cancel()
+
+			finisher.cancel()
+
+			await asyncio.gather(finisher, *workers, return_exceptions = True)
+
+	async def _query(self, result: StatusResult) -> None:
+		stream_reader, stream_writer = await asyncio.open_connection(result.host, result.port)
+		reader = AsyncIOStreamReader(stream_reader)
+		writer = AsyncIOStreamWriter(stream_writer)
+
+		try:
+			connection = Connection(direction = PacketDirection.CLIENTBOUND)
+			connection.set_packet_filter(_STATUS_PACKETS)
+
+			packets = [
+				Handshake(self._proto_version, result.host, result.port, NextHandshakeState.STATUS),
+				StatusRequest()
+			]
+
+			if self._ping:
+				packets.append(PingRequest(time.time_ns() // 1000000))
+
+			writer.write(connection.send_packets(packets))
+			sent_time = time.perf_counter()
+
+			while result.status is None or (self._ping and result.latency is None):
+				data = await reader.read(self.READ_SIZE)
+				if not data:
+					if result.status is None:
+						raise EOFError("Server closed connection before sending status")
+
+					# Some servers do not answer pings
+					break
+
+				for packet in connection.feed(data):
+					if isinstance(packet, StatusResponse):
+						result.status = json.loads(packet.json_response)
+					elif isinstance(packet, PongResponse):
+						result.latency = time.perf_counter() - sent_time
+		finally:
+			writer.close()
+
+def _parse_target(line: str) -> Tuple[str, int]:
+	host, _, port = line.rpartition(":")
+	if not host:
+		return port, 25565
+
+	return host, int(port)
+
+async def _main(args: argparse.Namespace) -> None:
+	scanner = StatusScanner(args.proto_version, args.concurrency, args.timeout, not args.no_ping)
+
+	file = sys.stdin if args.targets == "-" else open(args.targets, encoding = "utf-8") # pylint: disable=consider-using-with
+	try:
+		targets = (_parse_target(line.strip()) for line in file if line.strip())
+
+		async for result in scanner.scan(targets):
+			print(json.dumps({
+				"host": result.host,
+				"port": result.port,
+				"status": result.status,
+				"latency": result.latency,
+				"error": repr(result.error) if result.error is not None else None
+			}), flush = True)
+	finally:
+		if file is not sys.stdin:
+			file.close()
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description = "Query status of servers, one JSON line per result")
+	parser.add_argument("targets", help = "file with host[:port] per line, - for stdin")
+	parser.add_argument("--proto-version", type = int, default = -1)
+	parser.add_argument("--concurrency", type = int, default = 1000)
+	parser.add_argument("--timeout", type = float, default = 5)
+	parser.add_argument("--no-ping", action = "store_true")
+	args = parser.parse_args()
+
+	logging.basicConfig(level = logging.WARNING)
+
+	asyncio.run(_main(args))
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,420 @@
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import tracemalloc
+import uuid
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Set, Type
+
+from asyncraft.proto.utils import PacketDirection, ProtocolState
+from asyncraft.proto.packets import StatusRequest, StatusResponse, PingRequest, PongResponse, \
+										LoginStart, EncryptionRequest, EncryptionResponse, LoginSuccess, \
+										SetCompression
+from asyncraft.proto.packet import Packet, set_byte_array
+from asyncraft.proto.connection import Connection
+from asyncraft.streams import AsyncIOStreamReader, AsyncIOStreamWriter
+from asyncraft.utils import unsigned_to_signed
+
+if TYPE_CHECKING:
+	from asyncraft.proto.crypto import ServerKey
+
+__all__ = (
+	"Server", "ServerConnection", "offline_uuid", "main"
+)
+
+ServerPacketListener = Callable[["ServerConnection", Packet], Awaitable[None]]
+ServerConnectionListener = Callable[["ServerConnection"], Awaitable[None]]
+
+def offline_uuid(user_name: str) -> uuid.UUID:
+	""" Returns UUID offline mode servers assign to user_name
+	"""
+
+	# Same as Java's UUID.nameUUIDFromBytes
+	digest = hashlib.md5(f"OfflinePlayer:{user_name}".encode("utf-8")).digest()
+	return uuid.UUID(bytes = digest, version = 3)
+
+class ServerConnection:
+	""" Accepted client of a Server
+	"""
+
+	# Servers hold tens of thousands of these, mostly idle
+	__slots__ = ("_server", "_reader", "_writer", "_connection", "_user_name", "_verify_token")
+
+	def __init__(self,
+					server: "Server",
+					reader: AsyncIOStreamReader,
+					writer: AsyncIOStreamWriter) -> None:
+		self._server = server
+		self._reader = reader
+		self._writer = writer
+
+		self._connection = Connection(direction = PacketDirection.SERVERBOUND)
+		self._connection.set_packet_filter(server.packet_classes)
+
+		self._user_name: str = None
+		self._verify_token: bytes = None
+
+	@property
+	def server(self) -> "Server":
+		return self._server
+
+	@property
+	def connection(self) -> Connection:
+		return self._connection
+
+	@property
+	def state(self) -> ProtocolState:
+		return self._connection.state
+
+	@property
+	def user_name(self) -> str:
+		return self._user_name
+
+	def send_packet(self, packet: Packet) -> None:
+		""" Writes packet without waiting for it to be sent
+		"""
+
+		self._writer.write(self._connection.send_packet(packet))
+
+	async def write_packet(self, packet: Packet, flush: bool = True) -> None:
+		self.send_packet(packet)
+		if flush:
+			await self.flush()
+
+	async def flush(self) -> None:
+		await self._writer.flush()
+
+	def is_closing(self) -> bool:
+		return self._writer.is_closing()
+
+	def close(self) -> None:
+		self._writer.close()
+
+	async def _serve(self) -> None:
+		server = self._server
+		while not self.is_closing():
+			data = await self._reader.read(server.READ_SIZE)
+			if not data:
+				break
+
+			for packet in self._connection.feed(data):
+				await server.dispatch(self, packet)
+
+			await self._writer.flush()
+
+class Server:
+	""" Accepts clients and serves status and offline mode login
+
+		Packets are decoded with the same codecs as on the client side.
+		Listeners get the ServerConnection along with each packet,
+		decoding is skipped for packets nobody listens to
+	"""
+
+	READ_SIZE: int = 65536
+
+	def __init__(self,
+					proto_version: int,
+					version_name: str = "",
+					motd: str = "",
+					max_players: int = 20,
+					compression_threshold: int = -1,
+					server_key: "ServerKey" = None) -> None:
+		self._proto_version = proto_version
+		self._version_name = version_name
+		self._motd = motd
+		self._max_players = max_players
+		self._compression_threshold = compression_threshold
+		self._server_key = server_key
+
+		# Shared by all connections
+		self._packet_listeners: Dict[Type[Packet], List[ServerPacketListener]] = {}
+		self._packet_classes: Set[Type[Packet]] = set()
+
+		self._login_listeners: List[ServerConnectionListener] = []
+		self._disconnect_listeners: List[ServerConnectionListener] = []
+
+		self._connections: Set[ServerConnection] = set()
+		self._logged_in_count = 0
+
+		self._logger = logging.getLogger("proto")
+
+		self._add_listeners()
+
+	@property
+	def packet_classes(self) -> Set[Type[Packet]]:
+		return self._packet_classes
+
+	@property
+	def connections(self) -> Set[ServerConnection]:
+		return self._connections
+
+	@property
+	def logged_in_count(self) -> int:
+		return self._logged_in_count
+
+	def add_packet_listener(self, packet_class: Type[Packet], coro: ServerPacketListener) -> None:
+		self._packet_listeners.setdefault(packet_class, []).append(coro)
+
+		# Connections share the set as their packet filter
+		self._packet_classes.add(packet_class)
+
+	def add_login_listener(self, coro: ServerConnectionListener) -> None:
+		self._login_listeners.append(coro)
+
+	def add_disconnect_listener(self, coro: ServerConnectionListener) -> None:
+		self._disconnect_listeners.append(coro)
+
+	async def serve(self, host: str, port: int, **kwargs) -> asyncio.AbstractServer:
+		""" Starts accepting clients, kwargs are passed to asyncio.start_server
+		"""
+
+		return await asyncio.start_server(self._on_client, host, port, **kwargs)
+
+	async def dispatch(self, connection: ServerConnection, packet: Packet) -> None:
+		for listener in self._packet_listeners.get(type(packet), ()):
+			await listener(connection, packet)
+
+	def create_status(self) -> Dict[str, Any]:
+		""" Returns status response, override to customize
+		"""
+
+		return {
+			"version": {
+				"name": self._version_name,
+				"protocol": self._proto_version
+			},
+			"players": {
+				"max": self._max_players,
+				"online": self._logged_in_count
+			},
+			"description": {
+				"text": self._motd
+			}
+		}
+
+	def create_login_success(self, connection: ServerConnection) -> Packet:
+		""" Returns LoginSuccess for connection, override for versions with other fields
+		"""
+
+		uuid_int = offline_uuid(connection.user_name).int
+
+		packet = LoginSuccess()
+		# Sent as two signed longs
+		packet.uuid_most = unsigned_to_signed(uuid_int >> 64, 64)
+		packet.uuid_least = unsigned_to_signed(uuid_int & 0xFFFFFFFFFFFFFFFF, 64)
+		packet.user_name = connection.user_name
+
+		return packet
+
+	async def _on_client(self,
+							reader: asyncio.StreamReader,
+							writer: asyncio.StreamWriter) -> None:
+		connection = ServerConnection(self, AsyncIOStreamReader(reader), AsyncIOStreamWriter(writer))
+
+		self._connections.add(connection)
+		try:
+			await connection._serve() # pylint: disable=protected-access
+		except (ConnectionError, ValueError) as ex:
+			self._logger.debug("Connection of %r failed: %r", connection.user_name, ex)
+		finally:
+			self._connections.discard(connection)
+			connection.close()
+
+			if connection.state == ProtocolState.PLAY:
+				self._logged_in_count -= 1
+
+				for listener in self._disconnect_listeners:
+					# Raising out of finally would hide why the connection ended
+					try:
+						await listener(connection)
+					except Exception: # pylint: disable=broad-except
+						self._logger.exception("Disconnect listener of %r failed", connection.user_name)
+
+	async def _on_status_request(self, connection: ServerConnection, packet: StatusRequest) -> None: # pylint: disable=unused-argument
+		response = StatusResponse()
+		response.json_response = json.dumps(self.create_status())
+
+		connection.send_packet(response)
+
+	async def _on_ping_request(self, connection: ServerConnection, packet: PingRequest) -> None:
+		response = PongResponse()
+		response.payload = packet.payload
+
+		await connection.write_packet(response)
+		connection.close()
+
+	async def _on_login_start(self, connection: ServerConnection, packet: LoginStart) -> None:
+		connection._user_name = packet.user_name # pylint: disable=protected-access
+
+		if self._server_key is None:
+			await self._finish_login(connection)
+			return
+
+		verify_token = os.urandom(4)
+		connection._verify_token = verify_token # pylint: disable=protected-access
+
+		request = EncryptionRequest()
+		request.server_id = ""
+		set_byte_array(request, "public_key", self._server_key.public_key_bytes)
+		set_byte_array(request, "verify_token", verify_token)
+
+		connection.send_packet(request)
+
+	async def _on_encryption_response(self, connection: ServerConnection, packet: EncryptionResponse) -> None:
+		# Lazy import keeps cryptography optional for servers without encryption
+		from asyncraft.proto.crypto import ProtocolCipher # pylint: disable=import-outside-toplevel
+
+		# RSA would stall every other connection of the loop
+		loop = asyncio.get_running_loop()
+
+		verify_token = await loop.run_in_executor(None, self._server_key.decrypt, bytes(packet.verify_token))
+		if verify_token != connection._verify_token: # pylint: disable=protected-access
+			raise ValueError("Client sent wrong verify token")
+
+		shared_secret = await loop.run_in_executor(None, self._server_key.decrypt, bytes(packet.shared_secret))
+
+		connection.connection.enable_encryption(ProtocolCipher(shared_secret))
+		connection._verify_token = None # pylint: disable=protected-access
+
+		await self._finish_login(connection)
+
+	async def _finish_login(self, connection: ServerConnection) -> None:
+		if self._compression_threshold >= 0:
+			set_compression = SetCompression()
+			set_compression.threshold = self._compression_threshold
+
+			connection.send_packet(set_compression)
+
+		# Switches the connection to PLAY
+		connection.send_packet(self.create_login_success(connection))
+
+		self._logged_in_count += 1
+
+		for listener in self._login_listeners:
+			await listener(connection)
+
+	def _add_listeners(self) -> None:
+		self.add_packet_listener(StatusRequest, self._on_status_request)
+		self.add_packet_listener(PingRequest, self._on_ping_request)
+		self.add_packet_listener(LoginStart, self._on_login_start)
+		self.add_packet_listener(EncryptionResponse, self._on_encryption_response)
+
+def _hold_clients(args: argparse.Namespace,
+					port: int,
+					start: multiprocessing.Event,
+					results: multiprocessing.Queue) -> None:
+	# Lazy imports, only the client process logs in
+	from asyncraft.proto.connectscheduler import ConnectScheduler # pylint: disable=import-outside-toplevel
+	from asyncraft.proto.protocol import Protocol # pylint: disable=import-outside-toplevel
+
+	async def connect(count: int, prefix: str) -> List[Protocol]:
+		scheduler = ConnectScheduler(args.concurrency, timeout = args.timeout)
+		protocols = [Protocol("127.0.0.1", port, args.proto_version) for _ in range(count)]
+
+		stats = await scheduler.connect_all((protocol, f"{prefix}{index}") for index, protocol in enumerate(protocols))
+		results.put(stats.succeeded)
+
+		return protocols
+
+	async def run() -> None:
+		# Logged in before the baseline, pays for one-time costs of the server
+		protocols = await connect(1, "warmup")
+
+		loop = asyncio.get_running_loop()
+		await loop.run_in_executor(None, start.wait)
+
+		protocols += await connect(args.connections, "bot")
+
+		# Idle until terminated by the server process
+		await asyncio.Event().wait()
+
+	asyncio.run(run())
+
+async def _get_result(process: multiprocessing.Process, results: multiprocessing.Queue) -> int:
+	loop = asyncio.get_running_loop()
+	while True:
+		try:
+			return await loop.run_in_executor(None, results.get, True, 1)
+		except queue.Empty:
+			if not process.is_alive():
+				raise RuntimeError("Client process exited") from None
+
+async def _measure(args: argparse.Namespace) -> int:
+	server_key = None
+	if args.encryption:
+		from asyncraft.proto.crypto import ServerKey # pylint: disable=import-outside-toplevel
+		server_key = ServerKey()
+
+	server = Server(args.proto_version,
+					compression_threshold = args.compression_threshold,
+					server_key = server_key)
+
+	listener = await server.serve("127.0.0.1", 0, backlog = args.connections)
+	port = listener.sockets[0].getsockname()[1]
+
+	# Own process so traced memory is the server's alone
+	context = multiprocessing.get_context("spawn")
+	start = context.Event()
+	results = context.Queue()
+
+	process = context.Process(target = _hold_clients, args = (args, port, start, results), daemon = True)
+	process.start()
+
+	try:
+		if await _get_result(process, results) != 1:
+			raise RuntimeError("Warm-up client failed to log in")
+
+		baseline = tracemalloc.get_traced_memory()[0]
+		start.set()
+
+		logged_in = await _get_result(process, results)
+		if logged_in == 0:
+			raise RuntimeError("No client logged in")
+
+		print(f"{logged_in} of {args.connections} connections logged in, "
+				f"{(tracemalloc.get_traced_memory()[0] - baseline) // logged_in} bytes per connection")
+
+		return logged_in
+	finally:
+		process.terminate()
+		process.join()
+
+		listener.close()
+		for connection in list(server.connections):
+			connection.close()
+
+		# Handlers end once they see their transports closed
+		while server.connections:
+			await asyncio.sleep(0.01)
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description = "Memory taken by idle logged in connections of a Server")
+	parser.add_argument("--connections", type = int, default = 2000)
+	parser.add_argument("--concurrency", type = int, default = 100)
+	parser.add_argument("--timeout", type = float, default = 30)
+	parser.add_argument("--encryption", action = "store_true", help = "log in with RSA key exchange and encryption")
+	parser.add_argument("--compression-threshold", type = int, default = -1)
+	parser.add_argument("--proto-version", type = int, default = 760)
+	args = parser.parse_args()
+
+	if args.connections <= 0:
+		parser.error("--connections must be positive")
+
+	logging.basicConfig(level = logging.WARNING)
+
+	tracemalloc.start()
+	try:
+		logged_in = asyncio.run(_measure(args))
+	finally:
+		tracemalloc.stop()
+
+	if logged_in != args.connections:
+		raise SystemExit(1)
+
+if __name__ == "__main__":
+	main()
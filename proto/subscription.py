@@ -0,0 +1,158 @@
+
+import asyncio
+from enum import IntEnum
+from typing import TYPE_CHECKING, AsyncIterator, List, Tuple, Type
+
+from asyncraft.proto.packet import Packet
+
+if TYPE_CHECKING:
+	from asyncraft.proto.protocol import Protocol
+
+__all__ = (
+	"DropPolicy", "PacketSubscription"
+)
+
+class DropPolicy(IntEnum):
+	# Wait for the consumer, stalls reading of the connection
+	BLOCK = 0
+	# Drop the oldest queued packet to make room
+	DROP_OLDEST = 1
+	# Drop the incoming packet
+	DROP_NEWEST = 2
+
+_END = object()
+
+class PacketSubscription:
+	""" Bounded queue of received packets of selected classes
+
+		Iterate with `async for`, iteration ends when the connection is closed
+	"""
+
+	def __init__(self,
+					protocol: "Protocol",
+					packet_classes: Tuple[Type[Packet], ...],
+					maxsize: int,
+					policy: DropPolicy) -> None:
+		self._protocol = protocol
+		self._packet_classes = packet_classes
+		self._policy = policy
+
+		self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+		self._finished = False
+		self._closed = False
+
+		self._dropped = 0
+
+	@property
+	def packet_classes(self) -> Tuple[Type[Packet], ...]:
+		return self._packet_classes
+
+	@property
+	def policy(self) -> DropPolicy:
+		return self._policy
+
+	@property
+	def dropped(self) -> int:
+		return self._dropped
+
+	def qsize(self) -> int:
+		return self._queue.qsize()
+
+	async def put(self, packet: Packet) -> None:
+		if self._closed:
+			return
+
+		queue = self._queue
+		if not queue.full():
+			queue.put_nowait(packet)
+			return
+
+		if self._policy == DropPolicy.DROP_NEWEST:
+			self._dropped += 1
+		elif self._policy == DropPolicy.DROP_OLDEST:
+			queue.get_nowait()
+			queue.put_nowait(packet)
+			self._dropped += 1
+		else:
+			await queue.put(packet)
+
+	async def get(self) -> Packet:
+		""" Returns next packet, raises StopAsyncIteration once finished
+		"""
+
+		if self._closed or (self._finished and self._queue.empty()):
+			raise StopAsyncIteration()
+
+		packet = await self._queue.get()
+		if packet is _END or self._closed:
+			raise StopAsyncIteration()
+
+		return packet
+
+	async def get_batch(self, max_packets: int = None) -> List[Packet]:
+		""" Waits for at least one packet and returns all queued ones
+
+			Returns empty list once finished
+		"""
+
+		try:
+			packets = [await self.get()]
+		except StopAsyncIteration:
+			return []
+
+		queue = self._queue
+		while not queue.empty() and (max_packets is None or len(packets) < max_packets):
+			packet = queue.get_nowait()
+			if packet is _END:
+				break
+
+			packets.append(packet)
+
+		return packets
+
+	def finish(self) -> None:
+		""" Ends iteration after queued packets are consumed
+		"""
+
+		if self._finished:
+			return
+
+		self._finished = True
+
+		# Only a waiting consumer needs waking up and it waits on an empty queue
+		if self._queue.empty():
+			self._queue.put_nowait(_END)
+
+	def close(self) -> None:
+		""" Unsubscribes and discards queued packets
+		"""
+
+		if self._closed:
+			return
+
+		self._closed = True
+		self._finished = True
+		self._protocol._unsubscribe(self) # pylint: disable=protected-access
+
+		queue = self._queue
+		if queue.empty():
+			# Only a waiting consumer needs waking up and it waits on an empty queue
+			queue.put_nowait(_END)
+			return
+
+		# Makes room for the reader if it waits in put(), the end marker would fill it again.
+		# Its packet is never returned, closed subscriptions end iteration
+		while not queue.empty():
+			queue.get_nowait()
+
+	def __aiter__(self) -> AsyncIterator[Packet]:
+		return self
+
+	async def __anext__(self) -> Packet:
+		return await self.get()
+
+	async def __aenter__(self) -> "PacketSubscription":
+		return self
+
+	async def __aexit__(self, *args) -> None:
+		self.close()
@@ -0,0 +1,335 @@
+
+import argparse
+import asyncio
+import importlib
+import logging
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Type, Union
+
+from asyncraft.proto.packet import Packet, PacketTemplate
+from asyncraft.proto.protocol import Protocol
+
+__all__ = (
+	"SyncConnection", "ThreadedClient", "main"
+)
+
+# Called on a worker thread with the connection and a received packet
+PacketCallback = Callable[["SyncConnection", Packet], None]
+
+class SyncConnection:
+	""" Protocol of a ThreadedClient, safe to use from any thread
+	"""
+
+	__slots__ = ("_client", "_protocol", "_queue", "_outbox", "_wakeup_pending")
+
+	def __init__(self, client: "ThreadedClient", protocol: Protocol, work_queue: queue.SimpleQueue) -> None:
+		self._client = client
+		self._protocol = protocol
+		# Worker of this connection, one worker keeps its packets in order
+		self._queue = work_queue
+
+		# Appended to by any thread, drained by the loop thread
+		self._outbox: Deque[Union[Packet, PacketTemplate]] = deque()
+		self._wakeup_pending = False
+
+	@property
+	def client(self) -> "ThreadedClient":
+		return self._client
+
+	@property
+	def protocol(self) -> Protocol:
+		""" Underlying protocol, only to be used on the loop thread
+		"""
+
+		return self._protocol
+
+	@property
+	def user_name(self) -> str:
+		return self._protocol.user_name
+
+	def write_packet(self, packet: Union[Packet, PacketTemplate]) -> None:
+		""" Queues packet to be written by the loop thread, callable from any thread
+
+			The loop is woken once per burst, packets written meanwhile go out in a single write
+		"""
+
+		self._outbox.append(packet)
+
+		# Checked after appending, the flush clears it before draining
+		if not self._wakeup_pending:
+			self._wakeup_pending = True
+			self._client.loop.call_soon_threadsafe(self._flush_outbox)
+
+	def close(self) -> None:
+		self._client.loop.call_soon_threadsafe(self._protocol.close)
+
+	def _flush_outbox(self) -> None:
+		self._wakeup_pending = False
+
+		outbox = self._outbox
+		packets = []
+		while outbox:
+			packets.append(outbox.popleft())
+
+		if packets and not self._protocol.is_closing():
+			self._protocol.write_packets(packets)
+
+	def _enqueue(self, packet: Packet) -> None:
+		for callback in self._client.get_callbacks(type(packet)):
+			self._queue.put((callback, self, packet))
+
+class ThreadedClient:
+	""" Runs protocols on an event loop thread and packet callbacks on worker threads
+
+		Blocking or CPU-heavy code goes into callbacks instead of protocol listeners.
+		Packets of a connection are always handled by the same worker, in order.
+		Handoff goes through SimpleQueue one way and a deque the other way,
+		without a coroutine or future per packet. Workers only run in parallel
+		on free-threaded builds, otherwise they still keep the loop responsive
+	"""
+
+	def __init__(self, workers: int = 4) -> None:
+		self._loop = asyncio.new_event_loop()
+		self._thread = threading.Thread(target = self._loop.run_forever, name = "asyncraft-loop", daemon = True)
+
+		self._queues = [queue.SimpleQueue() for _ in range(workers)]
+		self._workers = [threading.Thread(target = self._run_worker,
+											args = (work_queue,),
+											name = f"asyncraft-worker-{index}",
+											daemon = True)
+							for index, work_queue in enumerate(self._queues)]
+
+		self._callbacks: Dict[Type[Packet], List[PacketCallback]] = {}
+		self._connections: List[SyncConnection] = []
+
+		self._logger = logging.getLogger("proto")
+
+	@property
+	def loop(self) -> asyncio.AbstractEventLoop:
+		return self._loop
+
+	@property
+	def connections(self) -> List[SyncConnection]:
+		return self._connections
+
+	def start(self) -> None:
+		self._thread.start()
+		for worker in self._workers:
+			worker.start()
+
+	def stop(self) -> None:
+		""" Closes connections, waits for queued callbacks and stops all threads
+		"""
+
+		if self._thread.is_alive():
+			for connection in self._connections:
+				self.call(connection.protocol.close)
+
+			self._loop.call_soon_threadsafe(self._loop.stop)
+			self._thread.join()
+
+		for work_queue in self._queues:
+			work_queue.put(None)
+
+		for worker in self._workers:
+			if worker.is_alive():
+				worker.join()
+
+		self._loop.close()
+
+	def __enter__(self) -> "ThreadedClient":
+		self.start()
+		return self
+
+	def __exit__(self, *args) -> None:
+		self.stop()
+
+	def call(self, func: Callable[..., Any], *args) -> Any:
+		""" Runs func on the loop thread and waits for its result
+		"""
+
+		async def run() -> Any:
+			return func(*args)
+
+		return asyncio.run_coroutine_threadsafe(run(), self._loop).result()
+
+	def add_packet_listener(self, packet_class: Type[Packet], callback: PacketCallback) -> None:
+		""" Calls callback on a worker thread for packets of packet_class of every connection
+
+			Add callbacks before connecting to not miss packets
+		"""
+
+		new_class = packet_class not in self._callbacks
+		self._callbacks.setdefault(packet_class, []).append(callback)
+
+		if new_class:
+			for connection in self._connections:
+				self.call(self._listen, connection, packet_class)
+
+	def get_callbacks(self, packet_class: Type[Packet]) -> List[PacketCallback]:
+		return self._callbacks.get(packet_class, ())
+
+	def connect(self,
+				host: str,
+				port: int,
+				proto_version: int,
+				user_name: str,
+				timeout: float = 30,
+				**kwargs) -> SyncConnection:
+		""" Connects a new protocol and waits for login, kwargs are passed to Protocol
+		"""
+
+		work_queue = self._queues[len(self._connections) % len(self._queues)]
+
+		async def connect() -> SyncConnection:
+			connection = SyncConnection(self, Protocol(host, port, proto_version, **kwargs), work_queue)
+			for packet_class in self._callbacks:
+				self._listen(connection, packet_class)
+
+			try:
+				await asyncio.wait_for(self._login(connection.protocol, user_name), timeout)
+			except BaseException:
+				connection.protocol.close()
+				raise
+
+			return connection
+
+		connection = asyncio.run_coroutine_threadsafe(connect(), self._loop).result()
+		self._connections.append(connection)
+
+		return connection
+
+	@staticmethod
+	async def _login(protocol: Protocol, user_name: str) -> None:
+		await protocol.connect(user_name)
+		await protocol.wait_logged_in()
+
+	@staticmethod
+	def _listen(connection: SyncConnection, packet_class: Type[Packet]) -> None:
+		async def listener(packet: Packet) -> None:
+			connection._enqueue(packet) # pylint: disable=protected-access
+
+		connection.protocol.add_packet_listener(packet_class, listener)
+
+	def _run_worker(self, work_queue: queue.SimpleQueue) -> None:
+		while True:
+			item = work_queue.get()
+			if item is None:
+				return
+
+			callback, connection, packet = item
+			try:
+				callback(connection, packet)
+			except Exception: # pylint: disable=broad-except
+				self._logger.exception("Packet callback of %r failed", connection.user_name)
+
+def _load_packet(path: str) -> Packet:
+	""" Loads packet from "module:attribute"
+	"""
+
+	module_name, attribute = path.split(":")
+	return getattr(importlib.import_module(module_name), attribute)
+
+def _run_server(args: argparse.Namespace,
+				packet: Packet,
+				reply_class: Type[Packet],
+				ready: threading.Event,
+				done: threading.Event,
+				result: Dict[str, Any]) -> None:
+	# Lazy import, the server is only needed by the benchmark
+	from asyncraft.proto.server import Server # pylint: disable=import-outside-toplevel
+
+	async def serve() -> None:
+		server = Server(args.proto_version)
+		expected = args.clients * args.count
+		replies = 0
+
+		async def on_login(connection) -> None:
+			# Flushed every 100 packets
+			for index in range(args.count):
+				connection.send_packet(packet)
+				if index % 100 == 99 or index == args.count - 1:
+					await connection.flush()
+
+		async def on_reply(connection, reply) -> None: # pylint: disable=unused-argument
+			nonlocal replies
+			replies += 1
+			if replies == expected:
+				result["elapsed"] = time.perf_counter() - result["start"]
+				done.set()
+
+		server.add_login_listener(on_login)
+		server.add_packet_listener(reply_class, on_reply)
+
+		listener = await server.serve("127.0.0.1", 0)
+		result["port"] = listener.sockets[0].getsockname()[1]
+		ready.set()
+
+		while not done.is_set():
+			await asyncio.sleep(0.05)
+
+	asyncio.run(serve())
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description = "Throughput of ThreadedClient against a local server")
+	parser.add_argument("packet", help = "module:attribute of clientbound PLAY packet the server streams")
+	parser.add_argument("reply", help = "module:attribute of serverbound packet workers write back")
+	parser.add_argument("--clients", type = int, default = 10)
+	parser.add_argument("--count", type = int, default = 10000, help = "packets per client")
+	parser.add_argument("--workers", type = int, default = 4)
+	parser.add_argument("--work", type = float, default = 0, help = "microseconds of busy work per packet")
+	parser.add_argument("--proto-version", type = int, default = 760)
+	args = parser.parse_args()
+
+	# Nothing to wait for otherwise
+	if args.clients < 1 or args.count < 1:
+		parser.error("--clients and --count must be positive")
+
+	logging.basicConfig(level = logging.WARNING)
+
+	packet = _load_packet(args.packet)
+	reply = _load_packet(args.reply)
+
+	ready = threading.Event()
+	done = threading.Event()
+	result: Dict[str, Any] = {}
+
+	server_thread = threading.Thread(target = _run_server,
+										args = (args, packet, type(reply), ready, done, result),
+										daemon = True)
+	server_thread.start()
+	ready.wait()
+
+	work = args.work / 1000000
+
+	def on_packet(connection: SyncConnection, packet: Packet) -> None: # pylint: disable=unused-argument
+		if work:
+			end = time.perf_counter() + work
+			while time.perf_counter() < end:
+				pass
+
+		connection.write_packet(reply)
+
+	with ThreadedClient(args.workers) as client:
+		client.add_packet_listener(type(packet), on_packet)
+
+		result["start"] = time.perf_counter()
+		for index in range(args.clients):
+			client.connect("127.0.0.1", result["port"], args.proto_version, f"bot{index}")
+
+		done.wait()
+
+	server_thread.join()
+
+	total = args.clients * args.count
+	gil = "disabled" if getattr(sys, "_is_gil_enabled", lambda: True)() is False else "enabled"
+	print(f"Python {sys.version.split()[0]} (GIL {gil}), {args.workers} workers, {args.work:g} us work: "
+			f"{total} packets and replies in {result['elapsed']:.2f} s, "
+			f"{total / result['elapsed']:.0f} round trips/s")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,146 @@
+
+import asyncio
+import logging
+import math
+import random
+from dataclasses import dataclass
+from typing import Dict, List, Union
+
+from asyncraft.proto.packet import Packet, PacketTemplate
+from asyncraft.proto.protocol import Protocol
+
+__all__ = (
+	"TickScheduler", "TickStats"
+)
+
+# Game tick of vanilla servers
+TICK_INTERVAL = 0.05
+
+@dataclass(slots = True)
+class TickStats:
+	ticks: int = 0
+	# Ticks skipped because a flush ran past the next boundary
+	missed_ticks: int = 0
+	packets: int = 0
+	writes: int = 0
+	# Packets left queued by the rate limit or a full write buffer
+	deferred: int = 0
+
+class TickScheduler:
+	""" Sends queued packets of many protocols in one pass per game tick
+
+		Each protocol gets at most one write per tick, carrying at most
+		`max_packets_per_tick` packets (None for no limit). Protocols with more
+		than `max_write_buffer` bytes still waiting in their transport are
+		skipped until it drains. `jitter` delays each flush by up to that many seconds
+	"""
+
+	def __init__(self,
+					tick_interval: float = TICK_INTERVAL,
+					jitter: float = 0,
+					max_packets_per_tick: int = None,
+					max_write_buffer: int = 1 << 20) -> None:
+		self._tick_interval = tick_interval
+		self._jitter = jitter
+		self._max_packets_per_tick = max_packets_per_tick
+		self._max_write_buffer = max_write_buffer
+
+		# Dicts keep insertion order, protocols are flushed in the order they first queued
+		self._queues: Dict[Protocol, List[Union[Packet, PacketTemplate]]] = {}
+
+		self._task: asyncio.Task = None
+		self._stats = TickStats()
+
+		self._logger = logging.getLogger("proto")
+
+	@property
+	def stats(self) -> TickStats:
+		return self._stats
+
+	def queue_packet(self, protocol: Protocol, packet: Union[Packet, PacketTemplate]) -> None:
+		""" Queues packet to be sent on the next tick
+		"""
+
+		packets = self._queues.get(protocol)
+		if packets is None:
+			self._queues[protocol] = [packet]
+		else:
+			packets.append(packet)
+
+	def queued_count(self, protocol: Protocol) -> int:
+		return len(self._queues.get(protocol, ()))
+
+	def start(self) -> None:
+		if self._task is None or self._task.done():
+			self._task = asyncio.create_task(self._tick_task())
+
+	async def stop(self) -> None:
+		""" Stops ticking after sending what is queued
+		"""
+
+		if self._task is not None:
+			self._task.cancel()
+			await asyncio.gather(self._task, return_exceptions = True)
+			self._task = None
+
+		self.flush()
+
+	def flush(self) -> None:
+		""" Writes queued packets of every protocol
+		"""
+
+		stats = self._stats
+		limit = self._max_packets_per_tick
+
+		queues = self._queues
+		self._queues = {}
+
+		for protocol, packets in queues.items():
+			if protocol.is_closing():
+				continue
+
+			if protocol.get_write_buffer_size() > self._max_write_buffer:
+				self._requeue(protocol, packets)
+				continue
+
+			if limit is not None and len(packets) > limit:
+				self._requeue(protocol, packets[limit:])
+				packets = packets[:limit]
+
+			try:
+				protocol.write_packets(packets)
+			except (ConnectionError, RuntimeError) as ex:
+				self._logger.warning("Failed to write packets of %r: %r", protocol.user_name, ex)
+				continue
+
+			stats.packets += len(packets)
+			stats.writes += 1
+
+	def _requeue(self, protocol: Protocol, packets: List[Union[Packet, PacketTemplate]]) -> None:
+		self._stats.deferred += len(packets)
+		self._queues[protocol] = packets
+
+	async def _tick_task(self) -> None:
+		loop = asyncio.get_running_loop()
+		interval = self._tick_interval
+
+		next_tick = math.floor(loop.time() / interval + 1) * interval
+		while True:
+			delay = next_tick - loop.time()
+			if self._jitter:
+				delay += random.uniform(0, self._jitter)
+
+			if delay > 0:
+				await asyncio.sleep(delay)
+
+			self.flush()
+			self._stats.ticks += 1
+
+			next_tick += interval
+
+			now = loop.time()
+			if now >= next_tick:
+				# Keep ticks on boundaries instead of bunching up after a stall
+				missed = math.floor((now - next_tick) / interval) + 1
+				self._stats.missed_ticks += missed
+				next_tick += missed * interval
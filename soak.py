@@ -0,0 +1,559 @@
+
+import argparse
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from asyncraft.proto.connection import Connection
+from asyncraft.proto.packet import Packet, PacketTemplate
+from asyncraft.proto.packets import EncryptionRequest, EncryptionResponse, LoginSuccess, SetCompression
+from asyncraft.proto.protocol import Protocol
+from asyncraft.proto.utils import PacketDirection, ProtocolState
+
+__all__ = (
+	"SoakConfig", "SoakSample", "SoakReport",
+	"StubServer", "SoakRunner", "find_growing_sites"
+)
+
+# Traced bytes per idle logged in client
+DEFAULT_CONNECTION_BUDGET = 16 * 1024
+
+# Packet instances with relative weights
+PacketMix = Sequence[Tuple[Packet, float]]
+
+@dataclass
+class SoakConfig:
+	clients: int = 10
+	# Seconds, 0 runs until cancelled
+	duration: float = 3600
+	sample_interval: float = 60
+	proto_version: int = 760
+
+	encryption: bool = True
+	compression_threshold: int = 256
+
+	# Clientbound packets sent by the stub server, per connection
+	server_mix: PacketMix = ()
+	server_packets_per_second: float = 20
+	# Serverbound packets sent by each client
+	client_mix: PacketMix = ()
+	client_packets_per_second: float = 20
+
+	# Allocation sites kept from each tracemalloc snapshot
+	top_sites: int = 50
+	# Samples in a row an allocation site must grow in to be flagged
+	growth_window: int = 5
+	min_growth: int = 64 * 1024
+
+	# Traced bytes per logged in client before the mixes start, 0 for no limit.
+	# Servers other than the stub may send packets of their own meanwhile
+	max_bytes_per_connection: int = DEFAULT_CONNECTION_BUDGET
+	# Seconds for all clients to log in, connection memory is not measured otherwise
+	login_timeout: float = 60
+
+@dataclass
+class SoakSample:
+	elapsed: float
+	rss: int
+	traced_memory: int
+	loop_lag_max: float
+	packets_per_second: float
+	connections: int
+
+@dataclass
+class SoakReport:
+	samples: List[SoakSample] = field(default_factory = list)
+	# Allocation site -> bytes at each sample
+	sites: Dict[str, List[int]] = field(default_factory = dict)
+	growing_sites: List[str] = field(default_factory = list)
+	# Clients that completed login
+	logged_in: int = 0
+	# Traced by the runner's process, main() serves from another process to count clients only.
+	# None until every client logged in
+	bytes_per_connection: Optional[int] = None
+	budget_exceeded: bool = False
+
+def find_growing_sites(sites: Dict[str, List[int]], window: int, min_growth: int) -> List[str]:
+	""" Returns sites whose size never shrank over the last `window` samples
+		and grew by at least `min_growth` bytes
+	"""
+
+	growing = []
+	for site, sizes in sites.items():
+		recent = sizes[-window:]
+		if len(recent) < window:
+			continue
+
+		if all(prev <= curr for prev, curr in zip(recent, recent[1:])) and \
+			recent[-1] - recent[0] >= min_growth:
+			growing.append(site)
+
+	return growing
+
+def _read_rss() -> int:
+	try:
+		with open("/proc/self/statm", "r", encoding = "utf-8") as file:
+			return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+	except OSError:
+		# Peak instead of current on systems without procfs
+		return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def _pick(mix: PacketMix) -> Optional[PacketTemplate]:
+	if not mix:
+		return None
+
+	packets, weights = zip(*mix)
+	return random.choices(packets, weights)[0]
+
+class StubServer:
+	""" Local server that logs clients in and streams a packet mix at them
+
+		With `hold_mix` the mix starts once release_mix() is called,
+		connections only log in before
+	"""
+
+	def __init__(self, config: SoakConfig, hold_mix: bool = False) -> None:
+		self._config = config
+		self._server: asyncio.AbstractServer = None
+		self._handlers: Set[asyncio.Task] = set()
+
+		self._private_key = None
+		self._public_key_bytes: bytes = None
+
+		self._templates = [(PacketTemplate(packet), weight) for packet, weight in config.server_mix]
+		self._mix_released = asyncio.Event()
+		if not hold_mix:
+			self._mix_released.set()
+
+		self._logger = logging.getLogger("soak")
+
+	@property
+	def port(self) -> int:
+		return self._server.sockets[0].getsockname()[1]
+
+	def release_mix(self) -> None:
+		self._mix_released.set()
+
+	async def start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+		if self._config.encryption:
+			# pylint: disable=import-outside-toplevel
+			from cryptography.hazmat.primitives.asymmetric import rsa
+			from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+
+			self._private_key = rsa.generate_private_key(65537, 1024)
+			self._public_key_bytes = self._private_key.public_key().public_bytes(
+				Encoding.DER, PublicFormat.SubjectPublicKeyInfo)
+
+		self._server = await asyncio.start_server(self._handle_client, host, port)
+
+	async def close(self) -> None:
+		self._server.close()
+
+		for handler in self._handlers:
+			handler.cancel()
+
+		await asyncio.gather(*self._handlers, return_exceptions = True)
+
+	async def _read_packets(self, connection: Connection, reader: asyncio.StreamReader) -> List[Packet]:
+		while True:
+			data = await reader.read(65536)
+			if not data:
+				raise ConnectionResetError()
+
+			packets = connection.feed(data)
+			if packets:
+				return packets
+
+	async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+		handler = asyncio.current_task()
+		self._handlers.add(handler)
+
+		connection = Connection(direction = PacketDirection.SERVERBOUND)
+		stream_task: asyncio.Task = None
+		try:
+			await self._login(connection, reader, writer)
+
+			stream_task = asyncio.create_task(self._stream_packets(connection, writer))
+			await self._drain_client(connection, reader)
+		except (ConnectionError, asyncio.CancelledError):
+			pass
+		finally:
+			if stream_task is not None:
+				stream_task.cancel()
+
+			writer.close()
+			self._handlers.discard(handler)
+
+	async def _login(self,
+						connection: Connection,
+						reader: asyncio.StreamReader,
+						writer: asyncio.StreamWriter) -> None:
+		# Handshake and login start
+		packets = []
+		while len(packets) < 2:
+			packets += await self._read_packets(connection, reader)
+
+		if self._config.encryption:
+			# pylint: disable=import-outside-toplevel
+			from cryptography.hazmat.primitives.asymmetric.padding import PKCS1v15
+			from asyncraft.proto.crypto import ProtocolCipher
+
+			request = EncryptionRequest()
+			request.public_key = self._public_key_bytes
+			request.verify_token = os.urandom(4)
+			writer.write(connection.send_packet(request))
+
+			response = None
+			while not isinstance(response, EncryptionResponse):
+				response = (await self._read_packets(connection, reader))[0]
+
+			shared_secret = self._private_key.decrypt(bytes(response.shared_secret), PKCS1v15())
+			connection.enable_encryption(ProtocolCipher(shared_secret))
+
+		if self._config.compression_threshold >= 0:
+			set_compression = SetCompression()
+			set_compression.threshold = self._config.compression_threshold
+			writer.write(connection.send_packet(set_compression))
+
+		writer.write(connection.send_packet(LoginSuccess()))
+		await writer.drain()
+
+	async def _stream_packets(self, connection: Connection, writer: asyncio.StreamWriter) -> None:
+		if not self._templates:
+			return
+
+		await self._mix_released.wait()
+
+		interval = 1 / self._config.server_packets_per_second
+		while True:
+			writer.write(connection.send_packet(_pick(self._templates)))
+			await writer.drain()
+			await asyncio.sleep(interval)
+
+	async def _drain_client(self, connection: Connection, reader: asyncio.StreamReader) -> None:
+		while True:
+			await self._read_packets(connection, reader)
+
+class SoakRunner:
+	""" Drives protocols against a server and samples memory and loop health
+	"""
+
+	def __init__(self,
+					config: SoakConfig,
+					host: str,
+					port: int,
+					on_mix_start: Callable[[], None] = None) -> None:
+		self._config = config
+		self._host = host
+		self._port = port
+		# Lets the server start its mix too
+		self._on_mix_start = on_mix_start
+
+		self._protocols: List[Protocol] = []
+		self._warm_up_protocol: Protocol = None
+		self._client_templates = [(PacketTemplate(packet), weight) for packet, weight in config.client_mix]
+
+		self._packets_received = 0
+		self._loop_lag_max = 0
+
+		self._logged_in_count = 0
+		self._login_failed_count = 0
+		# Every client logged in or failed to
+		self._logins_done = asyncio.Event()
+		# Idle connections were measured, clients send their mix from then on
+		self._mix_started = asyncio.Event()
+
+		self._report = SoakReport()
+
+		self._logger = logging.getLogger("soak")
+
+	@property
+	def report(self) -> SoakReport:
+		return self._report
+
+	async def run(self) -> SoakReport:
+		tracemalloc.start()
+
+		tasks = [asyncio.create_task(self._measure_loop_lag())]
+		try:
+			baseline = None
+			if await self._warm_up():
+				baseline = tracemalloc.get_traced_memory()[0]
+
+			tasks.append(asyncio.create_task(self._measure_connection_memory(baseline)))
+
+			for index in range(self._config.clients):
+				tasks.append(asyncio.create_task(self._run_client(f"soak{index}")))
+
+			await self._sample_until_done()
+		finally:
+			for task in tasks:
+				task.cancel()
+
+			await asyncio.gather(*tasks, return_exceptions = True)
+
+			for protocol in self._protocols:
+				protocol.close()
+
+			if self._warm_up_protocol is not None:
+				self._warm_up_protocol.close()
+
+			tracemalloc.stop()
+
+		return self._report
+
+	async def _warm_up(self) -> bool:
+		""" Logs in a client not counted anywhere, its lazy imports and executor threads stay out of the baseline
+		"""
+
+		protocol = Protocol(self._host, self._port, self._config.proto_version)
+		self._warm_up_protocol = protocol
+
+		try:
+			await asyncio.wait_for(self._login(protocol, "soak-warmup"), self._config.login_timeout)
+		except Exception as ex: # pylint: disable=broad-except
+			self._logger.error("Warm-up client failed to log in: %r", ex)
+			return False
+
+		return True
+
+	@staticmethod
+	async def _login(protocol: Protocol, user_name: str) -> None:
+		await protocol.connect(user_name)
+		await protocol.wait_logged_in()
+
+	async def _on_packet(self, packet: Packet) -> None: # pylint: disable=unused-argument
+		self._packets_received += 1
+
+	async def _run_client(self, user_name: str) -> None:
+		protocol = Protocol(self._host, self._port, self._config.proto_version)
+		for packet, _ in self._config.server_mix:
+			protocol.add_packet_listener(type(packet), self._on_packet)
+
+		self._protocols.append(protocol)
+
+		try:
+			await self._login(protocol, user_name)
+		except Exception as ex: # pylint: disable=broad-except
+			self._logger.error("Client %r failed to log in: %r", user_name, ex)
+			self._login_failed_count += 1
+		else:
+			self._logged_in_count += 1
+			self._report.logged_in = self._logged_in_count
+
+		if self._logged_in_count + self._login_failed_count == self._config.clients:
+			self._logins_done.set()
+
+		if protocol.state != ProtocolState.PLAY or not self._client_templates:
+			return
+
+		await self._mix_started.wait()
+
+		interval = 1 / self._config.client_packets_per_second
+		while protocol.state == ProtocolState.PLAY and not protocol.is_closing():
+			await protocol.write_packet(_pick(self._client_templates))
+			await asyncio.sleep(interval)
+
+	async def _measure_connection_memory(self, baseline: Optional[int]) -> None:
+		""" Measures logged in connections before any mix starts, None baseline only starts the mixes
+		"""
+
+		try:
+			await asyncio.wait_for(self._logins_done.wait(), self._config.login_timeout)
+		except asyncio.TimeoutError:
+			pass
+
+		try:
+			if baseline is not None:
+				self._measure_idle_connections(baseline)
+		finally:
+			self._mix_started.set()
+			if self._on_mix_start is not None:
+				self._on_mix_start()
+
+	def _measure_idle_connections(self, baseline: int) -> None:
+		if self._logged_in_count < self._config.clients:
+			self._logger.error("Only %d of %d clients logged in, connection memory not measured",
+								self._logged_in_count,
+								self._config.clients)
+			return
+
+		report = self._report
+		report.bytes_per_connection = (tracemalloc.get_traced_memory()[0] - baseline) // self._config.clients
+
+		budget = self._config.max_bytes_per_connection
+		report.budget_exceeded = budget > 0 and report.bytes_per_connection > budget
+
+		self._logger.info("%d bytes per idle connection", report.bytes_per_connection)
+		if report.budget_exceeded:
+			self._logger.warning("Idle connections exceed budget of %d bytes", budget)
+
+	async def _measure_loop_lag(self) -> None:
+		loop = asyncio.get_running_loop()
+		interval = 0.05
+
+		while True:
+			expected = loop.time() + interval
+			await asyncio.sleep(interval)
+			self._loop_lag_max = max(self._loop_lag_max, loop.time() - expected)
+
+	async def _sample_until_done(self) -> None:
+		start_time = time.monotonic()
+		last_packets = 0
+
+		while True:
+			await asyncio.sleep(self._config.sample_interval)
+
+			elapsed = time.monotonic() - start_time
+			self._take_sample(elapsed, self._packets_received - last_packets)
+			last_packets = self._packets_received
+
+			if self._config.duration and elapsed >= self._config.duration:
+				break
+
+	def _take_sample(self, elapsed: float, packets: int) -> None:
+		snapshot = tracemalloc.take_snapshot()
+		snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+
+		sample_index = len(self._report.samples)
+		for statistic in snapshot.statistics("lineno")[:self._config.top_sites]:
+			frame = statistic.traceback[0]
+			site = f"{frame.filename}:{frame.lineno}"
+
+			sizes = self._report.sites.setdefault(site, [])
+			# Site was below the top before
+			sizes.extend([0] * (sample_index - len(sizes)))
+			sizes.append(statistic.size)
+
+		sample = SoakSample(elapsed,
+							_read_rss(),
+							tracemalloc.get_traced_memory()[0],
+							self._loop_lag_max,
+							packets / self._config.sample_interval,
+							sum(1 for protocol in self._protocols if protocol.state == ProtocolState.PLAY))
+
+		self._report.samples.append(sample)
+		self._loop_lag_max = 0
+
+		self._report.growing_sites = find_growing_sites(self._report.sites,
+														self._config.growth_window,
+														self._config.min_growth)
+
+		self._logger.info("t=%.0fs rss=%d traced=%d lag=%.1fms pps=%.0f conns=%d",
+							sample.elapsed,
+							sample.rss,
+							sample.traced_memory,
+							sample.loop_lag_max * 1000,
+							sample.packets_per_second,
+							sample.connections)
+
+		for site in self._report.growing_sites:
+			self._logger.warning("Allocation site keeps growing: %s %s",
+									site,
+									self._report.sites[site][-self._config.growth_window:])
+
+def _load_mix(path: str) -> PacketMix:
+	""" Loads packet mix from "module:attribute"
+	"""
+
+	if not path:
+		return ()
+
+	module_name, attribute = path.split(":")
+	return getattr(importlib.import_module(module_name), attribute)
+
+def _create_config(args: argparse.Namespace) -> SoakConfig:
+	return SoakConfig(clients = args.clients,
+						duration = args.duration,
+						sample_interval = args.sample_interval,
+						proto_version = args.proto_version,
+						encryption = not args.no_encryption,
+						compression_threshold = args.compression_threshold,
+						server_mix = _load_mix(args.server_mix),
+						server_packets_per_second = args.server_pps,
+						client_mix = _load_mix(args.client_mix),
+						client_packets_per_second = args.client_pps,
+						max_bytes_per_connection = args.max_bytes_per_connection,
+						login_timeout = args.login_timeout)
+
+def _serve_stub(args: argparse.Namespace, ports: multiprocessing.Queue, mix_start: multiprocessing.Event) -> None:
+	async def serve() -> None:
+		server = StubServer(_create_config(args), hold_mix = True)
+		await server.start()
+		ports.put(server.port)
+
+		loop = asyncio.get_running_loop()
+		await loop.run_in_executor(None, mix_start.wait)
+		server.release_mix()
+
+		# Until terminated by the soak process
+		await asyncio.Event().wait()
+
+	asyncio.run(serve())
+
+async def _main(args: argparse.Namespace) -> SoakReport:
+	config = _create_config(args)
+
+	server_process = None
+	on_mix_start = None
+	host, port = args.host, args.port
+	if host is None:
+		# Own process so traced memory is the clients' alone
+		context = multiprocessing.get_context("spawn")
+		ports = context.Queue()
+		mix_start = context.Event()
+		on_mix_start = mix_start.set
+
+		server_process = context.Process(target = _serve_stub, args = (args, ports, mix_start), daemon = True)
+		server_process.start()
+
+		loop = asyncio.get_running_loop()
+		host, port = "127.0.0.1", await loop.run_in_executor(None, ports.get, True, 60)
+
+	try:
+		return await SoakRunner(config, host, port, on_mix_start).run()
+	finally:
+		if server_process is not None:
+			server_process.terminate()
+			server_process.join()
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description = "Long-running protocol soak test")
+	parser.add_argument("--host", help = "server to connect to, local stub server if omitted")
+	parser.add_argument("--port", type = int, default = 25565)
+	parser.add_argument("--clients", type = int, default = 10)
+	parser.add_argument("--duration", type = float, default = 3600, help = "seconds, 0 for no limit")
+	parser.add_argument("--sample-interval", type = float, default = 60)
+	parser.add_argument("--proto-version", type = int, default = 760)
+	parser.add_argument("--no-encryption", action = "store_true")
+	parser.add_argument("--compression-threshold", type = int, default = 256)
+	parser.add_argument("--server-mix", help = "module:attribute with (packet, weight) pairs")
+	parser.add_argument("--server-pps", type = float, default = 20)
+	parser.add_argument("--client-mix", help = "module:attribute with (packet, weight) pairs")
+	parser.add_argument("--client-pps", type = float, default = 20)
+	parser.add_argument("--max-bytes-per-connection", type = int, default = DEFAULT_CONNECTION_BUDGET,
+						help = "fail if idle clients take more, 0 for no limit")
+	parser.add_argument("--login-timeout", type = float, default = 60)
+	args = parser.parse_args()
+
+	logging.basicConfig(level = logging.INFO)
+
+	report = asyncio.run(_main(args))
+	if report.bytes_per_connection is None:
+		logging.getLogger("soak").error("Connection memory was not measured, %d of %d clients logged in",
+										report.logged_in,
+										args.clients)
+
+	if report.growing_sites or report.budget_exceeded or report.bytes_per_connection is None:
+		raise SystemExit(1)
+
+if __name__ == "__main__":
+	main()
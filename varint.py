@@ -1,78 +1,145 @@
-
-from asyncraft.streams import IStreamWriter, IStreamReader
-
-class VarIntTooBigError(ValueError):
-	pass
-
-class VarInt:
-	SIZE: int = 4
-
-	@classmethod
-	async def count_from(cls, stream: IStreamReader) -> int:
-		offset = 0
-
-		while True:
-			if offset >= cls.SIZE * 8:
-				raise VarIntTooBigError()
-
-			byte = (await stream.read_exactly(1))[0]
-
-			offset += 7
-
-			if byte & 0x80 == 0:
-				break
-
-		return offset // 7
-
-	@classmethod
-	async def read_from(cls, stream: IStreamReader) -> int:
-		value = 0
-		offset = 0
-
-		while True:
-			if offset >= cls.SIZE * 8:
-				raise VarIntTooBigError()
-
-			byte = (await stream.read_exactly(1))[0]
-			value |= (byte & 0x7F) << offset
-
-			offset += 7
-
-			if byte & 0x80 == 0:
-				break
-
-		max_value = 2 ** (cls.SIZE * 8 - 1) - 1
-		if value >= max_value:
-			value = -value + max_value
-
-		return value
-
-	@classmethod
-	def write_to(cls, value: int, stream: IStreamWriter) -> bytes:
-		max_value = 2 ** (cls.SIZE * 8 - 1)
-		if value >= max_value:
-			raise VarIntTooBigError()
-
-		if value < -max_value:
-			raise VarIntTooBigError()
-
-		# Convert to unsigned
-		bit_mask = 2 ** (cls.SIZE * 8) - 1
-		value &= bit_mask
-
-		buffer = bytearray()
-
-		offset = 0
-		while True:
-			if value <= 0x7F:
-				buffer.append(value)
-				break
-
-			buffer.append(value & 0x7F | 0x80)
-			value >>= 7
-			offset += 7
-
-		stream.write(bytes(buffer))
-
-class VarLong(VarInt):
-	SIZE: int = 8
+
+from typing import Tuple
+
+from asyncraft.streams import IStreamWriter, IStreamReader, BufferReader
+from asyncraft.utils import unsigned_to_signed
+
+class VarIntTooBigError(ValueError):
+	pass
+
+class VarInt:
+	SIZE: int = 4
+
+	@classmethod
+	async def count_from(cls, stream: IStreamReader) -> int:
+		offset = 0
+
+		while True:
+			if offset >= cls.SIZE * 8:
+				raise VarIntTooBigError()
+
+			byte = (await stream.read_exactly(1))[0]
+
+			offset += 7
+
+			if byte & 0x80 == 0:
+				break
+
+		return offset // 7
+
+	@classmethod
+	async def read_from(cls, stream: IStreamReader) -> int:
+		value = 0
+		offset = 0
+
+		while True:
+			if offset >= cls.SIZE * 8:
+				raise VarIntTooBigError()
+
+			byte = (await stream.read_exactly(1))[0]
+			value |= (byte & 0x7F) << offset
+
+			offset += 7
+
+			if byte & 0x80 == 0:
+				break
+
+		return unsigned_to_signed(value, cls.SIZE * 8)
+
+	@classmethod
+	def decode_from(cls, buffer: bytes, offset: int = 0) -> Tuple[int, int]:
+		""" Decodes value from buffer at offset
+
+			Returns decoded value and offset right after it,
+			raises EOFError if buffer ends in the middle of the value
+		"""
+
+		value = 0
+		shift = 0
+		buffer_length = len(buffer)
+
+		while True:
+			if shift >= cls.SIZE * 8:
+				raise VarIntTooBigError()
+
+			if offset >= buffer_length:
+				raise EOFError()
+
+			byte = buffer[offset]
+			value |= (byte & 0x7F) << shift
+
+			offset += 1
+			shift += 7
+
+			if byte & 0x80 == 0:
+				break
+
+		return unsigned_to_signed(value, cls.SIZE * 8), offset
+
+	@classmethod
+	def read_from_buffer(cls, reader: BufferReader) -> int:
+		value, offset = cls.decode_from(reader.buffer, reader.offset)
+		reader.offset = offset
+
+		return value
+
+	@classmethod
+	def _to_unsigned(cls, value: int) -> int:
+		max_value = 2 ** (cls.SIZE * 8 - 1)
+		if value >= max_value:
+			raise VarIntTooBigError()
+
+		if value < -max_value:
+			raise VarIntTooBigError()
+
+		bit_mask = 2 ** (cls.SIZE * 8) - 1
+		return value & bit_mask
+
+	@classmethod
+	def size_of(cls, value: int) -> int:
+		""" Returns number of bytes value takes when encoded
+		"""
+
+		value = cls._to_unsigned(value)
+		return max((value.bit_length() + 6) // 7, 1)
+
+	@classmethod
+	def encode(cls, value: int) -> bytes:
+		value = cls._to_unsigned(value)
+
+		buffer = bytearray()
+
+		while True:
+			if value <= 0x7F:
+				buffer.append(value)
+				break
+
+			buffer.append(value & 0x7F | 0x80)
+			value >>= 7
+
+		return bytes(buffer)
+
+	@classmethod
+	def encode_into(cls, value: int, buffer: bytearray, offset: int) -> int:
+		""" Encodes value into buffer at offset
+
+			Returns offset right after encoded value
+		"""
+
+		value = cls._to_unsigned(value)
+
+		while value > 0x7F:
+			buffer[offset] = value & 0x7F | 0x80
+			value >>= 7
+			offset += 1
+
+		buffer[offset] = value
+
+		return offset + 1
+
+	@classmethod
+	def write_to(cls, value: int, stream: IStreamWriter) -> None:
+		stream.write(cls.encode(value))
+
+class VarLong(VarInt):
+	SIZE: int = 8
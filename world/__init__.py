@@ -0,0 +1,3 @@
+
+from asyncraft.world.chunks import ChunkStore, World, decode_chunk_sections
+from asyncraft.world.entities import EntityTracker
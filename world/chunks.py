@@ -0,0 +1,385 @@
+
+import hashlib
+import logging
+import struct
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, List, Optional, Tuple, Type
+
+import numpy as np
+
+from asyncraft.proto.packet import Packet
+from asyncraft.proto.protocol import Protocol
+from asyncraft.streams import BufferReader
+from asyncraft.varint import VarInt
+
+__all__ = (
+	"ChunkStore", "World", "decode_chunk_sections"
+)
+
+SECTION_VOLUME = 16 * 16 * 16
+SECTION_BIOMES = 4 * 4 * 4
+
+_SHORT = struct.Struct("!h")
+_UBYTE = struct.Struct("!B")
+
+def _read_data_array(reader: BufferReader, bits: int, count: int) -> Optional[np.ndarray]:
+	length = VarInt.read_from_buffer(reader)
+	data = reader.read_exactly(length * 8)
+	if bits == 0:
+		return None
+
+	# Since 1.16 entries never span two longs
+	values_per_long = 64 // bits
+	if length * values_per_long < count:
+		raise ValueError(f"Data array of {length} longs is too short for {count} entries")
+
+	longs = np.frombuffer(data, dtype = ">u8").astype(np.uint64)
+	shifts = np.arange(values_per_long, dtype = np.uint64) * np.uint64(bits)
+
+	values = (longs[:, None] >> shifts) & np.uint64((1 << bits) - 1)
+	return values.reshape(-1)[:count]
+
+def _read_paletted_container(reader: BufferReader,
+								count: int,
+								min_indirect_bits: int,
+								max_indirect_bits: int) -> np.ndarray:
+	bits = reader.unpack(_UBYTE)[0]
+
+	if bits == 0:
+		value = VarInt.read_from_buffer(reader)
+		_read_data_array(reader, 0, count)
+		return np.full(count, value, dtype = np.uint16)
+
+	if bits <= max_indirect_bits:
+		palette_length = VarInt.read_from_buffer(reader)
+		palette = np.array([VarInt.read_from_buffer(reader) for _ in range(palette_length)],
+							dtype = np.uint16)
+
+		indices = _read_data_array(reader, max(bits, min_indirect_bits), count)
+		if indices.max(initial = 0) >= palette_length:
+			raise ValueError("Palette index out of range")
+
+		return palette[indices]
+
+	return _read_data_array(reader, bits, count).astype(np.uint16)
+
+def decode_chunk_sections(data: bytes, section_count: int) -> np.ndarray:
+	""" Decodes block states of 1.18+ chunk data
+
+		Returns array of global palette ids shaped (section_count, 4096),
+		entries are indexed with y << 8 | z << 4 | x
+	"""
+
+	reader = BufferReader(data)
+
+	blocks = np.empty((section_count, SECTION_VOLUME), dtype = np.uint16)
+	for section in range(section_count):
+		# Non-air block count
+		reader.unpack(_SHORT)
+
+		blocks[section] = _read_paletted_container(reader, SECTION_VOLUME, 4, 8)
+		_read_paletted_container(reader, SECTION_BIOMES, 1, 3)
+
+	return blocks
+
+class ChunkStore:
+	""" Size-bounded storage of decoded chunk columns shared by worlds
+
+		Identical chunk data is decoded and kept once. Least recently used
+		columns are spilled to a memory-mapped file when `spill_path` is set
+		and dropped otherwise. Chunk data of shared columns is kept and decoded
+		again when a dropped column is needed. Modified columns are never dropped,
+		they stay resident past `max_chunks` once they can not be spilled
+	"""
+
+	_logger = logging.getLogger("world")
+
+	def __init__(self,
+					max_chunks: int = 1024,
+					section_count: int = 24,
+					spill_path: str = None,
+					spill_chunks: int = 4096) -> None:
+		self._max_chunks = max_chunks
+		self._section_count = section_count
+
+		self._resident: OrderedDict[bytes, np.ndarray] = OrderedDict()
+		self._refcounts: Dict[bytes, int] = {}
+		# Chunk data of shared columns, decoded again after they were dropped
+		self._sources: Dict[bytes, bytes] = {}
+		# Keys of modified columns, those are not shared and may be written in place
+		self._private: Dict[bytes, None] = {}
+		self._private_counter = 0
+
+		self._spill_path = spill_path
+		self._spill_chunks = spill_chunks
+		self._spill: np.memmap = None
+		self._spilled: Dict[bytes, int] = {}
+		self._free_slots: List[int] = list(range(spill_chunks - 1, -1, -1))
+		# Set while modified columns keep the store past max_chunks, warned about once
+		self._over_budget = False
+
+	@property
+	def section_count(self) -> int:
+		return self._section_count
+
+	@property
+	def resident_count(self) -> int:
+		return len(self._resident)
+
+	@property
+	def spilled_count(self) -> int:
+		return len(self._spilled)
+
+	def add(self, data: bytes) -> bytes:
+		""" Stores chunk data, returns key of the decoded column
+		"""
+
+		key = hashlib.blake2b(data, digest_size = 16).digest()
+		if key in self._refcounts:
+			self._refcounts[key] += 1
+			if key in self._resident:
+				self._resident.move_to_end(key)
+
+			# Dropped columns are decoded again by get()
+			return key
+
+		# Decoded before anything is stored, invalid data raises here
+		blocks = self._decode(data)
+
+		self._refcounts[key] = 1
+		self._sources[key] = bytes(data)
+		self._insert(key, blocks)
+
+		return key
+
+	def get(self, key: bytes) -> Optional[np.ndarray]:
+		""" Returns column by key, None if the key is not stored
+		"""
+
+		blocks = self._resident.get(key)
+		if blocks is not None:
+			self._resident.move_to_end(key)
+			return blocks
+
+		slot = self._spilled.pop(key, None)
+		if slot is not None:
+			blocks = np.array(self._spill[slot])
+			blocks.flags.writeable = key in self._private
+			self._free_slots.append(slot)
+		else:
+			data = self._sources.get(key)
+			if data is None:
+				return None
+
+			blocks = self._decode(data)
+
+		self._insert(key, blocks)
+
+		return blocks
+
+	def make_private(self, key: bytes) -> Tuple[bytes, Optional[np.ndarray]]:
+		""" Returns key and writable column not shared with anyone else
+
+			Shared columns are copied and released
+		"""
+
+		if key in self._private and self._refcounts[key] == 1:
+			return key, self.get(key)
+
+		blocks = self.get(key)
+		if blocks is None:
+			return key, None
+
+		blocks = blocks.copy()
+
+		self._private_counter += 1
+		private_key = b"private:%d" % self._private_counter
+
+		self._private[private_key] = None
+		self._refcounts[private_key] = 1
+		self._insert(private_key, blocks)
+
+		self.release(key)
+
+		return private_key, blocks
+
+	def release(self, key: bytes) -> None:
+		count = self._refcounts[key] - 1
+		if count > 0:
+			self._refcounts[key] = count
+			return
+
+		del self._refcounts[key]
+		self._private.pop(key, None)
+		self._sources.pop(key, None)
+		self._resident.pop(key, None)
+
+		slot = self._spilled.pop(key, None)
+		if slot is not None:
+			self._free_slots.append(slot)
+
+	def _decode(self, data: bytes) -> np.ndarray:
+		blocks = decode_chunk_sections(data, self._section_count)
+		# Shared by every world with the same chunk
+		blocks.flags.writeable = False
+
+		return blocks
+
+	def _insert(self, key: bytes, blocks: np.ndarray) -> None:
+		self._resident[key] = blocks
+
+		excess = len(self._resident) - self._max_chunks
+		if excess <= 0:
+			self._over_budget = False
+			return
+
+		evicted = 0
+		# Least recently used first, the new column is last
+		for old_key in list(islice(self._resident, len(self._resident) - 1)):
+			if evicted == excess:
+				break
+
+			if self._evict(old_key):
+				evicted += 1
+
+		over_budget = evicted < excess
+		if over_budget and not self._over_budget:
+			self._logger.warning("Chunk store holds %d columns, %d modified ones can not be spilled",
+									len(self._resident),
+									excess - evicted)
+
+		self._over_budget = over_budget
+
+	def _evict(self, key: bytes) -> bool:
+		private = key in self._private
+		slot = self._take_spill_slot(private)
+		if slot is None:
+			# Private columns can not be decoded again
+			if private:
+				return False
+
+			del self._resident[key]
+			return True
+
+		if self._spill is None:
+			self._spill = np.memmap(self._spill_path,
+									dtype = np.uint16,
+									mode = "w+",
+									shape = (self._spill_chunks, self._section_count, SECTION_VOLUME))
+
+		self._spill[slot] = self._resident.pop(key)
+		self._spilled[key] = slot
+
+		return True
+
+	def _take_spill_slot(self, private: bool) -> Optional[int]:
+		if self._spill_path is None:
+			return None
+
+		if self._free_slots:
+			return self._free_slots.pop()
+
+		if not private:
+			return None
+
+		# Shared columns can be decoded again, their slots go to private ones
+		for spilled_key, slot in self._spilled.items():
+			if spilled_key not in self._private:
+				del self._spilled[spilled_key]
+				return slot
+
+		return None
+
+class World:
+	""" Loaded chunks of one connection backed by a shared ChunkStore
+	"""
+
+	def __init__(self, store: ChunkStore, min_y: int = -64) -> None:
+		self._store = store
+		self._min_y = min_y
+
+		self._chunks: Dict[Tuple[int, int], bytes] = {}
+
+	@property
+	def store(self) -> ChunkStore:
+		return self._store
+
+	def attach(self,
+				protocol: Protocol,
+				chunk_packet_class: Type[Packet],
+				unload_packet_class: Type[Packet] = None) -> None:
+		""" Follows chunk packets of protocol
+
+			Chunk packets must have `chunk_x`, `chunk_z` and `data` fields,
+			unload packets `chunk_x` and `chunk_z`
+		"""
+
+		protocol.add_packet_listener(chunk_packet_class, self._on_chunk_data)
+		if unload_packet_class is not None:
+			protocol.add_packet_listener(unload_packet_class, self._on_unload_chunk)
+
+	def load_chunk(self, chunk_x: int, chunk_z: int, data: bytes) -> None:
+		key = self._store.add(data)
+
+		old_key = self._chunks.get((chunk_x, chunk_z))
+		self._chunks[(chunk_x, chunk_z)] = key
+
+		if old_key is not None:
+			self._store.release(old_key)
+
+	def unload_chunk(self, chunk_x: int, chunk_z: int) -> None:
+		key = self._chunks.pop((chunk_x, chunk_z), None)
+		if key is not None:
+			self._store.release(key)
+
+	def clear(self) -> None:
+		for key in self._chunks.values():
+			self._store.release(key)
+
+		self._chunks.clear()
+
+	def is_loaded(self, chunk_x: int, chunk_z: int) -> bool:
+		return (chunk_x, chunk_z) in self._chunks
+
+	def get_block(self, x: int, y: int, z: int) -> Optional[int]:
+		""" Returns global palette id of block, None if it is not loaded
+		"""
+
+		key = self._chunks.get((x >> 4, z >> 4))
+		if key is None:
+			return None
+
+		blocks = self._store.get(key)
+		if blocks is None:
+			return None
+
+		section = (y - self._min_y) >> 4
+		if not 0 <= section < blocks.shape[0]:
+			return None
+
+		return int(blocks[section, (y & 15) << 8 | (z & 15) << 4 | (x & 15)])
+
+	def set_block(self, x: int, y: int, z: int, state: int) -> None:
+		position = (x >> 4, z >> 4)
+
+		key = self._chunks.get(position)
+		if key is None:
+			return
+
+		section = (y - self._min_y) >> 4
+		if not 0 <= section < self._store.section_count:
+			return
+
+		key, blocks = self._store.make_private(key)
+		self._chunks[position] = key
+		if blocks is None:
+			return
+
+		blocks[section, (y & 15) << 8 | (z & 15) << 4 | (x & 15)] = state
+
+	async def _on_chunk_data(self, packet: Packet) -> None:
+		self.load_chunk(packet.chunk_x, packet.chunk_z, bytes(packet.data))
+
+	async def _on_unload_chunk(self, packet: Packet) -> None:
+		self.unload_chunk(packet.chunk_x, packet.chunk_z)
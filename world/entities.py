@@ -0,0 +1,308 @@
+
+import math
+from typing import Dict, Iterable, List, Optional, Set, Type
+
+import numpy as np
+
+from asyncraft.proto.packet import Packet
+from asyncraft.proto.protocol import Protocol
+
+__all__ = (
+	"EntityTracker",
+)
+
+# Relative moves are sent in 1/4096 of a block since 1.14
+MOVE_DELTA_SCALE = 4096
+
+_CELL_BITS = 21
+_CELL_MASK = (1 << _CELL_BITS) - 1
+
+def _cell_key(cell_x: int, cell_y: int, cell_z: int) -> int:
+	return (cell_x & _CELL_MASK) << (_CELL_BITS * 2) | \
+			(cell_y & _CELL_MASK) << _CELL_BITS | \
+			(cell_z & _CELL_MASK)
+
+class EntityTracker:
+	""" Entity positions in struct-of-arrays form indexed by a spatial hash grid
+
+		Rows of the id, position and cell columns are kept dense,
+		removed entities are replaced by the last row
+	"""
+
+	def __init__(self, cell_size: float = 16, capacity: int = 1024) -> None:
+		self._cell_size = cell_size
+
+		self._ids = np.zeros(capacity, dtype = np.int64)
+		self._positions = np.zeros((capacity, 3), dtype = np.float64)
+		self._cells = np.zeros(capacity, dtype = np.int64)
+		self._count = 0
+
+		# Entity id -> row
+		self._rows: Dict[int, int] = {}
+		# Cell key -> rows
+		self._grid: Dict[int, Set[int]] = {}
+
+	def __len__(self) -> int:
+		return self._count
+
+	def __contains__(self, entity_id: int) -> bool:
+		return entity_id in self._rows
+
+	@property
+	def ids(self) -> np.ndarray:
+		""" View of tracked entity ids, invalidated by updates
+		"""
+
+		return self._ids[:self._count]
+
+	@property
+	def positions(self) -> np.ndarray:
+		""" View of positions in the order of `ids`, invalidated by updates
+		"""
+
+		return self._positions[:self._count]
+
+	def attach(self,
+				protocol: Protocol,
+				spawn_classes: Iterable[Type[Packet]] = (),
+				move_classes: Iterable[Type[Packet]] = (),
+				teleport_classes: Iterable[Type[Packet]] = (),
+				destroy_classes: Iterable[Type[Packet]] = ()) -> None:
+		""" Follows entity packets of protocol
+
+			Spawn and teleport packets must have `entity_id`, `x`, `y` and `z` fields,
+			move packets `entity_id`, `delta_x`, `delta_y` and `delta_z`,
+			destroy packets `entity_ids`
+		"""
+
+		for packet_class in spawn_classes:
+			protocol.add_packet_listener(packet_class, self._on_spawn)
+
+		for packet_class in move_classes:
+			protocol.add_packet_listener(packet_class, self._on_move)
+
+		for packet_class in teleport_classes:
+			protocol.add_packet_listener(packet_class, self._on_teleport)
+
+		for packet_class in destroy_classes:
+			protocol.add_packet_listener(packet_class, self._on_destroy)
+
+	def add(self, entity_id: int, x: float, y: float, z: float) -> None:
+		row = self._rows.get(entity_id)
+		if row is not None:
+			self._move_row(row, x, y, z)
+			return
+
+		if self._count == len(self._ids):
+			self._grow()
+
+		row = self._count
+		self._count += 1
+
+		self._rows[entity_id] = row
+		self._ids[row] = entity_id
+
+		position = self._positions[row]
+		position[0] = x
+		position[1] = y
+		position[2] = z
+
+		cell = self._cell_of(x, y, z)
+		self._cells[row] = cell
+		self._grid.setdefault(cell, set()).add(row)
+
+	def remove(self, entity_id: int) -> None:
+		row = self._rows.pop(entity_id, None)
+		if row is None:
+			return
+
+		self._discard_from_cell(int(self._cells[row]), row)
+
+		last = self._count - 1
+		self._count = last
+		if row == last:
+			return
+
+		# Keep columns dense by moving the last row into the hole
+		last_cell = int(self._cells[last])
+		self._discard_from_cell(last_cell, last)
+		self._grid.setdefault(last_cell, set()).add(row)
+
+		last_id = int(self._ids[last])
+		self._ids[row] = last_id
+		self._positions[row] = self._positions[last]
+		self._cells[row] = last_cell
+		self._rows[last_id] = row
+
+	def clear(self) -> None:
+		self._count = 0
+		self._rows.clear()
+		self._grid.clear()
+
+	def set_position(self, entity_id: int, x: float, y: float, z: float) -> None:
+		row = self._rows.get(entity_id)
+		if row is not None:
+			self._move_row(row, x, y, z)
+
+	def move(self, entity_id: int, delta_x: float, delta_y: float, delta_z: float) -> None:
+		row = self._rows.get(entity_id)
+		if row is None:
+			return
+
+		position = self._positions[row]
+		self._move_row(row,
+						position[0] + delta_x,
+						position[1] + delta_y,
+						position[2] + delta_z)
+
+	def get_position(self, entity_id: int) -> Optional[np.ndarray]:
+		row = self._rows.get(entity_id)
+		if row is None:
+			return None
+
+		return self._positions[row].copy()
+
+	def query_box(self,
+					min_x: float, min_y: float, min_z: float,
+					max_x: float, max_y: float, max_z: float) -> List[int]:
+		""" Returns ids of entities inside the box, bounds included
+		"""
+
+		rows = self._candidate_rows(min_x, min_y, min_z, max_x, max_y, max_z)
+		if rows.size == 0:
+			return []
+
+		positions = self._positions[rows]
+		mask = (positions[:, 0] >= min_x) & (positions[:, 0] <= max_x) & \
+				(positions[:, 1] >= min_y) & (positions[:, 1] <= max_y) & \
+				(positions[:, 2] >= min_z) & (positions[:, 2] <= max_z)
+
+		return self._ids[rows[mask]].tolist()
+
+	def query_radius(self, x: float, y: float, z: float, radius: float) -> List[int]:
+		""" Returns ids of entities within radius of the point
+		"""
+
+		rows, distances = self._rows_within(x, y, z, radius)
+		return self._ids[rows[distances <= radius * radius]].tolist()
+
+	def nearest(self, x: float, y: float, z: float, max_radius: float) -> Optional[int]:
+		""" Returns id of the closest entity within max_radius of the point
+		"""
+
+		rows, distances = self._rows_within(x, y, z, max_radius)
+		if rows.size == 0:
+			return None
+
+		index = int(np.argmin(distances))
+		if distances[index] > max_radius * max_radius:
+			return None
+
+		return int(self._ids[rows[index]])
+
+	def _rows_within(self, x: float, y: float, z: float, radius: float):
+		rows = self._candidate_rows(x - radius, y - radius, z - radius,
+									x + radius, y + radius, z + radius)
+
+		delta = self._positions[rows] - (x, y, z)
+		distances = np.einsum("ij,ij->i", delta, delta)
+
+		return rows, distances
+
+	def _candidate_rows(self,
+						min_x: float, min_y: float, min_z: float,
+						max_x: float, max_y: float, max_z: float) -> np.ndarray:
+		cell_size = self._cell_size
+
+		min_cell_x = math.floor(min_x / cell_size)
+		min_cell_y = math.floor(min_y / cell_size)
+		min_cell_z = math.floor(min_z / cell_size)
+		max_cell_x = math.floor(max_x / cell_size)
+		max_cell_y = math.floor(max_y / cell_size)
+		max_cell_z = math.floor(max_z / cell_size)
+
+		num_cells = (max_cell_x - min_cell_x + 1) * \
+					(max_cell_y - min_cell_y + 1) * \
+					(max_cell_z - min_cell_z + 1)
+
+		if num_cells > len(self._grid):
+			# Query covers more cells than are occupied, walk occupied ones
+			rows = []
+			for cell, cell_rows in self._grid.items():
+				cell_x = cell >> (_CELL_BITS * 2)
+				cell_y = cell >> _CELL_BITS & _CELL_MASK
+				cell_z = cell & _CELL_MASK
+				if _wrapped_in_range(cell_x, min_cell_x, max_cell_x) and \
+					_wrapped_in_range(cell_y, min_cell_y, max_cell_y) and \
+					_wrapped_in_range(cell_z, min_cell_z, max_cell_z):
+					rows.extend(cell_rows)
+
+			return np.array(rows, dtype = np.int64)
+
+		rows = []
+		grid = self._grid
+		for cell_x in range(min_cell_x, max_cell_x + 1):
+			for cell_y in range(min_cell_y, max_cell_y + 1):
+				for cell_z in range(min_cell_z, max_cell_z + 1):
+					cell_rows = grid.get(_cell_key(cell_x, cell_y, cell_z))
+					if cell_rows:
+						rows.extend(cell_rows)
+
+		return np.array(rows, dtype = np.int64)
+
+	def _cell_of(self, x: float, y: float, z: float) -> int:
+		cell_size = self._cell_size
+		return _cell_key(math.floor(x / cell_size),
+							math.floor(y / cell_size),
+							math.floor(z / cell_size))
+
+	def _move_row(self, row: int, x: float, y: float, z: float) -> None:
+		position = self._positions[row]
+		position[0] = x
+		position[1] = y
+		position[2] = z
+
+		cell = self._cell_of(x, y, z)
+		old_cell = int(self._cells[row])
+		if cell == old_cell:
+			return
+
+		self._discard_from_cell(old_cell, row)
+		self._grid.setdefault(cell, set()).add(row)
+		self._cells[row] = cell
+
+	def _discard_from_cell(self, cell: int, row: int) -> None:
+		cell_rows = self._grid.get(cell)
+		if cell_rows is None:
+			return
+
+		cell_rows.discard(row)
+		if not cell_rows:
+			del self._grid[cell]
+
+	def _grow(self) -> None:
+		capacity = len(self._ids) * 2
+
+		self._ids = np.resize(self._ids, capacity)
+		self._positions = np.resize(self._positions, (capacity, 3))
+		self._cells = np.resize(self._cells, capacity)
+
+	async def _on_spawn(self, packet: Packet) -> None:
+		self.add(packet.entity_id, packet.x, packet.y, packet.z)
+
+	async def _on_move(self, packet: Packet) -> None:
+		self.move(packet.entity_id,
+					packet.delta_x / MOVE_DELTA_SCALE,
+					packet.delta_y / MOVE_DELTA_SCALE,
+					packet.delta_z / MOVE_DELTA_SCALE)
+
+	async def _on_teleport(self, packet: Packet) -> None:
+		self.set_position(packet.entity_id, packet.x, packet.y, packet.z)
+
+	async def _on_destroy(self, packet: Packet) -> None:
+		for entity_id in packet.entity_ids:
+			self.remove(entity_id)
+
+def _wrapped_in_range(cell: int, min_cell: int, max_cell: int) -> bool:
+	# Cell coordinates are stored modulo 2 ** _CELL_BITS
+	return (cell - min_cell) & _CELL_MASK <= max_cell - min_cell